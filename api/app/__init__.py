@@ -1,36 +1,166 @@
-from sqlalchemy import create_engine
+import threading
+from typing import Optional
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
 import logging
-from app.config import POSTGRES_DB, POSTGRES_PASSWORD, POSTGRES_USER
+from app.config import POSTGRES_DB, POSTGRES_HOST, POSTGRES_PASSWORD, POSTGRES_REPLICA_URL, POSTGRES_USER
+from app.deadline import apply_deadlines
+from app.metrics import instrument_engine
+from app.tracing import trace_engine
 
 # SQLALCHEMY_DATABASE_URL is constructed from environment variables
-SQLALCHEMY_DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@db:5432/{POSTGRES_DB}"
+SQLALCHEMY_DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:5432/{POSTGRES_DB}"
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger("resources")
 
-# Create SQLAlchemy engine
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# SQLAlchemy engines of the primary and of the read replica, created on first use so importing the package
+# does not touch the database
+_engine: Optional[Engine] = None
+_replica_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
 
-# Create a sessionmaker to manage sessions
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+class RoutingSession(Session):
+    """
+    Session of read-only requests, reading from the replica and writing to the primary.
+
+    Once the session writes, or another session of the same request commits, its reads go to the
+    primary as well, so a request always reads its own writes despite replication lag.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        request_state = self.info.get("request_state")
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info["wrote"] = True
+        if self.info.get("wrote") or getattr(request_state, "committed", False):
+            return get_engine()
+        return get_replica_engine()
+
+
+# Create a sessionmaker to manage sessions, bound to the engine once it exists
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+# Sessions of read-only requests, routed per statement by `RoutingSession.get_bind`
+ReadSessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
 
 # Create a base class for declarative class definitions
 Base = declarative_base()
 
-# Create database tables based on declarative base
-Base.metadata.create_all(engine)
-
 # Constants for JWT token generation and verification
 SECRET_KEY = "your_secret_key"
 ALGORITHM = "HS256"
 
 
-def get_db():
+def _instrument(engine: Engine):
+    # Record query and commit durations, and trace statements of traced requests
+    instrument_engine(engine)
+    trace_engine(engine)
+    # Bound the statements of a request by its deadline
+    apply_deadlines(engine)
+
+
+def get_engine() -> Engine:
+    """
+    Get the SQLAlchemy engine of the primary, creating and instrumenting it on first use.
+
+    Returns:
+        Engine: The SQLAlchemy engine.
     """
-    Function to get a database session.
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = create_engine(SQLALCHEMY_DATABASE_URL)
+                _instrument(engine)
+                SessionLocal.configure(bind=engine)
+                _engine = engine
+    return _engine
+
+
+def get_replica_engine() -> Engine:
+    """
+    Get the SQLAlchemy engine of the read replica, creating and instrumenting it on first use.
+
+    Returns:
+        Engine: The engine of `POSTGRES_REPLICA_URL`, or the primary engine if no replica is configured.
+    """
+    global _replica_engine
+    if not POSTGRES_REPLICA_URL:
+        return get_engine()
+    if _replica_engine is None:
+        with _engine_lock:
+            if _replica_engine is None:
+                engine = create_engine(POSTGRES_REPLICA_URL)
+                _instrument(engine)
+                _replica_engine = engine
+    return _replica_engine
+
+
+@event.listens_for(Session, "after_commit")
+def _record_request_commit(session: Session):
+    """
+    Mark the request of a session that committed, so that its read sessions switch to the primary.
+
+    Args:
+        session (Session): The session that committed.
+    """
+    request_state = session.info.get("request_state")
+    if request_state is None or (isinstance(session, RoutingSession) and not session.info.get("wrote")):
+        return
+    request_state.committed = True
+
+
+def init_db():
+    """
+    Create the engine and the database tables based on the declarative base.
+
+    Called from the application lifespan. A database that is not reachable yet is logged
+    rather than failing startup, sessions connect on first use.
+    """
+    try:
+        Base.metadata.create_all(get_engine())
+    except Exception as e:
+        logger.error(f"Failed to create database tables: {str(e)}")
+
+
+def get_db(request: Request = None):
+    """
+    Function to get a database session on the primary.
+
+    Args:
+        request (Request, optional): The request the session serves, injected by FastAPI.
+            Its read sessions read from the primary once this session commits.
+
+    Yields:
+        Session: A SQLAlchemy database session.
+
+    Notes:
+        The session is closed automatically after use.
+    """
+    db = SessionLocal(bind=get_engine())
+    if request is not None:
+        db.info["request_state"] = request.state
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_read_db(request: Request = None):
+    """
+    Function to get a database session of a read-only request.
+
+    Reads go to the read replica until the session writes or another session of the same request
+    commits, writes always go to the primary.
+
+    Args:
+        request (Request, optional): The request the session serves, injected by FastAPI.
 
     Yields:
         Session: A SQLAlchemy database session.
@@ -38,7 +168,9 @@ def get_db():
     Notes:
         The session is closed automatically after use.
     """
-    db = SessionLocal()
+    db = ReadSessionLocal()
+    if request is not None:
+        db.info["request_state"] = request.state
     try:
         yield db
     finally:
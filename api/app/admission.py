@@ -0,0 +1,320 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Optional
+from starlette.responses import JSONResponse
+from app.config import (
+    ADMISSION_CAPACITY,
+    ADMISSION_CLIENT_CAPACITY,
+    ADMISSION_COSTS,
+    ADMISSION_QUEUE_SIZE,
+    ADMISSION_QUEUE_TIMEOUT,
+)
+from app.metrics import ADMISSION_IN_USE, ADMISSION_QUEUED, ADMISSION_REJECTED
+
+# Cost of a request per endpoint, by first path segment, in units of the admission capacity.
+# Endpoints fanning out to RPC or holding a database connection for long cost more, unlisted ones are not limited
+DEFAULT_COSTS = {
+    "/add_token": 3,
+    "/add_tokens": 8,
+    "/get_holders_info": 4,
+    "/get_token_info": 1,
+    "/get_token_metadata": 1,
+    "/get_token_age": 2,
+    "/get_holders_summary": 1,
+    "/snapshot_holders": 4,
+    "/get_holders_snapshot": 1,
+    "/update_ledger": 4,
+    "/get_holders_ledger": 1,
+    "/get_sell_events": 1,
+    "/get_balance_history": 1,
+    "/export": 4,
+    "/refresh_holders": 1,
+    "/resolve_metadata": 1,
+}
+
+# Weight of the hold time just measured in the moving average used for Retry-After
+HOLD_TIME_SMOOTHING = 0.2
+
+# Header identifying the client of a request for the per-client cap, e.g. the user of a bot sharing one address
+CLIENT_ID_HEADER = b"x-client-id"
+
+# Longest client identifier kept from the header
+CLIENT_ID_MAX_LENGTH = 128
+
+
+def parse_costs(spec: str) -> dict[str, int]:
+    """
+    Parse endpoint cost overrides.
+
+    Args:
+        spec (str): Comma-separated `/endpoint=cost` pairs, e.g. "/get_holders_info=6,/export=0".
+
+    Returns:
+        dict[str, int]: The default costs updated with the overrides.
+
+    Raises:
+        ValueError: If a pair is malformed.
+    """
+    costs = dict(DEFAULT_COSTS)
+    for pair in filter(None, (part.strip() for part in spec.split(","))):
+        endpoint, _, cost = pair.partition("=")
+        if not endpoint.startswith("/") or not cost:
+            raise ValueError(f"Invalid admission cost {pair}, expected /endpoint=cost.")
+        costs[endpoint] = int(cost)
+    return costs
+
+
+class AdmissionController:
+    """
+    Limits the total cost of the requests in progress, globally and per client, with a short bounded wait queue.
+
+    Requests that fit are admitted at once. Others wait in FIFO order for at most `queue_timeout`
+    seconds, and are rejected immediately when `queue_size` requests are already waiting, so
+    admitted requests keep their latency under overload and the rest fail fast.
+
+    Attributes:
+        capacity (int): Maximum total cost of the requests in progress.
+        client_capacity (int): Maximum total cost of one client's requests in progress.
+        queue_size (int): Maximum number of waiting requests.
+        queue_timeout (float): Maximum seconds a request waits for admission.
+        costs (dict[str, int]): Cost per endpoint.
+    """
+
+    def __init__(
+        self,
+        capacity: int = ADMISSION_CAPACITY,
+        client_capacity: int = ADMISSION_CLIENT_CAPACITY,
+        queue_size: int = ADMISSION_QUEUE_SIZE,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT,
+        costs: Optional[dict[str, int]] = None,
+    ):
+        self.capacity = capacity
+        self.client_capacity = client_capacity
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.costs = costs if costs is not None else parse_costs(ADMISSION_COSTS)
+        self._in_use = 0
+        self._client_in_use: dict[str, int] = {}
+        self._waiters: deque[tuple[str, int, asyncio.Future]] = deque()
+        self._hold_time = 1.0
+
+    @staticmethod
+    def endpoint(path: str) -> str:
+        """
+        Endpoint of a request: the first segment of its path.
+
+        Args:
+            path (str): The request path.
+
+        Returns:
+            str: The endpoint, e.g. "/get_holders_info".
+        """
+        return "/" + path.lstrip("/").split("/", 1)[0]
+
+    def cost(self, path: str) -> int:
+        """
+        Cost of a request, looked up by its endpoint.
+
+        Args:
+            path (str): The request path.
+
+        Returns:
+            int: The cost, capped to the client capacity, 0 for endpoints that are not limited.
+        """
+        return min(self.costs.get(self.endpoint(path), 0), self.client_capacity, self.capacity)
+
+    async def acquire(self, client: str, cost: int) -> Optional[str]:
+        """
+        Wait until a request can be admitted.
+
+        Args:
+            client (str): Identifies the client.
+            cost (int): The cost of the request.
+
+        Returns:
+            str | None: None if the request is admitted, otherwise why it was rejected: queue_full or timeout.
+        """
+        if not self._waiters and self._fits(client, cost):
+            self._take(client, cost)
+            return None
+        if len(self._waiters) >= self.queue_size:
+            return "queue_full"
+        waiter = (client, cost, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        ADMISSION_QUEUED.inc()
+        try:
+            await asyncio.wait({waiter[2]}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            # the client went away while waiting
+            self._abandon(waiter)
+            raise
+        finally:
+            ADMISSION_QUEUED.dec()
+        if waiter[2].done():
+            return None
+        self._abandon(waiter)
+        return "timeout"
+
+    def release(self, client: str, cost: int, hold_time: float):
+        """
+        Return the capacity of a finished request and admit waiting requests that now fit.
+
+        Args:
+            client (str): Identifies the client.
+            cost (int): The cost of the request.
+            hold_time (float): Seconds the request was in progress.
+        """
+        self._in_use -= cost
+        ADMISSION_IN_USE.dec(cost)
+        remaining = self._client_in_use[client] - cost
+        if remaining:
+            self._client_in_use[client] = remaining
+        else:
+            del self._client_in_use[client]
+        self._hold_time += HOLD_TIME_SMOOTHING * (hold_time - self._hold_time)
+        self._grant_waiters()
+
+    def retry_after(self) -> int:
+        """
+        Seconds a rejected client should wait, from the average time requests are in progress and the queue length.
+
+        Returns:
+            int: The value of the Retry-After header, at least 1.
+        """
+        queued = sum(cost for _, cost, _ in self._waiters)
+        return max(1, math.ceil(self._hold_time * (1 + queued / max(self.capacity, 1))))
+
+    def _fits(self, client: str, cost: int) -> bool:
+        in_use = self._client_in_use.get(client, 0)
+        return self._in_use + cost <= self.capacity and in_use + cost <= self.client_capacity
+
+    def _abandon(self, waiter: tuple[str, int, asyncio.Future]):
+        client, cost, future = waiter
+        if future.done():
+            self.release(client, cost, 0)
+            return
+        self._waiters.remove(waiter)
+        future.cancel()
+        # the request may have been holding back the ones queued behind it
+        self._grant_waiters()
+
+    def _take(self, client: str, cost: int):
+        self._in_use += cost
+        ADMISSION_IN_USE.inc(cost)
+        self._client_in_use[client] = self._client_in_use.get(client, 0) + cost
+
+    def _grant_waiters(self):
+        """
+        Admit waiting requests in FIFO order.
+
+        Requests blocked only by their client's cap are skipped, a request blocked by the global cap
+        stops the scan so that expensive requests are not starved by cheaper ones behind them.
+        """
+        for waiter in list(self._waiters):
+            client, cost, future = waiter
+            if self._in_use + cost > self.capacity:
+                break
+            if not self._fits(client, cost):
+                continue
+            self._waiters.remove(waiter)
+            self._take(client, cost)
+            future.set_result(None)
+
+
+def client_key(scope) -> str:
+    """
+    Identify the client of a request for the per-client cap.
+
+    Args:
+        scope (dict): The ASGI scope of the request.
+
+    Returns:
+        str: The `X-Client-Id` header if the request has one, else the client's IP address.
+    """
+    for name, value in scope.get("headers", ()):
+        if name == CLIENT_ID_HEADER and value:
+            return "id:" + value[:CLIENT_ID_MAX_LENGTH].decode("latin-1")
+    return "ip:" + scope["client"][0] if scope.get("client") else "unknown"
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware admitting expensive requests within the global and per-client caps of a controller.
+
+    Clients are told apart by their `X-Client-Id` header, so that the users of a bot calling from one
+    address get their own budgets, and by their IP address otherwise.
+
+    Requests that do not fit wait briefly in the controller's bounded queue, and are rejected with 429
+    and `Retry-After` when the queue is full or the wait times out. A client that disconnects while
+    queued leaves the queue. Capacity is returned once the application has finished with the
+    request, streamed bodies included, whichever way it ends.
+    """
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        cost = self.controller.cost(scope["path"]) if scope["type"] == "http" else 0
+        if cost == 0:
+            await self.app(scope, receive, send)
+            return
+        client = client_key(scope)
+        # incoming messages, read by a watcher task from the start so that a disconnect is noticed while queued
+        messages: asyncio.Queue = asyncio.Queue()
+
+        async def watch():
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    return
+
+        async def receive_message():
+            message = await messages.get()
+            if message["type"] == "http.disconnect":
+                # the watcher has stopped, every later receive must see the disconnect as well
+                messages.put_nowait(message)
+            return message
+
+        # the watcher is only cancelled once the request is over, a receive cancelled halfway may lose a message
+        watcher = asyncio.create_task(watch())
+        try:
+            await self._admit(scope, receive_message, send, client, cost, watcher)
+        finally:
+            watcher.cancel()
+
+    async def _admit(self, scope, receive, send, client: str, cost: int, watcher: asyncio.Task):
+        endpoint = self.controller.endpoint(scope["path"])
+        acquiring = asyncio.ensure_future(self.controller.acquire(client, cost))
+        try:
+            await asyncio.wait({acquiring, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            disconnected = not acquiring.done()
+            if disconnected:
+                # cancelling a queued acquire gives up its place, or returns capacity granted meanwhile
+                acquiring.cancel()
+                try:
+                    await acquiring
+                except asyncio.CancelledError:
+                    pass
+                else:
+                    self.controller.release(client, cost, 0)
+        rejection = "disconnected" if disconnected else acquiring.result()
+        if rejection is not None:
+            ADMISSION_REJECTED.labels(endpoint, rejection).inc()
+            if rejection != "disconnected":
+                response = JSONResponse(
+                    status_code=429,
+                    content={"detail": "Too many requests, retry later."},
+                    headers={"Retry-After": str(self.controller.retry_after())},
+                )
+                await response(scope, receive, send)
+            return
+        start_ts = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(client, cost, time.monotonic() - start_ts)
@@ -0,0 +1,319 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from typing import Any, Optional
+from app.config import CACHE_BACKEND, CACHE_MAX_ENTRIES, CACHE_REDIS_URL, CACHE_SQLITE_PATH
+from app.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger("resources")
+
+
+class Cache(ABC):
+    """
+    Namespaced key-value cache with per-entry TTLs.
+
+    Values must be JSON-serializable so that every backend stores them the same way.
+    Hits and misses are counted per namespace for `stats` and the `cache_requests_total` metric.
+    """
+
+    backend = "base"
+
+    def __init__(self):
+        self._stats: dict[str, dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self._stats_lock = threading.Lock()
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """
+        Get a cached value.
+
+        Args:
+            namespace (str): The namespace of the entry.
+            key (str): The key of the entry.
+
+        Returns:
+            Any | None: The value, or None if it is missing or expired.
+        """
+        value = self._get(namespace, key)
+        result = "miss" if value is None else "hit"
+        CACHE_REQUESTS.labels(namespace, result).inc()
+        with self._stats_lock:
+            self._stats[namespace]["misses" if value is None else "hits"] += 1
+        return value
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        """
+        Store a value.
+
+        Args:
+            namespace (str): The namespace of the entry.
+            key (str): The key of the entry.
+            value (Any): The JSON-serializable value.
+            ttl (float): Seconds the entry stays valid.
+        """
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str):
+        """
+        Remove an entry.
+
+        Args:
+            namespace (str): The namespace of the entry.
+            key (str): The key of the entry.
+        """
+
+    @abstractmethod
+    def invalidate(self, namespace: str):
+        """
+        Remove every entry of a namespace.
+
+        Args:
+            namespace (str): The namespace.
+        """
+
+    def stats(self) -> dict:
+        """
+        Hit and miss counts per namespace observed by this process, and the number of stored entries.
+
+        Returns:
+            dict: The backend name, entry count and per-namespace counters.
+        """
+        with self._stats_lock:
+            namespaces = {
+                namespace: {**counts, "hit_rate": round(counts["hits"] / max(counts["hits"] + counts["misses"], 1), 4)}
+                for namespace, counts in self._stats.items()
+            }
+        return {"backend": self.backend, "entries": self._size(), "namespaces": namespaces}
+
+    @abstractmethod
+    def _get(self, namespace: str, key: str) -> Optional[Any]:
+        """
+        Get a cached value without counting the lookup.
+
+        Args:
+            namespace (str): The namespace of the entry.
+            key (str): The key of the entry.
+
+        Returns:
+            Any | None: The value, or None if it is missing or expired.
+        """
+
+    @abstractmethod
+    def _size(self) -> int:
+        """
+        Number of entries stored by the cache.
+
+        Returns:
+            int: The entry count.
+        """
+
+
+class LRUCache(Cache):
+    """
+    In-process cache evicting the least recently used entries.
+
+    Attributes:
+        max_entries (int): Maximum number of stored entries.
+    """
+
+    backend = "memory"
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        super().__init__()
+        self.max_entries = max_entries
+        # (namespace, key) -> (expires_at, value)
+        self._entries: OrderedDict[tuple[str, str], tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, namespace: str, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[(namespace, key)]
+                return None
+            self._entries.move_to_end((namespace, key))
+            return entry[1]
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._entries[(namespace, key)] = (time.time() + ttl, value)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._entries.pop((namespace, key), None)
+
+    def invalidate(self, namespace: str):
+        with self._lock:
+            for entry_key in [entry_key for entry_key in self._entries if entry_key[0] == namespace]:
+                del self._entries[entry_key]
+
+    def _size(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache(Cache):
+    """
+    Cache shared by every worker on a host through a SQLite file, ideally on a RAM-backed filesystem like /dev/shm.
+
+    Attributes:
+        path (str): Path of the SQLite database.
+        max_entries (int): Number of entries above which expired entries are purged.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path: str = CACHE_SQLITE_PATH, max_entries: int = CACHE_MAX_ENTRIES):
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        db = self._db()
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+
+    def _db(self) -> sqlite3.Connection:
+        """
+        Connection of the current thread, sqlite3 connections cannot be shared between threads.
+
+        Returns:
+            sqlite3.Connection: The connection.
+        """
+        db = getattr(self._local, "db", None)
+        if db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=OFF")
+            self._local.db = db
+        return db
+
+    def _get(self, namespace: str, key: str) -> Optional[Any]:
+        row = self._db().execute(
+            "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?", (namespace, key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        db = self._db()
+        db.execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value), time.time() + ttl),
+        )
+        self._writes += 1
+        if self._writes % 1000 == 0 and self._size() > self.max_entries:
+            db.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+
+    def delete(self, namespace: str, key: str):
+        self._db().execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def invalidate(self, namespace: str):
+        self._db().execute("DELETE FROM cache WHERE namespace = ?", (namespace,))
+
+    def _size(self) -> int:
+        return self._db().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+class RedisCache(Cache):
+    """
+    Cache shared by every worker through Redis or a Redis-compatible server.
+
+    Namespaces are invalidated in O(1) by bumping a generation counter that is part of every key,
+    the old entries expire on their own.
+
+    Attributes:
+        url (str): The Redis URL.
+        prefix (str): Prefix of every key written by the cache.
+    """
+
+    backend = "redis"
+
+    def __init__(self, url: str = CACHE_REDIS_URL, prefix: str = "scb"):
+        super().__init__()
+        # redis is only needed, and only imported, when this backend is configured
+        import redis
+
+        self.url = url
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url)
+
+    def _key(self, namespace: str, key: str) -> str:
+        generation = int(self._redis.get(f"{self.prefix}:{namespace}:generation") or 0)
+        return f"{self.prefix}:{namespace}:{generation}:{key}"
+
+    def _get(self, namespace: str, key: str) -> Optional[Any]:
+        value = self._redis.get(self._key(namespace, key))
+        return json.loads(value) if value is not None else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        self._redis.set(self._key(namespace, key), json.dumps(value), px=max(int(ttl * 1000), 1))
+
+    def delete(self, namespace: str, key: str):
+        self._redis.delete(self._key(namespace, key))
+
+    def invalidate(self, namespace: str):
+        self._redis.incr(f"{self.prefix}:{namespace}:generation")
+
+    def _size(self) -> int:
+        # only the keys of this cache, the database may be shared; entries of invalidated generations
+        # count until they expire
+        return sum(
+            1
+            for key in self._redis.scan_iter(match=f"{self.prefix}:*", count=1000)
+            if not key.endswith(b":generation")
+        )
+
+
+_cache: Optional[Cache] = None
+_cache_lock = threading.Lock()
+
+
+def create_cache(backend: str = CACHE_BACKEND) -> Cache:
+    """
+    Build a cache for the configured backend.
+
+    Args:
+        backend (str): memory, sqlite or redis.
+
+    Returns:
+        Cache: The cache.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    if backend == "memory":
+        return LRUCache()
+    if backend == "sqlite":
+        return SQLiteCache()
+    if backend == "redis":
+        return RedisCache()
+    raise ValueError(f"Unknown cache backend {backend}, expected memory, sqlite or redis.")
+
+
+def get_cache() -> Cache:
+    """
+    Get the process-wide cache, creating it on first use.
+
+    Returns:
+        Cache: The cache.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = create_cache()
+                logger.info(f"Using {_cache.backend} cache backend")
+    return _cache
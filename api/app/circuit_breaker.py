@@ -0,0 +1,170 @@
+import logging
+import threading
+import time
+from app.config import BREAKER_FAILURE_THRESHOLD, BREAKER_HALF_OPEN_CALLS, BREAKER_RECOVERY_TIMEOUT
+from app.metrics import CIRCUIT_REJECTED, CIRCUIT_STATE
+
+logger = logging.getLogger("resources")
+
+# Breaker states, exported as the value of the `circuit_breaker_state` metric
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling a dependency whose circuit is open.
+
+    Attributes:
+        dependency (str): The name of the dependency.
+        retry_after (float): Seconds until the breaker lets a trial call through.
+    """
+
+    def __init__(self, dependency: str, retry_after: float):
+        # not super(): subclasses may also derive from exceptions with their own constructor
+        Exception.__init__(self, f"{dependency} is unavailable, retry in {retry_after:.0f}s")
+        self.dependency = dependency
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of one external dependency.
+
+    Closed: calls go through, `failure_threshold` consecutive failures open the circuit.
+    Open: calls fail fast with `CircuitOpenError` for `recovery_timeout` seconds.
+    Half-open: up to `half_open_calls` trial calls go through, a success closes the circuit and a
+    failure opens it again.
+
+    Attributes:
+        name (str): The name of the dependency, used as the metric label.
+        failure_threshold (int): Consecutive failures opening the circuit.
+        recovery_timeout (float): Seconds the circuit stays open before trial calls are let through.
+        half_open_calls (int): Concurrent trial calls allowed while half-open.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        recovery_timeout: float = BREAKER_RECOVERY_TIMEOUT,
+        half_open_calls: int = BREAKER_HALF_OPEN_CALLS,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_calls = half_open_calls
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trials = 0
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.labels(name).set(STATE_VALUES[CLOSED])
+
+    @property
+    def state(self) -> str:
+        """
+        The current state, moving from open to half-open once the recovery timeout has passed.
+
+        Returns:
+            str: closed, half_open or open.
+        """
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                self._set_state(HALF_OPEN)
+            return self._state
+
+    def before_call(self):
+        """
+        Check that a call may go through, call `record_success` or `record_failure` after it.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with all trial calls in flight.
+        """
+        with self._lock:
+            if self._state == OPEN:
+                remaining = self.recovery_timeout - (time.monotonic() - self._opened_at)
+                if remaining > 0:
+                    CIRCUIT_REJECTED.labels(self.name).inc()
+                    raise CircuitOpenError(self.name, remaining)
+                self._set_state(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                if self._trials >= self.half_open_calls:
+                    CIRCUIT_REJECTED.labels(self.name).inc()
+                    raise CircuitOpenError(self.name, self.recovery_timeout)
+                self._trials += 1
+
+    def record_success(self):
+        """
+        Record a successful call, closing a half-open circuit.
+        """
+        with self._lock:
+            self._failures = 0
+            if self._state == HALF_OPEN:
+                self._trials -= 1
+                self._set_state(CLOSED)
+                logger.info(f"Circuit of {self.name} closed")
+
+    def record_failure(self):
+        """
+        Record a failed call, opening the circuit after too many consecutive failures or a failed trial call.
+        """
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN:
+                self._trials -= 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._set_state(OPEN)
+                logger.warning(f"Circuit of {self.name} opened after {self._failures} consecutive failures")
+
+    def record_cancelled(self):
+        """
+        Record a call given up before its outcome was known, e.g. because the request ran out of time.
+
+        It counts neither as a success nor as a failure, a trial call only gives its slot back.
+        """
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._trials -= 1
+
+    def _set_state(self, state: str):
+        self._state = state
+        if state != HALF_OPEN:
+            self._trials = 0
+        CIRCUIT_STATE.labels(self.name).set(STATE_VALUES[state])
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """
+    Get the process-wide circuit breaker of a dependency, creating it on first use.
+
+    Args:
+        name (str): The name of the dependency, e.g. "dexscreener" or "solana_rpc".
+
+    Returns:
+        CircuitBreaker: The breaker.
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+def breaker_states() -> dict[str, str]:
+    """
+    The state of every circuit breaker created so far.
+
+    Returns:
+        dict[str, str]: State per dependency.
+    """
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.state for breaker in breakers}
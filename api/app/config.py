@@ -14,5 +14,131 @@ POSTGRES_PASSWORD = os.environ.get("POSTGRES_PASSWORD", "admin")
 # Default PostgreSQL database name is "postgres" unless specified in the environment
 POSTGRES_DB = os.environ.get("POSTGRES_DB", "postgres")
 
+# Default PostgreSQL host is the "db" service from docker-compose unless specified in the environment
+POSTGRES_HOST = os.environ.get("POSTGRES_HOST", "db")
+
+# SQLAlchemy URL of a read replica serving read-only requests, reads go to the primary if empty
+POSTGRES_REPLICA_URL = os.environ.get("POSTGRES_REPLICA_URL", "")
+
 # Solana RPC URL should be specified in the environment
 SOLANA_RPC_URL = os.environ.get("SOLANA_RPC_URL")
+
+# Dexscreener API base URL, overridable to point the service at a mock upstream
+DEXSCREENER_API_URL = os.environ.get("DEXSCREENER_API_URL", "https://api.dexscreener.io")
+
+# Seconds a Dexscreener response is reused before it is fetched again
+DEXSCREENER_CACHE_TTL = float(os.environ.get("DEXSCREENER_CACHE_TTL", 30))
+
+# Seconds the last Dexscreener response is kept to be served when Dexscreener is unavailable
+DEXSCREENER_STALE_TTL = float(os.environ.get("DEXSCREENER_STALE_TTL", 3600))
+
+# Timeout of a Dexscreener request in seconds
+DEXSCREENER_TIMEOUT = float(os.environ.get("DEXSCREENER_TIMEOUT", 5))
+
+# Trace exporter: "none" disables tracing, "json" appends traces to TRACING_JSON_PATH,
+# "zipkin" posts them to a Zipkin-compatible collector (Zipkin, Jaeger, OpenTelemetry Collector)
+TRACING_EXPORTER = os.environ.get("TRACING_EXPORTER", "none")
+TRACING_JSON_PATH = os.environ.get("TRACING_JSON_PATH", "traces/traces.jsonl")
+TRACING_COLLECTOR_URL = os.environ.get("TRACING_COLLECTOR_URL", "http://localhost:9411/api/v2/spans")
+
+# Fraction of requests traced without the X-Trace header
+TRACING_SAMPLE_RATE = float(os.environ.get("TRACING_SAMPLE_RATE", 0))
+
+# Admin token enabling the sampling profiler through the X-Profile header, profiling is disabled if empty
+PROFILING_ADMIN_TOKEN = os.environ.get("PROFILING_ADMIN_TOKEN", "")
+PROFILING_DIR = os.environ.get("PROFILING_DIR", "profiles")
+PROFILING_INTERVAL = float(os.environ.get("PROFILING_INTERVAL", 0.005))
+
+# Comma-separated RPC endpoints as `url|weight|requests per second`, e.g.
+# "https://a.example|3|50,https://b.example|1|10". Falls back to SOLANA_RPC_URL when empty
+SOLANA_RPC_URLS = os.environ.get("SOLANA_RPC_URLS", "")
+
+# Seconds before a slow RPC read is hedged to a second endpoint, 0 disables hedging
+RPC_HEDGE_DELAY = float(os.environ.get("RPC_HEDGE_DELAY", 2))
+
+# Consecutive failures after which an endpoint is ejected, and seconds between health checks of ejected endpoints
+RPC_EJECT_AFTER_FAILURES = int(os.environ.get("RPC_EJECT_AFTER_FAILURES", 3))
+RPC_HEALTH_CHECK_INTERVAL = float(os.environ.get("RPC_HEALTH_CHECK_INTERVAL", 10))
+
+# Timeout of a single RPC HTTP request in seconds
+RPC_REQUEST_TIMEOUT = float(os.environ.get("RPC_REQUEST_TIMEOUT", 30))
+
+# Seconds before a failed RPC call is retried once
+RPC_RETRY_DELAY = float(os.environ.get("RPC_RETRY_DELAY", 15))
+
+# Worker processes decoding fetched transactions into token balance changes, 0 decodes them in the calling thread
+TX_PARSE_WORKERS = int(os.environ.get("TX_PARSE_WORKERS", os.cpu_count() or 1))
+
+# Circuit breakers of Dexscreener and the Solana RPC: consecutive failures opening the circuit,
+# seconds it stays open before trial calls, and concurrent trial calls while half-open
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", 5))
+BREAKER_RECOVERY_TIMEOUT = float(os.environ.get("BREAKER_RECOVERY_TIMEOUT", 30))
+BREAKER_HALF_OPEN_CALLS = int(os.environ.get("BREAKER_HALF_OPEN_CALLS", 1))
+
+# Cache-Control max-age of /get_token_info responses in seconds
+TOKEN_INFO_MAX_AGE = int(float(os.environ.get("TOKEN_INFO_MAX_AGE", DEXSCREENER_CACHE_TTL)))
+
+# Seconds holder balances are served from the database before /get_holders_info refreshes them,
+# also used as the Cache-Control max-age of its responses
+HOLDERS_INFO_MAX_AGE = int(float(os.environ.get("HOLDERS_INFO_MAX_AGE", 60)))
+
+# Maximum number of addresses accepted by one /add_tokens request
+ADD_TOKENS_LIMIT = int(os.environ.get("ADD_TOKENS_LIMIT", 1000))
+
+# Number of rows fetched from the server-side cursor and written per chunk by the export endpoints
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 10000))
+
+# Cache backend shared by the services: memory (per-process LRU), sqlite (file shared by the workers
+# of a host, e.g. in /dev/shm) or redis
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+
+# Maximum number of entries of the in-process cache, and purge threshold of the SQLite cache
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 10000))
+
+# Path of the SQLite cache database
+CACHE_SQLITE_PATH = os.environ.get("CACHE_SQLITE_PATH", "/dev/shm/solana_chat_bot_cache.sqlite")
+
+# URL of the Redis cache
+CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+# Number of address -> token ID mappings cached by every process, and seconds a mapping is kept
+TOKEN_ID_CACHE_SIZE = int(os.environ.get("TOKEN_ID_CACHE_SIZE", 100000))
+TOKEN_ID_CACHE_TTL = float(os.environ.get("TOKEN_ID_CACHE_TTL", 86400))
+
+# Number of crawl workers, also the maximum number of token crawls started at the same time
+CRAWL_CONCURRENCY = int(os.environ.get("CRAWL_CONCURRENCY", 4))
+
+# Seconds a running crawl may go without progress before it is taken as abandoned by a stopped worker
+# and can be claimed again; running crawls record their progress three times per period
+CRAWL_STALE_AFTER = float(os.environ.get("CRAWL_STALE_AFTER", 900))
+
+# Share multiplier of the crawl of a token queried within the last CRAWL_QUERY_BOOST_WINDOW seconds
+CRAWL_QUERY_BOOST = float(os.environ.get("CRAWL_QUERY_BOOST", 4))
+CRAWL_QUERY_BOOST_WINDOW = float(os.environ.get("CRAWL_QUERY_BOOST_WINDOW", 300))
+
+# Transactions folded into the holder ledger per batch, each batch is committed with the watermark
+LEDGER_BATCH_SIZE = int(os.environ.get("LEDGER_BATCH_SIZE", 100))
+
+# Maximum number of batches folded by one POST /update_ledger request, the next request continues the fold
+LEDGER_BATCHES_PER_REQUEST = int(os.environ.get("LEDGER_BATCHES_PER_REQUEST", 10))
+
+# 1 builds the holder ledger during the onboarding crawl, one getTransaction call per transaction of the
+# token's history; 0 (default) only when it is requested
+LEDGER_ON_CRAWL = int(os.environ.get("LEDGER_ON_CRAWL", 0))
+
+# Admission control of expensive endpoints, per worker: maximum total cost of the requests in progress,
+# globally and per client, see app/admission.py for the cost of each endpoint
+ADMISSION_CAPACITY = int(os.environ.get("ADMISSION_CAPACITY", 32))
+ADMISSION_CLIENT_CAPACITY = int(os.environ.get("ADMISSION_CLIENT_CAPACITY", 12))
+
+# Maximum number of requests waiting for admission and seconds they wait before a 429
+ADMISSION_QUEUE_SIZE = int(os.environ.get("ADMISSION_QUEUE_SIZE", 64))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", 1))
+
+# Comma-separated endpoint cost overrides as `/endpoint=cost`, e.g. "/get_holders_info=6,/export=0"
+ADMISSION_COSTS = os.environ.get("ADMISSION_COSTS", "")
+
+# Seconds a request is given before its remaining RPC, HTTP and database work is cancelled with a 504,
+# and the longest deadline a client may ask for with the X-Request-Deadline header
+REQUEST_DEADLINE = float(os.environ.get("REQUEST_DEADLINE", 30))
+REQUEST_DEADLINE_MAX = float(os.environ.get("REQUEST_DEADLINE_MAX", 120))
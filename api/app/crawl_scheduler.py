@@ -0,0 +1,275 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, Iterator, NamedTuple, Optional
+from app.config import CRAWL_CONCURRENCY, CRAWL_QUERY_BOOST, CRAWL_QUERY_BOOST_WINDOW
+from app.metrics import CRAWL_STEPS, CRAWL_TOKENS
+
+logger = logging.getLogger("resources")
+
+# Weight of the step duration just measured in the moving average of a crawl's step interval
+STEP_INTERVAL_SMOOTHING = 0.3
+
+
+class CrawlStep(NamedTuple):
+    """
+    Progress reported by a crawl after each step, one step being about one RPC page.
+
+    Attributes:
+        phase (str): The phase of the crawl the step belongs to, e.g. "signatures".
+        items (int): Number of items stored by the step.
+        remaining (int | None): Estimated number of steps left, None if unknown.
+    """
+
+    phase: str
+    items: int
+    remaining: Optional[int]
+
+
+class CrawlProgress(NamedTuple):
+    """
+    Progress of a crawl held by the scheduler.
+
+    Attributes:
+        state (str): queued or running.
+        phase (str | None): The phase of the last step.
+        steps (int): Number of steps run.
+        items (int): Number of items stored.
+        weight (float): The current scheduling weight.
+        eta_seconds (float | None): Estimated seconds until the crawl finishes, None if unknown.
+    """
+
+    state: str
+    phase: Optional[str]
+    steps: int
+    items: int
+    weight: float
+    eta_seconds: Optional[float]
+
+
+class _Crawl:
+    """
+    A crawl held by the scheduler and its bookkeeping.
+    """
+
+    def __init__(self, key: str, steps: Iterator[CrawlStep], on_done: Callable[[Optional[Exception]], None]):
+        self.key = key
+        self.steps = steps
+        self.on_done = on_done
+        self.finish_tag = 0.0
+        self.running = False
+        self.last_queried = 0.0
+        self.phase: Optional[str] = None
+        self.step_count = 0
+        self.items = 0
+        self.remaining: Optional[int] = None
+        self.last_step_ts: Optional[float] = None
+        self.step_interval: Optional[float] = None
+
+
+class CrawlScheduler:
+    """
+    Runs token crawls step by step on a fixed number of workers, interleaving them with weighted fair queuing.
+
+    Every crawl is a generator yielding a `CrawlStep` after each RPC page. A worker runs one step of the
+    crawl with the smallest virtual finish tag and puts it back with a tag advanced by `1 / weight`
+    (self-clocked fair queuing), so a token with a million signatures gets the same share of the RPC
+    budget as a small one instead of holding it until it is done. Tokens queried within
+    `CRAWL_QUERY_BOOST_WINDOW` seconds get `CRAWL_QUERY_BOOST` times the share.
+
+    At most `concurrency` crawls are started at a time, so the state a crawl keeps between its steps
+    is bounded by the number of workers. Later crawls wait in submission order, queried ones first,
+    and start as others finish.
+
+    Attributes:
+        concurrency (int): Number of workers, the maximum number of crawls fetching at the same time.
+    """
+
+    def __init__(self, concurrency: int = CRAWL_CONCURRENCY):
+        self.concurrency = concurrency
+        self._crawls: dict[str, _Crawl] = {}
+        # crawls not started yet, in submission order
+        self._waiting: list[_Crawl] = []
+        self._queue: list[tuple[float, int, _Crawl]] = []
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        self._step_duration: Optional[float] = None
+        self._cond = threading.Condition()
+        self._workers: list[threading.Thread] = []
+
+    def submit(
+        self, key: str, steps: Iterator[CrawlStep], on_done: Callable[[Optional[Exception]], None]
+    ) -> bool:
+        """
+        Schedule a crawl, unless one with the same key is already scheduled.
+
+        Args:
+            key (str): Identifies the crawl, the address of the token.
+            steps (Iterator[CrawlStep]): The crawl, advanced one step at a time.
+            on_done (Callable[[Exception | None], None]): Called by the worker with the error that ended
+                the crawl, or None when it finished.
+
+        Returns:
+            bool: Whether the crawl was scheduled.
+        """
+        with self._cond:
+            if key in self._crawls:
+                return False
+            crawl = self._crawls[key] = _Crawl(key, steps, on_done)
+            self._waiting.append(crawl)
+            CRAWL_TOKENS.labels("queued").inc()
+            self._start_waiting()
+            self._start_workers()
+        logger.info(f"Scheduled crawl of {key}, {len(self._crawls)} crawls in the scheduler")
+        return True
+
+    def touch(self, key: str):
+        """
+        Record that a token is being queried, boosting its crawl for `CRAWL_QUERY_BOOST_WINDOW` seconds.
+
+        Args:
+            key (str): The address of the token.
+        """
+        with self._cond:
+            crawl = self._crawls.get(key)
+            if crawl is not None:
+                crawl.last_queried = time.monotonic()
+
+    def progress(self, key: str) -> Optional[CrawlProgress]:
+        """
+        Get the progress of a scheduled crawl.
+
+        The ETA multiplies the steps the crawl expects to have left by the interval between its
+        recent steps, which already accounts for its share of the workers. Before its second step
+        the average step duration scaled by the number of crawls per worker is used instead.
+
+        Args:
+            key (str): The address of the token.
+
+        Returns:
+            CrawlProgress | None: The progress, or None if the crawl is not in the scheduler.
+        """
+        with self._cond:
+            crawl = self._crawls.get(key)
+            if crawl is None:
+                return None
+            interval = crawl.step_interval
+            if interval is None and self._step_duration is not None:
+                started = len(self._crawls) - len(self._waiting)
+                interval = self._step_duration * max(started / self.concurrency, 1)
+            eta = None
+            if crawl.remaining is not None and interval is not None:
+                eta = round(crawl.remaining * interval, 1)
+            return CrawlProgress(
+                state="running" if crawl.running else "queued",
+                phase=crawl.phase,
+                steps=crawl.step_count,
+                items=crawl.items,
+                weight=self._weight(crawl),
+                eta_seconds=eta,
+            )
+
+    def _weight(self, crawl: _Crawl) -> float:
+        if crawl.last_queried and time.monotonic() - crawl.last_queried < CRAWL_QUERY_BOOST_WINDOW:
+            return float(CRAWL_QUERY_BOOST)
+        return 1.0
+
+    def _start_waiting(self):
+        started = len(self._crawls) - len(self._waiting)
+        while self._waiting and started < self.concurrency:
+            crawl = next((crawl for crawl in self._waiting if self._weight(crawl) > 1), self._waiting[0])
+            self._waiting.remove(crawl)
+            self._enqueue(crawl)
+            started += 1
+            self._cond.notify()
+
+    def _enqueue(self, crawl: _Crawl):
+        crawl.finish_tag = max(self._virtual_time, crawl.finish_tag) + 1 / self._weight(crawl)
+        heapq.heappush(self._queue, (crawl.finish_tag, next(self._sequence), crawl))
+
+    def _start_workers(self):
+        while len(self._workers) < self.concurrency:
+            worker = threading.Thread(target=self._work, name=f"crawl-worker-{len(self._workers)}", daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                finish_tag, _, crawl = heapq.heappop(self._queue)
+                self._virtual_time = finish_tag
+                crawl.running = True
+                CRAWL_TOKENS.labels("queued").dec()
+                CRAWL_TOKENS.labels("running").inc()
+
+            start_ts = time.monotonic()
+            error = None
+            finished = False
+            try:
+                step = next(crawl.steps)
+            except StopIteration:
+                finished = True
+            except Exception as e:
+                logger.error(f"Crawl of {crawl.key} failed: {str(e)}")
+                error = e
+                finished = True
+            end_ts = time.monotonic()
+
+            with self._cond:
+                crawl.running = False
+                CRAWL_TOKENS.labels("running").dec()
+                if finished:
+                    del self._crawls[crawl.key]
+                    self._start_waiting()
+                else:
+                    self._record_step(crawl, step, start_ts, end_ts)
+                    self._enqueue(crawl)
+                    CRAWL_TOKENS.labels("queued").inc()
+                    self._cond.notify()
+            if finished:
+                try:
+                    crawl.on_done(error)
+                except Exception as e:
+                    logger.error(f"Failed to finish crawl of {crawl.key}: {str(e)}")
+
+    def _record_step(self, crawl: _Crawl, step: CrawlStep, start_ts: float, end_ts: float):
+        CRAWL_STEPS.labels(step.phase).inc()
+        crawl.phase = step.phase
+        crawl.step_count += 1
+        crawl.items += step.items
+        crawl.remaining = step.remaining
+        duration = end_ts - start_ts
+        if self._step_duration is None:
+            self._step_duration = duration
+        else:
+            self._step_duration += STEP_INTERVAL_SMOOTHING * (duration - self._step_duration)
+        if crawl.last_step_ts is not None:
+            interval = end_ts - crawl.last_step_ts
+            if crawl.step_interval is None:
+                crawl.step_interval = interval
+            else:
+                crawl.step_interval += STEP_INTERVAL_SMOOTHING * (interval - crawl.step_interval)
+        crawl.last_step_ts = end_ts
+
+
+_scheduler: Optional[CrawlScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> CrawlScheduler:
+    """
+    Get the process-wide crawl scheduler, creating it on first use.
+
+    Returns:
+        CrawlScheduler: The scheduler.
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = CrawlScheduler()
+    return _scheduler
@@ -0,0 +1,271 @@
+import asyncio
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.config import REQUEST_DEADLINE, REQUEST_DEADLINE_MAX
+from app.metrics import DEADLINE_EXCEEDED
+
+# Request header with which a client sets a shorter or longer deadline for its request, in seconds
+DEADLINE_HEADER = "X-Request-Deadline"
+
+# SQLSTATE of a statement cancelled by `statement_timeout`
+QUERY_CANCELED = "57014"
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when a request runs out of time, or its client disconnects, before a step is done.
+
+    Attributes:
+        step (str): The step that ran out of time, e.g. "rpc.get_token_accounts_by_owner", "dexscreener" or "db".
+        reason (str): timeout or disconnected.
+    """
+
+    def __init__(self, step: str, reason: str):
+        super().__init__(f"Request deadline exceeded during {step} ({reason})")
+        self.step = step
+        self.reason = reason
+
+
+class Deadline:
+    """
+    Deadline of one request, shared by every step the request runs, in any thread.
+
+    The deadline is released once the response starts, so background tasks and streamed bodies
+    that run after it are not cut short.
+
+    Attributes:
+        timeout (float): Seconds the request was given.
+        expires_at (float): `time.monotonic()` at which the request runs out of time.
+        exceeded (DeadlineExceeded | None): The first step that ran out of time, if any.
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+        self.exceeded: Optional[DeadlineExceeded] = None
+        self._disconnected = False
+        self._released = False
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        """
+        Whether the deadline still bounds the request, it stops once the response starts.
+
+        Returns:
+            bool: False once released.
+        """
+        return not self._released
+
+    def remaining(self) -> float:
+        """
+        Seconds left until the deadline.
+
+        Returns:
+            float: The seconds left, 0 if the client disconnected, infinite once released.
+        """
+        if self._released:
+            return float("inf")
+        if self._disconnected:
+            return 0.0
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def check(self, step: str):
+        """
+        Check that the request may go on with a step.
+
+        Args:
+            step (str): The step about to run.
+
+        Raises:
+            DeadlineExceeded: If the request ran out of time or its client disconnected.
+        """
+        if self.remaining() <= 0:
+            raise self.exceed(step)
+
+    def exceed(self, step: str) -> DeadlineExceeded:
+        """
+        Record that a step ran out of time.
+
+        Args:
+            step (str): The step.
+
+        Returns:
+            DeadlineExceeded: The error to raise, naming the first step that ran out of time.
+        """
+        with self._lock:
+            if self.exceeded is None:
+                self.exceeded = DeadlineExceeded(step, "disconnected" if self._disconnected else "timeout")
+                DEADLINE_EXCEEDED.labels(step.split(".", 1)[0], self.exceeded.reason).inc()
+            return DeadlineExceeded(self.exceeded.step, self.exceeded.reason)
+
+    def disconnect(self):
+        """
+        Cancel the remaining work of a request whose client went away.
+        """
+        self._disconnected = True
+
+    def release(self):
+        """
+        Stop bounding the request, called once its response starts.
+        """
+        self._released = True
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("current_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """
+    The deadline of the request being served, if any.
+
+    Returns:
+        Deadline | None: The deadline, or None outside requests, e.g. in crawl workers.
+    """
+    deadline = _current_deadline.get()
+    return deadline if deadline is not None and deadline.active else None
+
+
+def check_deadline(step: str):
+    """
+    Check that the current request, if any, may go on with a step.
+
+    Args:
+        step (str): The step about to run.
+
+    Raises:
+        DeadlineExceeded: If the request ran out of time or its client disconnected.
+    """
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check(step)
+
+
+def time_left(step: str, limit: Optional[float] = None) -> Optional[float]:
+    """
+    Timeout of a blocking call: its own limit, shortened to the time the current request has left.
+
+    Args:
+        step (str): The step about to run.
+        limit (float | None): The timeout of the call without a deadline, None for no timeout.
+
+    Returns:
+        float | None: The timeout, None if there is neither a limit nor a deadline.
+
+    Raises:
+        DeadlineExceeded: If the request already ran out of time or its client disconnected.
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return limit
+    deadline.check(step)
+    remaining = deadline.remaining()
+    return remaining if limit is None else min(limit, remaining)
+
+
+def request_timeout(header_value: Optional[str]) -> float:
+    """
+    Seconds a request is given: `REQUEST_DEADLINE`, or the client's `X-Request-Deadline` up to `REQUEST_DEADLINE_MAX`.
+
+    Args:
+        header_value (str | None): The value of the `X-Request-Deadline` header.
+
+    Returns:
+        float: The timeout.
+    """
+    try:
+        requested = float(header_value) if header_value else None
+    except ValueError:
+        requested = None
+    if requested is None or requested <= 0:
+        return REQUEST_DEADLINE
+    return min(requested, REQUEST_DEADLINE_MAX)
+
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware giving every HTTP request a deadline and cancelling it when the client disconnects.
+
+    The incoming messages are read by a watcher task as they arrive and handed to the application
+    on demand, so a disconnect is noticed while the endpoint is still working, not only when it
+    next reads from the client.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        deadline = Deadline(request_timeout(headers.get(DEADLINE_HEADER.lower().encode(), b"").decode()))
+        messages: asyncio.Queue = asyncio.Queue()
+
+        async def watch():
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    deadline.disconnect()
+                    return
+
+        async def receive_message():
+            message = await messages.get()
+            if message["type"] == "http.disconnect":
+                # the watcher has stopped, every later receive must see the disconnect as well
+                messages.put_nowait(message)
+            return message
+
+        async def send_message(message):
+            if message["type"] == "http.response.start":
+                deadline.release()
+            await send(message)
+
+        watcher = asyncio.create_task(watch())
+        token = _current_deadline.set(deadline)
+        try:
+            await self.app(scope, receive_message, send_message)
+        finally:
+            _current_deadline.reset(token)
+            watcher.cancel()
+
+
+def apply_deadlines(engine: Engine):
+    """
+    Register SQLAlchemy event listeners bounding the statements of a request by its deadline.
+
+    No statement starts once the request ran out of time. On PostgreSQL every transaction begun
+    by a request also gets a `statement_timeout` of the time the request has left, and a
+    statement cancelled by it raises `DeadlineExceeded`.
+
+    Args:
+        engine (Engine): The SQLAlchemy engine.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        check_deadline("db")
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        deadline = current_deadline()
+        if deadline is not None and getattr(context.original_exception, "pgcode", None) == QUERY_CANCELED:
+            raise deadline.exceed("db") from context.original_exception
+
+    # The session listener covers the transactions of every engine, register it once
+    if not event.contains(Session, "after_begin", _limit_transaction):
+        event.listen(Session, "after_begin", _limit_transaction)
+
+
+def _limit_transaction(session, transaction, connection):
+    deadline = current_deadline()
+    if deadline is None or connection.dialect.name != "postgresql":
+        return
+    timeout_ms = max(int(deadline.remaining() * 1000), 1)
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
@@ -0,0 +1,62 @@
+import hashlib
+from typing import Optional
+from fastapi import Response
+
+
+def make_etag(*parts) -> str:
+    """
+    Build a strong ETag from the values a response depends on.
+
+    Args:
+        *parts: Values identifying the response content, e.g. a token ID and a timestamp.
+
+    Returns:
+        str: The quoted ETag.
+    """
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an `If-None-Match` request header against an ETag.
+
+    Args:
+        if_none_match (str | None): The request header value.
+        etag (str): The current ETag of the resource.
+
+    Returns:
+        bool: True if the client already has the current representation.
+    """
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in (candidate.removeprefix("W/") for candidate in candidates)
+
+
+def cache_headers(etag: str, max_age: int) -> dict[str, str]:
+    """
+    Caching headers for a response.
+
+    Args:
+        etag (str): The ETag of the response.
+        max_age (int): Seconds the response may be reused by clients and shared caches.
+
+    Returns:
+        dict[str, str]: The `ETag` and `Cache-Control` headers.
+    """
+    return {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+
+
+def not_modified(etag: str, max_age: int) -> Response:
+    """
+    Build a `304 Not Modified` response.
+
+    Args:
+        etag (str): The ETag of the resource.
+        max_age (int): Seconds the response may be reused by clients and shared caches.
+
+    Returns:
+        Response: The empty 304 response.
+    """
+    return Response(status_code=304, headers=cache_headers(etag, max_age))
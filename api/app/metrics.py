@@ -0,0 +1,144 @@
+import functools
+import time
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+# Latency buckets in seconds, wide enough to cover slow RPC pages and full holder refreshes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+RPC_LATENCY = Histogram(
+    "solana_rpc_latency_seconds", "Latency of Solana RPC calls.", ["method"], buckets=LATENCY_BUCKETS
+)
+RPC_RETRIES = Counter("solana_rpc_retries_total", "Solana RPC calls retried after a failure.", ["method"])
+RPC_RATE_LIMITED = Counter("solana_rpc_rate_limited_total", "Solana RPC calls answered with HTTP 429.", ["method"])
+RPC_ERRORS = Counter("solana_rpc_errors_total", "Solana RPC calls that failed.", ["method"])
+RPC_ENDPOINT_REQUESTS = Counter(
+    "solana_rpc_endpoint_requests_total", "Solana RPC calls per pool endpoint by outcome.", ["endpoint", "outcome"]
+)
+RPC_ENDPOINT_HEALTHY = Gauge("solana_rpc_endpoint_healthy", "Whether a pool endpoint is in rotation.", ["endpoint"])
+RPC_HEDGED = Counter("solana_rpc_hedged_total", "Slow Solana RPC reads hedged to a second endpoint.", ["method"])
+
+CIRCUIT_STATE = Gauge(
+    "circuit_breaker_state", "Circuit breaker state of a dependency: 0 closed, 1 half-open, 2 open.", ["dependency"]
+)
+CIRCUIT_REJECTED = Counter(
+    "circuit_breaker_rejected_total", "Calls failed fast by an open circuit breaker.", ["dependency"]
+)
+CIRCUIT_FALLBACKS = Counter(
+    "circuit_breaker_fallbacks_total", "Requests served from stale data because a dependency failed.", ["dependency"]
+)
+DEADLINE_EXCEEDED = Counter(
+    "request_deadline_exceeded_total",
+    "Requests cancelled by their deadline, by kind of step (rpc, dexscreener, db) and reason.",
+    ["step", "reason"],
+)
+
+DEX_LATENCY = Histogram("dexscreener_latency_seconds", "Latency of Dexscreener API calls.", buckets=LATENCY_BUCKETS)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by namespace and result (hit or miss).", ["namespace", "result"]
+)
+
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "Duration of SQL statements by verb.", ["statement"], buckets=LATENCY_BUCKETS
+)
+DB_COMMIT_LATENCY = Histogram("db_commit_duration_seconds", "Duration of session commits.", buckets=LATENCY_BUCKETS)
+
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latency of API requests by endpoint.",
+    ["method", "endpoint", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+BACKGROUND_TASK_DURATION = Histogram(
+    "background_task_duration_seconds",
+    "Duration of background tasks by task and outcome.",
+    ["task", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total",
+    "Requests not admitted by endpoint and reason: queue_full, timeout or disconnected.",
+    ["endpoint", "reason"],
+)
+ADMISSION_IN_USE = Gauge("admission_in_use", "Total cost of the admitted requests in progress.")
+ADMISSION_QUEUED = Gauge("admission_queued", "Requests waiting for admission.")
+SIGNATURES_INGESTED = Counter("signatures_ingested_total", "Signatures stored in the database.")
+CRAWL_STEPS = Counter("crawl_steps_total", "Token crawl steps run by the scheduler by phase.", ["phase"])
+CRAWL_TOKENS = Gauge("crawl_tokens", "Token crawls held by the scheduler by state (queued or running).", ["state"])
+
+
+def track_task(func):
+    """
+    Decorator recording the duration and outcome of a background task.
+
+    Args:
+        func (Callable): The task function.
+
+    Returns:
+        Callable: The wrapped task function.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start_ts = time.perf_counter()
+        outcome = "error"
+        try:
+            result = func(*args, **kwargs)
+            outcome = "success"
+            return result
+        finally:
+            BACKGROUND_TASK_DURATION.labels(func.__qualname__, outcome).observe(time.perf_counter() - start_ts)
+
+    return wrapper
+
+
+def instrument_engine(engine: Engine):
+    """
+    Register SQLAlchemy event listeners timing statements on the engine and commits on all sessions.
+
+    Args:
+        engine (Engine): The SQLAlchemy engine.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_ts", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start_ts = conn.info["query_start_ts"].pop()
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+        DB_QUERY_LATENCY.labels(verb).observe(time.perf_counter() - start_ts)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        if context.connection is not None and context.connection.info.get("query_start_ts"):
+            context.connection.info["query_start_ts"].pop()
+
+    # Session listeners are shared by every engine, the replica must not register them twice
+    if not event.contains(Session, "before_commit", _before_commit):
+        event.listen(Session, "before_commit", _before_commit)
+        event.listen(Session, "after_commit", _after_commit)
+
+
+def _before_commit(session):
+    session.info["commit_start_ts"] = time.perf_counter()
+
+
+def _after_commit(session):
+    start_ts = session.info.pop("commit_start_ts", None)
+    if start_ts is not None:
+        DB_COMMIT_LATENCY.observe(time.perf_counter() - start_ts)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """
+    Render all registered metrics in the Prometheus text format.
+
+    Returns:
+        tuple[bytes, str]: The metrics payload and its content type.
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,121 @@
+from pydantic import BaseModel
+from datetime import datetime, timedelta
+from sqlalchemy import Column, Integer, String, ForeignKey, TIMESTAMP, BigInteger, Index, PrimaryKeyConstraint
+from app import Base
+
+# Rollup resolutions and their bucket widths
+RESOLUTIONS = {
+    "1m": timedelta(minutes=1),
+    "1h": timedelta(hours=1),
+    "1d": timedelta(days=1),
+}
+
+
+def bucket_start(timestamp: datetime, resolution: str) -> datetime:
+    """
+    Truncate a timestamp to the start of its rollup bucket.
+
+    Args:
+        timestamp (datetime): The timestamp.
+        resolution (str): One of `RESOLUTIONS`.
+
+    Returns:
+        datetime: The start of the bucket.
+    """
+    timestamp = timestamp.replace(second=0, microsecond=0)
+    if resolution in ("1h", "1d"):
+        timestamp = timestamp.replace(minute=0)
+    if resolution == "1d":
+        timestamp = timestamp.replace(hour=0)
+    return timestamp
+
+
+class HolderBalanceHistory(Base):
+    """
+    SQLAlchemy model representing an append-only change of a holder's balance.
+
+    A row is only written when the balance differs from the previously stored one.
+
+    Attributes:
+        id (int): The unique identifier for the change.
+        token_id (int): The ID of the token.
+        address (str): The address of the holder.
+        balance (int): The balance after the change.
+        recorded_at (datetime): The timestamp of when the change was observed.
+    """
+
+    __tablename__ = "holder_balance_history"
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    token_id = Column(Integer, ForeignKey("token.id"), nullable=False)
+    address = Column(String, nullable=False)
+    balance = Column(BigInteger, nullable=False)
+    recorded_at = Column(TIMESTAMP, nullable=False)
+    __table_args__ = (Index("ix_holder_balance_history_token_address", "token_id", "address", "recorded_at"),)
+
+
+class HolderBalanceRollup(Base):
+    """
+    SQLAlchemy model representing a holder's balance within a time bucket.
+
+    Attributes:
+        token_id (int): The ID of the token.
+        address (str): The address of the holder.
+        resolution (str): The bucket width, one of `RESOLUTIONS`.
+        bucket_start (datetime): The start of the bucket.
+        balance (int): The last balance observed in the bucket.
+        min_balance (int): The lowest balance observed in the bucket.
+        max_balance (int): The highest balance observed in the bucket.
+    """
+
+    __tablename__ = "holder_balance_rollup"
+    token_id = Column(Integer, ForeignKey("token.id"), nullable=False)
+    address = Column(String, nullable=False)
+    resolution = Column(String, nullable=False)
+    bucket_start = Column(TIMESTAMP, nullable=False)
+    balance = Column(BigInteger, nullable=False)
+    min_balance = Column(BigInteger, nullable=False)
+    max_balance = Column(BigInteger, nullable=False)
+    __table_args__ = (PrimaryKeyConstraint("token_id", "address", "resolution", "bucket_start"),)
+
+
+class TokenBalanceRollup(Base):
+    """
+    SQLAlchemy model representing the total balance of a token's holders within a time bucket.
+
+    Attributes:
+        token_id (int): The ID of the token.
+        resolution (str): The bucket width, one of `RESOLUTIONS`.
+        bucket_start (datetime): The start of the bucket.
+        balance (int): The last total balance observed in the bucket.
+        min_balance (int): The lowest total balance observed in the bucket.
+        max_balance (int): The highest total balance observed in the bucket.
+    """
+
+    __tablename__ = "token_balance_rollup"
+    token_id = Column(Integer, ForeignKey("token.id"), nullable=False)
+    resolution = Column(String, nullable=False)
+    bucket_start = Column(TIMESTAMP, nullable=False)
+    balance = Column(BigInteger, nullable=False)
+    min_balance = Column(BigInteger, nullable=False)
+    max_balance = Column(BigInteger, nullable=False)
+    __table_args__ = (PrimaryKeyConstraint("token_id", "resolution", "bucket_start"),)
+
+
+class BalancePointModel(BaseModel):
+    """
+    Pydantic model representing one point of a downsampled balance series.
+
+    Attributes:
+        bucket_start (datetime): The start of the bucket.
+        balance (int): The last balance observed in the bucket.
+        min_balance (int): The lowest balance observed in the bucket.
+        max_balance (int): The highest balance observed in the bucket.
+    """
+
+    bucket_start: datetime
+    balance: int
+    min_balance: int
+    max_balance: int
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,54 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Column, Integer, String, ForeignKey, TIMESTAMP
+from app import Base
+
+# Crawl states: scheduled, collecting data, finished, finished with an error
+CRAWL_PENDING = "pending"
+CRAWL_RUNNING = "running"
+CRAWL_DONE = "done"
+CRAWL_FAILED = "failed"
+
+
+class TokenCrawl(Base):
+    """
+    SQLAlchemy model representing the state of the onboarding crawl of a token.
+
+    Attributes:
+        token_id (int): The ID of the token.
+        status (str): pending, running, done or failed.
+        updated_at (datetime): The timestamp of the last status change.
+        error (str): The error of a failed crawl.
+    """
+
+    __tablename__ = "token_crawl"
+    token_id = Column(Integer, ForeignKey("token.id"), primary_key=True)
+    status = Column(String, nullable=False)
+    updated_at = Column(TIMESTAMP, nullable=False)
+    error = Column(String, nullable=True)
+
+
+class CrawlStatusModel(BaseModel):
+    """
+    Pydantic model representing the state of the onboarding crawl of a token.
+
+    Attributes:
+        address (str): The address of the token.
+        status (str): pending, running, done or failed, None for tokens onboarded before crawls were tracked.
+        updated_at (datetime): The timestamp of the last status change.
+        error (str): The error of a failed crawl.
+        phase (str): The phase of the last crawl step: authority, signatures or holders.
+        steps (int): Number of crawl steps run, about one RPC page each.
+        items (int): Number of signatures stored by the crawl.
+        eta_seconds (float): Estimated seconds until the crawl finishes.
+    """
+
+    address: str
+    status: Optional[str] = None
+    updated_at: Optional[datetime] = None
+    error: Optional[str] = None
+    phase: Optional[str] = None
+    steps: Optional[int] = None
+    items: Optional[int] = None
+    eta_seconds: Optional[float] = None
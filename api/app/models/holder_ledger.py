@@ -0,0 +1,152 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Column, Index, Integer, PrimaryKeyConstraint, String, ForeignKey, TIMESTAMP, BigInteger
+from app import Base
+
+
+class HolderLedger(Base):
+    """
+    SQLAlchemy model representing the balance of one owner in the holder ledger of a token.
+
+    The ledger is built by folding the token balance changes of every crawled transaction in slot
+    order, so it covers every owner that ever held the token, without balance RPC calls.
+
+    Attributes:
+        token_id (int): The ID of the token.
+        address (str): The address of the owner.
+        balance (int): The balance of the owner across its token accounts, in raw token units.
+        first_buy_at (datetime | None): The block time of the first transaction raising the balance.
+        first_buy_slot (int | None): The slot of the first transaction raising the balance.
+        sells (int): Number of transactions lowering the balance.
+        last_slot (int): The slot of the last transaction changing the balance.
+    """
+
+    __tablename__ = "holder_ledger"
+    token_id = Column(Integer, ForeignKey("token.id"), nullable=False)
+    address = Column(String, nullable=False)
+    balance = Column(BigInteger, nullable=False)
+    first_buy_at = Column(TIMESTAMP)
+    first_buy_slot = Column(Integer)
+    sells = Column(Integer, nullable=False)
+    last_slot = Column(Integer, nullable=False)
+    __table_args__ = (
+        PrimaryKeyConstraint("token_id", "address"),
+        Index("ix_holder_ledger_token_balance", "token_id", "balance"),
+    )
+
+
+class HolderLedgerSell(Base):
+    """
+    SQLAlchemy model representing a transaction that lowered the balance of an owner in the holder ledger.
+
+    Attributes:
+        token_id (int): The ID of the token.
+        signature (str): The signature of the transaction.
+        address (str): The address of the owner.
+        slot (int): The slot of the transaction.
+        sold_at (datetime): The block time of the transaction.
+        amount (int): The amount the balance went down by, in raw token units.
+        balance (int): The balance of the owner after the transaction.
+    """
+
+    __tablename__ = "holder_ledger_sell"
+    token_id = Column(Integer, ForeignKey("token.id"), nullable=False)
+    signature = Column(String, nullable=False)
+    address = Column(String, nullable=False)
+    slot = Column(Integer, nullable=False)
+    sold_at = Column(TIMESTAMP, nullable=False)
+    amount = Column(BigInteger, nullable=False)
+    balance = Column(BigInteger, nullable=False)
+    __table_args__ = (
+        PrimaryKeyConstraint("token_id", "signature", "address"),
+        Index("ix_holder_ledger_sell_token_slot", "token_id", "slot"),
+    )
+
+
+class HolderLedgerWatermark(Base):
+    """
+    SQLAlchemy model representing how far the holder ledger of a token has been built.
+
+    Transactions are folded in (slot, signature) order, so everything up to the watermark is in the ledger.
+
+    Attributes:
+        token_id (int): The ID of the token.
+        slot (int): The slot of the last folded transaction.
+        signature (str): The signature of the last folded transaction.
+        transactions (int): Number of folded transactions.
+        updated_at (datetime): The timestamp of the last fold.
+    """
+
+    __tablename__ = "holder_ledger_watermark"
+    token_id = Column(Integer, ForeignKey("token.id"), primary_key=True)
+    slot = Column(Integer, nullable=False)
+    signature = Column(String, nullable=False)
+    transactions = Column(Integer, nullable=False)
+    updated_at = Column(TIMESTAMP, nullable=False)
+
+
+class LedgerHolderModel(BaseModel):
+    """
+    Pydantic model representing one owner of the holder ledger.
+
+    Attributes:
+        address (str): The address of the owner.
+        balance (int): The balance of the owner, in raw token units.
+        first_buy_at (datetime | None): The block time of the first transaction raising the balance.
+        sells (int): Number of transactions lowering the balance.
+    """
+
+    address: str
+    balance: int
+    first_buy_at: Optional[datetime]
+    sells: int
+
+
+class HolderLedgerModel(BaseModel):
+    """
+    Pydantic model representing the holders of a token from its ledger.
+
+    Attributes:
+        token_id (int): The ID of the token.
+        holders (int): Number of owners with a non-empty balance.
+        total_balance (int): Sum of the balances of all owners, in raw token units.
+        transactions (int): Number of folded transactions.
+        watermark_slot (int): The slot of the last folded transaction.
+        updated_at (datetime): The timestamp of the last fold.
+        top_holders (list[LedgerHolderModel]): The largest owners, by balance.
+        complete (bool): Whether every crawled transaction is folded, only reported by the fold.
+    """
+
+    token_id: int
+    holders: int
+    total_balance: int
+    transactions: int
+    watermark_slot: int
+    updated_at: datetime
+    top_holders: list[LedgerHolderModel]
+    complete: Optional[bool] = None
+
+
+class SellEventModel(BaseModel):
+    """
+    Pydantic model representing a transaction that lowered the balance of an owner.
+
+    Attributes:
+        address (str): The address of the owner.
+        signature (str): The signature of the transaction.
+        slot (int): The slot of the transaction.
+        sold_at (datetime): The block time of the transaction.
+        amount (int): The amount the balance went down by, in raw token units.
+        balance (int): The balance of the owner after the transaction.
+    """
+
+    address: str
+    signature: str
+    slot: int
+    sold_at: datetime
+    amount: int
+    balance: int
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,65 @@
+from pydantic import BaseModel
+from datetime import datetime
+from sqlalchemy import Column, Index, Integer, PrimaryKeyConstraint, String, ForeignKey, TIMESTAMP, BigInteger
+from app import Base
+
+
+class HolderSnapshot(Base):
+    """
+    SQLAlchemy model representing the balance of one owner in the latest full holder snapshot of a token.
+
+    Unlike `Holder`, which tracks the first buyers, a snapshot covers every owner of a non-empty
+    token account of the mint. Each snapshot replaces the previous one.
+
+    Attributes:
+        token_id (int): The ID of the token.
+        address (str): The address of the owner.
+        balance (int): The balance of the owner across its token accounts, in raw token units.
+        snapshot_at (datetime): The timestamp of the snapshot.
+    """
+
+    __tablename__ = "holder_snapshot"
+    token_id = Column(Integer, ForeignKey("token.id"), nullable=False)
+    address = Column(String, nullable=False)
+    balance = Column(BigInteger, nullable=False)
+    snapshot_at = Column(TIMESTAMP, nullable=False)
+    __table_args__ = (
+        PrimaryKeyConstraint("token_id", "address"),
+        Index("ix_holder_snapshot_token_balance", "token_id", "balance"),
+    )
+
+
+class SnapshotHolderModel(BaseModel):
+    """
+    Pydantic model representing one owner of a holder snapshot.
+
+    Attributes:
+        address (str): The address of the owner.
+        balance (int): The balance of the owner, in raw token units.
+        percent (float): Share of the total balance of all owners.
+    """
+
+    address: str
+    balance: int
+    percent: float
+
+
+class HolderSnapshotModel(BaseModel):
+    """
+    Pydantic model representing the holder distribution of a token from its latest snapshot.
+
+    Attributes:
+        token_id (int): The ID of the token.
+        holders (int): Number of owners with a non-empty balance.
+        total_balance (int): Sum of the balances of all owners, in raw token units.
+        top10_percent (float): Share of the total balance held by the 10 largest owners.
+        snapshot_at (datetime): The timestamp of the snapshot.
+        top_holders (list[SnapshotHolderModel]): The largest owners, by balance.
+    """
+
+    token_id: int
+    holders: int
+    total_balance: int
+    top10_percent: float
+    snapshot_at: datetime
+    top_holders: list[SnapshotHolderModel]
@@ -0,0 +1,78 @@
+from pydantic import BaseModel
+from datetime import datetime
+from sqlalchemy import Column, Integer, ForeignKey, TIMESTAMP, BigInteger, Float
+from app import Base
+
+
+class HolderSummary(Base):
+    """
+    SQLAlchemy model representing the materialized retention summary of a token's holders.
+
+    Holders are bucketed by their current balance relative to the initial one:
+    blue - bought more, green - kept over 90%, yellow - kept over 50%, orange - kept some,
+    red - sold everything, white - anything else.
+
+    Attributes:
+        token_id (int): The ID of the token.
+        holders (int): Number of holders.
+        blue (int): Number of holders whose balance grew.
+        green (int): Number of holders who kept over 90% of the initial balance.
+        yellow (int): Number of holders who kept over 50% of the initial balance.
+        orange (int): Number of holders who kept less than half of the initial balance.
+        red (int): Number of holders who sold everything.
+        white (int): Number of holders in no other bucket.
+        initial_total (int): Sum of the holders' initial balances.
+        current_total (int): Sum of the holders' current balances.
+        percent_sold (float): Share of the initial total sold, negative if holders accumulated.
+        updated_at (datetime): The timestamp of when the summary was last recomputed.
+    """
+
+    __tablename__ = "holder_summary"
+    token_id = Column(Integer, ForeignKey("token.id"), primary_key=True)
+    holders = Column(Integer, nullable=False)
+    blue = Column(Integer, nullable=False)
+    green = Column(Integer, nullable=False)
+    yellow = Column(Integer, nullable=False)
+    orange = Column(Integer, nullable=False)
+    red = Column(Integer, nullable=False)
+    white = Column(Integer, nullable=False)
+    initial_total = Column(BigInteger, nullable=False)
+    current_total = Column(BigInteger, nullable=False)
+    percent_sold = Column(Float, nullable=False)
+    updated_at = Column(TIMESTAMP, nullable=False)
+
+
+class HolderSummaryModel(BaseModel):
+    """
+    Pydantic model representing the retention summary of a token's holders.
+
+    Attributes:
+        token_id (int): The ID of the token.
+        holders (int): Number of holders.
+        blue (int): Number of holders whose balance grew.
+        green (int): Number of holders who kept over 90% of the initial balance.
+        yellow (int): Number of holders who kept over 50% of the initial balance.
+        orange (int): Number of holders who kept less than half of the initial balance.
+        red (int): Number of holders who sold everything.
+        white (int): Number of holders in no other bucket.
+        initial_total (int): Sum of the holders' initial balances.
+        current_total (int): Sum of the holders' current balances.
+        percent_sold (float): Share of the initial total sold, negative if holders accumulated.
+        updated_at (datetime): The timestamp of when the summary was last recomputed.
+    """
+
+    token_id: int
+    holders: int
+    blue: int
+    green: int
+    yellow: int
+    orange: int
+    red: int
+    white: int
+    initial_total: int
+    current_total: int
+    percent_sold: float
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
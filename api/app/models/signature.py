@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Index, Integer, String, ForeignKey
 from sqlalchemy.orm import relationship
 from app import Base
 
@@ -21,6 +21,7 @@ class Signature(Base):
     block_time = Column(Integer, nullable=False)
     token_id = Column(Integer, ForeignKey("token.id"), nullable=False)
     token = relationship("Token", back_populates="signatures")
+    __table_args__ = (Index("ix_signature_token_slot", "token_id", "slot"),)
 
 
 class SignatureModel(BaseModel):
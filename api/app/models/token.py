@@ -1,9 +1,10 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import TIMESTAMP, Column, Index, Integer, String
 from sqlalchemy.orm import relationship
 from app import Base
+from app.config import ADD_TOKENS_LIMIT
 
 
 class Token(Base):
@@ -13,7 +14,15 @@ class Token(Base):
     Attributes:
         id (int): The unique identifier for the token.
         address (str): The address of the token.
-        update_authority (str): The update authority of the token.
+        update_authority (str): The Metaplex update authority of the token.
+        name (str): The name of the token from its Metaplex metadata.
+        symbol (str): The symbol of the token from its Metaplex metadata.
+        mint_authority (str): The mint authority of the token.
+        freeze_authority (str): The freeze authority of the token.
+        metadata_updated_at (datetime): The timestamp of when the on-chain metadata was last resolved.
+        creation_signature (str): The signature of the token's creation transaction.
+        creation_slot (int): The slot of the creation transaction.
+        creation_time (datetime): The block time of the creation transaction.
         signatures (relationship): Relationship to Signature model.
         holders (relationship): Relationship to Holder model.
     """
@@ -22,8 +31,17 @@ class Token(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     address = Column(String, nullable=False, unique=True)
     update_authority = Column(String, nullable=True)
+    name = Column(String, nullable=True)
+    symbol = Column(String, nullable=True)
+    mint_authority = Column(String, nullable=True)
+    freeze_authority = Column(String, nullable=True)
+    metadata_updated_at = Column(TIMESTAMP, nullable=True)
+    creation_signature = Column(String, nullable=True)
+    creation_slot = Column(Integer, nullable=True)
+    creation_time = Column(TIMESTAMP, nullable=True)
     signatures = relationship("Signature", back_populates="token")
     holders = relationship("Holder", back_populates="token")
+    __table_args__ = (Index("ix_token_creation_time", "creation_time"),)
 
 
 # Pydantic models for response
@@ -41,6 +59,88 @@ class TokenModel(BaseModel):
         from_attributes = True
 
 
+class TokenMetadataModel(BaseModel):
+    """
+    Pydantic model representing the on-chain metadata of a token.
+
+    Attributes:
+        address (str): The address of the token.
+        name (str): The name of the token.
+        symbol (str): The symbol of the token.
+        mint_authority (str): The mint authority, None if minting is disabled.
+        freeze_authority (str): The freeze authority, None if absent.
+        update_authority (str): The Metaplex update authority, None without a metadata account.
+        metadata_updated_at (datetime): The timestamp of when the metadata was resolved.
+    """
+
+    address: str
+    name: Optional[str] = None
+    symbol: Optional[str] = None
+    mint_authority: Optional[str] = None
+    freeze_authority: Optional[str] = None
+    update_authority: Optional[str] = None
+    metadata_updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class TokenAgeModel(BaseModel):
+    """
+    Pydantic model representing the creation transaction and age of a token.
+
+    Attributes:
+        address (str): The address of the token.
+        creation_signature (str): The signature of the token's creation transaction.
+        creation_slot (int): The slot of the creation transaction.
+        creation_time (datetime): The block time of the creation transaction, if known.
+        age_seconds (float): Seconds since the creation transaction, if its time is known.
+    """
+
+    address: str
+    creation_signature: str
+    creation_slot: int
+    creation_time: Optional[datetime] = None
+    age_seconds: Optional[float] = None
+
+
+class AddTokensRequest(BaseModel):
+    """
+    Pydantic model representing a bulk token onboarding request.
+
+    Attributes:
+        addresses (List[str]): The addresses of the tokens to add.
+    """
+
+    addresses: List[str] = Field(..., min_length=1, max_length=ADD_TOKENS_LIMIT)
+
+
+class AddTokenResult(BaseModel):
+    """
+    Pydantic model representing the outcome of adding one token in bulk.
+
+    Attributes:
+        address (str): The address of the token.
+        status (str): "added" for new tokens, "exists" for already tracked ones, "invalid" otherwise.
+        detail (str): Human-readable explanation of the status.
+    """
+
+    address: str
+    status: str
+    detail: str
+
+
+class AddTokensResult(BaseModel):
+    """
+    Pydantic model representing the outcome of a bulk token onboarding request.
+
+    Attributes:
+        results (List[AddTokenResult]): Outcome per requested address, in request order.
+    """
+
+    results: List[AddTokenResult]
+
+
 class TokenInfo(BaseModel):
     """
     Pydantic model representing detailed token information.
@@ -0,0 +1,212 @@
+import functools
+import hmac
+import inspect
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+from fastapi.routing import APIRoute
+from app.config import PROFILING_ADMIN_TOKEN, PROFILING_DIR, PROFILING_INTERVAL
+
+# Header carrying the admin token that enables profiling of a single request
+PROFILE_HEADER = "X-Profile"
+
+
+def is_profiling_requested(header_value: Optional[str]) -> bool:
+    """
+    Check whether the request carries a valid admin profiling token.
+
+    Args:
+        header_value (str | None): Value of the `X-Profile` request header.
+
+    Returns:
+        bool: True if profiling is configured and the token matches.
+    """
+    if not PROFILING_ADMIN_TOKEN or not header_value:
+        return False
+    return hmac.compare_digest(header_value, PROFILING_ADMIN_TOKEN)
+
+
+class SamplingProfiler:
+    """
+    Sampling profiler collecting the call stacks of the threads working on a request.
+
+    Stacks are aggregated in the collapsed ("folded") format understood by flamegraph.pl
+    and speedscope.
+
+    Attributes:
+        thread_id (int): Identifier of the thread sampled for the whole profile, the event loop.
+        interval (float): Seconds between two samples.
+        samples (Counter): Number of samples per collapsed stack.
+    """
+
+    def __init__(self, thread_id: int, interval: float = PROFILING_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        # threadpool threads currently running code of the request, with the number of calls each runs
+        self._workers: Counter = Counter()
+        self._workers_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        """
+        Stop sampling.
+
+        Returns:
+            Counter: Number of samples per collapsed stack.
+        """
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def add_thread(self, thread_id: int):
+        """
+        Sample a thread as well until it is removed again.
+
+        Args:
+            thread_id (int): Identifier of the thread.
+        """
+        with self._workers_lock:
+            self._workers[thread_id] += 1
+
+    def remove_thread(self, thread_id: int):
+        """
+        Stop sampling a thread added with `add_thread`.
+
+        Args:
+            thread_id (int): Identifier of the thread.
+        """
+        with self._workers_lock:
+            self._workers[thread_id] -= 1
+            if self._workers[thread_id] <= 0:
+                del self._workers[thread_id]
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._workers_lock:
+                thread_ids = [self.thread_id, *self._workers]
+            frames = sys._current_frames()
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if stack:
+                    self.samples[";".join(reversed(stack))] += 1
+
+    def write_folded(self, profile_id: str) -> str:
+        """
+        Write the collected stacks as a collapsed-stack flamegraph file.
+
+        Args:
+            profile_id (str): Identifier used as the file name.
+
+        Returns:
+            str: Path of the written file.
+        """
+        os.makedirs(PROFILING_DIR, exist_ok=True)
+        path = os.path.join(PROFILING_DIR, f"{profile_id}.folded")
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+_current_profiler: ContextVar[Optional[SamplingProfiler]] = ContextVar("current_profiler", default=None)
+
+
+@contextmanager
+def start_profile():
+    """
+    Context manager profiling the current request from the event loop thread.
+
+    Threadpool threads running the request's sync endpoint are sampled while they do, see `ProfiledRoute`.
+
+    Yields:
+        SamplingProfiler: The running profiler, stopped on exit.
+    """
+    profiler = SamplingProfiler(threading.get_ident()).start()
+    token = _current_profiler.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _current_profiler.reset(token)
+        profiler.stop()
+
+
+@contextmanager
+def profile_current_thread():
+    """
+    Context manager sampling the current thread for the profile of the current request, if it is profiled.
+    """
+    profiler = _current_profiler.get()
+    if profiler is None:
+        yield
+        return
+    thread_id = threading.get_ident()
+    profiler.add_thread(thread_id)
+    try:
+        yield
+    finally:
+        profiler.remove_thread(thread_id)
+
+
+class ProfiledRoute(APIRoute):
+    """
+    API route whose sync endpoint is sampled by the request's profiler on the threadpool thread running it.
+
+    The request context is copied into the threadpool, so the endpoint finds the profiler of its request.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = _profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _profiled(endpoint: Callable) -> Callable:
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        with profile_current_thread():
+            return endpoint(*args, **kwargs)
+
+    return wrapper
+
+
+def new_profile_id() -> str:
+    """
+    Generate an identifier for a profile artifact.
+
+    Returns:
+        str: The identifier.
+    """
+    return f"{int(time.time())}-{uuid.uuid4().hex[:12]}"
+
+
+def profile_path(profile_id: str) -> Optional[str]:
+    """
+    Resolve the path of a stored profile artifact.
+
+    Args:
+        profile_id (str): The identifier of the profile.
+
+    Returns:
+        str | None: The path, or None if the identifier is invalid or the file does not exist.
+    """
+    if not profile_id.replace("-", "").isalnum():
+        return None
+    path = os.path.join(PROFILING_DIR, f"{profile_id}.folded")
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,194 @@
+import logging
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from fastapi import Depends
+from app import get_db
+from app.models.balance_history import (
+    RESOLUTIONS,
+    HolderBalanceHistory,
+    HolderBalanceRollup,
+    TokenBalanceRollup,
+    bucket_start,
+)
+from app.models.holder import Holder
+
+logger = logging.getLogger("resources")
+
+
+class BalanceHistoryRepository:
+    """
+    Repository class for the append-only holder balance history and its time-bucketed rollups.
+
+    Attributes:
+        db (Session): The SQLAlchemy database session.
+    """
+
+    def __init__(self, db: Session):
+        """
+        Initializes the BalanceHistoryRepository with a database session.
+
+        Args:
+            db (Session): The SQLAlchemy database session.
+        """
+        self.db = db
+
+    def record_changes(self, changes: list[tuple[int, str, int]], recorded_at: datetime):
+        """
+        Append balance changes to the history and fold them into the 1m, 1h and 1d rollups.
+
+        Must be called after the holders' `current_balance` has been updated, the token totals
+        are read from the holder table.
+
+        Args:
+            changes (list[tuple[int, str, int]]): Token ID, holder address and new balance of every changed holder.
+            recorded_at (datetime): The timestamp of when the balances were observed.
+        """
+        if not changes:
+            return
+        self.db.execute(
+            insert(HolderBalanceHistory),
+            [
+                {"token_id": token_id, "address": address, "balance": balance, "recorded_at": recorded_at}
+                for token_id, address, balance in changes
+            ],
+        )
+        token_ids = {token_id for token_id, _, _ in changes}
+        totals = self.db.execute(
+            select(Holder.token_id, func.sum(Holder.current_balance))
+            .where(Holder.token_id.in_(token_ids))
+            .group_by(Holder.token_id)
+        ).all()
+        for resolution in RESOLUTIONS:
+            start = bucket_start(recorded_at, resolution)
+            self._upsert_rollup(
+                HolderBalanceRollup,
+                ["token_id", "address", "resolution", "bucket_start"],
+                [
+                    {
+                        "token_id": token_id,
+                        "address": address,
+                        "resolution": resolution,
+                        "bucket_start": start,
+                        "balance": balance,
+                        "min_balance": balance,
+                        "max_balance": balance,
+                    }
+                    for token_id, address, balance in changes
+                ],
+            )
+            self._upsert_rollup(
+                TokenBalanceRollup,
+                ["token_id", "resolution", "bucket_start"],
+                [
+                    {
+                        "token_id": token_id,
+                        "resolution": resolution,
+                        "bucket_start": start,
+                        "balance": int(total),
+                        "min_balance": int(total),
+                        "max_balance": int(total),
+                    }
+                    for token_id, total in totals
+                ],
+            )
+        try:
+            self.db.commit()
+        except Exception as e:
+            logger.error(f"Failed to record balance history: {str(e)}")
+            self.db.rollback()
+            raise
+
+    def _upsert_rollup(self, model, index_elements: list[str], rows: list[dict]):
+        """
+        Insert rollup buckets, merging into existing buckets: the last balance wins, min and max widen.
+
+        Args:
+            model: The rollup model.
+            index_elements (list[str]): The primary key columns of the model.
+            rows (list[dict]): The rollup rows.
+        """
+        if not rows:
+            return
+        stmt = pg_insert(model)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={
+                "balance": stmt.excluded.balance,
+                "min_balance": func.least(model.min_balance, stmt.excluded.min_balance),
+                "max_balance": func.greatest(model.max_balance, stmt.excluded.max_balance),
+            },
+        )
+        self.db.execute(stmt, rows)
+
+    def get_token_series(
+        self, token_id: int, resolution: str, since: Optional[datetime] = None, until: Optional[datetime] = None
+    ) -> list[TokenBalanceRollup]:
+        """
+        Get the downsampled total balance of a token's holders.
+
+        Args:
+            token_id (int): The ID of the token.
+            resolution (str): The bucket width, one of `RESOLUTIONS`.
+            since (datetime | None): Earliest bucket start to include.
+            until (datetime | None): Latest bucket start to include.
+
+        Returns:
+            list[TokenBalanceRollup]: The buckets in chronological order.
+        """
+        stmt = select(TokenBalanceRollup).where(
+            TokenBalanceRollup.token_id == token_id, TokenBalanceRollup.resolution == resolution
+        )
+        if since is not None:
+            stmt = stmt.where(TokenBalanceRollup.bucket_start >= bucket_start(since, resolution))
+        if until is not None:
+            stmt = stmt.where(TokenBalanceRollup.bucket_start <= until)
+        return self.db.scalars(stmt.order_by(TokenBalanceRollup.bucket_start)).all()
+
+    def get_holder_series(
+        self,
+        token_id: int,
+        address: str,
+        resolution: str,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> list[HolderBalanceRollup]:
+        """
+        Get the downsampled balance of a single holder.
+
+        Args:
+            token_id (int): The ID of the token.
+            address (str): The address of the holder.
+            resolution (str): The bucket width, one of `RESOLUTIONS`.
+            since (datetime | None): Earliest bucket start to include.
+            until (datetime | None): Latest bucket start to include.
+
+        Returns:
+            list[HolderBalanceRollup]: The buckets in chronological order.
+        """
+        stmt = select(HolderBalanceRollup).where(
+            HolderBalanceRollup.token_id == token_id,
+            HolderBalanceRollup.address == address,
+            HolderBalanceRollup.resolution == resolution,
+        )
+        if since is not None:
+            stmt = stmt.where(HolderBalanceRollup.bucket_start >= bucket_start(since, resolution))
+        if until is not None:
+            stmt = stmt.where(HolderBalanceRollup.bucket_start <= until)
+        return self.db.scalars(stmt.order_by(HolderBalanceRollup.bucket_start)).all()
+
+
+# Dependency
+def get_balance_history_repository(db: Session = Depends(get_db)) -> BalanceHistoryRepository:
+    """
+    Dependency function to get the BalanceHistoryRepository instance.
+
+    Args:
+        db (Session): The SQLAlchemy database session.
+
+    Returns:
+        BalanceHistoryRepository: The BalanceHistoryRepository instance.
+    """
+    return BalanceHistoryRepository(db)
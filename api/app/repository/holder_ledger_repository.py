@@ -0,0 +1,181 @@
+import logging
+from typing import Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.models.holder_ledger import HolderLedger, HolderLedgerSell, HolderLedgerWatermark
+
+logger = logging.getLogger("resources")
+
+
+class HolderLedgerRepository:
+    """
+    Repository class for the holder ledger: per-owner balances, sell events and the watermark of each token.
+
+    Attributes:
+        db (Session): The SQLAlchemy database session.
+    """
+
+    def __init__(self, db: Session):
+        """
+        Initializes the HolderLedgerRepository with a database session.
+
+        Args:
+            db (Session): The SQLAlchemy database session.
+        """
+        self.db = db
+
+    def get_watermark(self, token_id: int) -> Optional[HolderLedgerWatermark]:
+        """
+        Get how far the ledger of a token has been built.
+
+        Args:
+            token_id (int): The ID of the token.
+
+        Returns:
+            HolderLedgerWatermark | None: The watermark, or None if no transaction has been folded yet.
+        """
+        return self.db.get(HolderLedgerWatermark, token_id)
+
+    def get_entries(self, token_id: int, addresses: set[str]) -> dict[str, dict]:
+        """
+        Get the ledger entries of some owners of a token.
+
+        Args:
+            token_id (int): The ID of the token.
+            addresses (set[str]): The addresses of the owners.
+
+        Returns:
+            dict[str, dict]: The columns of the entry per owner address, owners without an entry left out.
+        """
+        if not addresses:
+            return {}
+        rows = self.db.execute(
+            select(
+                HolderLedger.address,
+                HolderLedger.balance,
+                HolderLedger.first_buy_at,
+                HolderLedger.first_buy_slot,
+                HolderLedger.sells,
+                HolderLedger.last_slot,
+            ).where(HolderLedger.token_id == token_id, HolderLedger.address.in_(addresses))
+        )
+        return {row.address: {"token_id": token_id, **row._asdict()} for row in rows}
+
+    def apply_batch(
+        self,
+        token_id: int,
+        entries: list[dict],
+        sells: list[dict],
+        watermark: dict,
+        previous: Optional[tuple[int, str]],
+    ) -> bool:
+        """
+        Store a folded batch of transactions in one transaction: the changed entries, their sells and the watermark.
+
+        The watermark is moved first, and only if it is still where the batch started, so that of two
+        folds of the same token only one applies a batch. It only moves together with the balances, so
+        a failed batch is folded again in full.
+
+        Args:
+            token_id (int): The ID of the token.
+            entries (list[dict]): The new columns of every entry changed by the batch.
+            sells (list[dict]): The sell events of the batch.
+            watermark (dict): The new slot, signature, transactions and updated_at of the watermark.
+            previous (tuple[int, str] | None): Slot and signature of the watermark the batch started from, None
+                for the first batch.
+
+        Returns:
+            bool: False if another fold moved the watermark first, nothing is stored then.
+        """
+        try:
+            if previous is None:
+                stmt = pg_insert(HolderLedgerWatermark).values(token_id=token_id, **watermark)
+                moved = self.db.execute(stmt.on_conflict_do_nothing()).rowcount == 1
+            else:
+                moved = self.db.execute(
+                    update(HolderLedgerWatermark)
+                    .where(
+                        HolderLedgerWatermark.token_id == token_id,
+                        HolderLedgerWatermark.slot == previous[0],
+                        HolderLedgerWatermark.signature == previous[1],
+                    )
+                    .values(**watermark)
+                ).rowcount == 1
+            if not moved:
+                self.db.rollback()
+                return False
+            if entries:
+                stmt = pg_insert(HolderLedger).values(entries)
+                self.db.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[HolderLedger.token_id, HolderLedger.address],
+                        set_={
+                            column: stmt.excluded[column]
+                            for column in ("balance", "first_buy_at", "first_buy_slot", "sells", "last_slot")
+                        },
+                    )
+                )
+            if sells:
+                self.db.execute(pg_insert(HolderLedgerSell).values(sells).on_conflict_do_nothing())
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to store the holder ledger of token {token_id}: {str(e)}")
+            self.db.rollback()
+            raise
+
+    def get_totals(self, token_id: int) -> tuple[int, int]:
+        """
+        Get the number of owners with a non-empty balance and their total balance.
+
+        Args:
+            token_id (int): The ID of the token.
+
+        Returns:
+            tuple[int, int]: Owners and total balance.
+        """
+        holders, total = self.db.execute(
+            select(func.count(), func.coalesce(func.sum(HolderLedger.balance), 0)).where(
+                HolderLedger.token_id == token_id, HolderLedger.balance > 0
+            )
+        ).one()
+        return holders, int(total)
+
+    def get_top_holders(self, token_id: int, limit: int) -> list[HolderLedger]:
+        """
+        Get the owners of a token with the largest balances, read from the (token_id, balance) index.
+
+        Args:
+            token_id (int): The ID of the token.
+            limit (int): Maximum number of owners to return.
+
+        Returns:
+            list[HolderLedger]: The owners, largest balance first.
+        """
+        stmt = (
+            select(HolderLedger)
+            .where(HolderLedger.token_id == token_id, HolderLedger.balance > 0)
+            .order_by(HolderLedger.balance.desc(), HolderLedger.address)
+            .limit(limit)
+        )
+        return list(self.db.scalars(stmt))
+
+    def get_sells(self, token_id: int, limit: int) -> list[HolderLedgerSell]:
+        """
+        Get the latest sell events of a token, read from the (token_id, slot) index.
+
+        Args:
+            token_id (int): The ID of the token.
+            limit (int): Maximum number of events to return.
+
+        Returns:
+            list[HolderLedgerSell]: The events, latest first.
+        """
+        stmt = (
+            select(HolderLedgerSell)
+            .where(HolderLedgerSell.token_id == token_id)
+            .order_by(HolderLedgerSell.slot.desc(), HolderLedgerSell.signature)
+            .limit(limit)
+        )
+        return list(self.db.scalars(stmt))
@@ -1,12 +1,36 @@
 import logging
+from datetime import datetime
+from typing import Iterable
 from psycopg2 import IntegrityError
+from sqlalchemy import (
+    TIMESTAMP,
+    BigInteger,
+    Integer,
+    String,
+    and_,
+    case,
+    column,
+    delete,
+    func,
+    insert,
+    select,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from fastapi import Depends, HTTPException
+from app.cache import get_cache
 from app.models.holder import Holder
+from app.models.holder_snapshot import HolderSnapshot
+from app.models.holder_summary import HolderSummary
 from app import get_db
 
 logger = logging.getLogger("resources")
 
+# Cache namespace of holder retention summaries, keyed by token address
+HOLDER_SUMMARY_CACHE_NAMESPACE = "holder_summary"
+
 
 class HolderRepository:
     """
@@ -68,6 +92,201 @@ class HolderRepository:
             raise HTTPException(status_code=400, detail="Integrity error on signature insertion.")
         return holders
 
+    def upsert_holders(self, rows: list[dict]):
+        """
+        Insert holders with one multi-row statement, refreshing the balance of those already stored.
+
+        The initial balance of a stored holder is kept.
+
+        Args:
+            rows (list[dict]): Holder rows with address, token_id, initial_balance, current_balance and last_checked.
+        """
+        if not rows:
+            return
+        stmt = pg_insert(Holder).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Holder.address, Holder.token_id],
+            set_={"current_balance": stmt.excluded.current_balance, "last_checked": stmt.excluded.last_checked},
+        )
+        try:
+            self.db.execute(stmt)
+            self.db.commit()
+        except Exception as e:
+            logger.error(f"Failed to store holders: {str(e)}")
+            self.db.rollback()
+            raise
+
+    def update_balances(self, rows: list[tuple[int, str, int, datetime]]):
+        """
+        Update the current balances of holders with one `UPDATE ... FROM (VALUES ...)` statement.
+
+        Args:
+            rows (list[tuple[int, str, int, datetime]]): Token ID, address, current balance and check time per holder.
+        """
+        if not rows:
+            return
+        balances = values(
+            column("token_id", Integer),
+            column("address", String),
+            column("current_balance", BigInteger),
+            column("last_checked", TIMESTAMP),
+            name="balances",
+        ).data(rows)
+        holder = Holder.__table__
+        stmt = (
+            update(holder)
+            .where(and_(holder.c.token_id == balances.c.token_id, holder.c.address == balances.c.address))
+            .values(current_balance=balances.c.current_balance, last_checked=balances.c.last_checked)
+        )
+        try:
+            self.db.execute(stmt)
+            self.db.commit()
+        except Exception as e:
+            logger.error(f"Failed to update holder balances: {str(e)}")
+            self.db.rollback()
+            raise
+
+    def refresh_summaries(self, token_ids: Iterable[int]):
+        """
+        Recompute the materialized retention summaries of the given tokens.
+
+        Holders are bucketed and summed by the database in a single grouped query,
+        so only a handful of rows per token leave the database. Cached summaries are invalidated.
+
+        Args:
+            token_ids (Iterable[int]): The IDs of the tokens whose holders changed.
+        """
+        token_ids = set(token_ids)
+        if not token_ids:
+            return
+        bucket = case(
+            (Holder.current_balance > Holder.initial_balance, "blue"),
+            (Holder.current_balance > 0.9 * Holder.initial_balance, "green"),
+            (Holder.current_balance > 0.5 * Holder.initial_balance, "yellow"),
+            (Holder.current_balance > 0, "orange"),
+            (Holder.current_balance == 0, "red"),
+            else_="white",
+        ).label("bucket")
+        stmt = (
+            select(
+                Holder.token_id,
+                bucket,
+                func.count(),
+                func.sum(Holder.initial_balance),
+                func.sum(Holder.current_balance),
+            )
+            .where(Holder.token_id.in_(token_ids))
+            .group_by(Holder.token_id, bucket)
+        )
+        updated_at = datetime.now()
+        summaries = {
+            token_id: HolderSummary(
+                token_id=token_id,
+                holders=0,
+                blue=0,
+                green=0,
+                yellow=0,
+                orange=0,
+                red=0,
+                white=0,
+                initial_total=0,
+                current_total=0,
+                updated_at=updated_at,
+            )
+            for token_id in token_ids
+        }
+        for token_id, bucket_name, count, initial_total, current_total in self.db.execute(stmt):
+            summary = summaries[token_id]
+            setattr(summary, bucket_name, count)
+            summary.holders += count
+            summary.initial_total += int(initial_total)
+            summary.current_total += int(current_total)
+        for summary in summaries.values():
+            sold = summary.initial_total - summary.current_total
+            summary.percent_sold = round(100 * sold / summary.initial_total, 2) if summary.initial_total else 0.0
+            self.db.merge(summary)
+        try:
+            self.db.commit()
+        except Exception as e:
+            logger.error(f"Failed to refresh holder summaries: {str(e)}")
+            self.db.rollback()
+            raise
+        # Cached summaries are keyed by address, drop them all rather than resolve the changed tokens
+        get_cache().invalidate(HOLDER_SUMMARY_CACHE_NAMESPACE)
+
+    def get_summary(self, token_id: int) -> HolderSummary | None:
+        """
+        Get the retention summary of a token.
+
+        Args:
+            token_id (int): The ID of the token.
+
+        Returns:
+            HolderSummary | None: The summary, or None if it has not been computed yet.
+        """
+        return self.db.get(HolderSummary, token_id)
+
+    def replace_snapshot(self, token_id: int, balances: dict[str, int], snapshot_at: datetime):
+        """
+        Replace the holder snapshot of a token in one transaction, loading the balances with a batched insert.
+
+        Args:
+            token_id (int): The ID of the token.
+            balances (dict[str, int]): Balance per owner address.
+            snapshot_at (datetime): The timestamp of the snapshot.
+        """
+        rows = [
+            {"token_id": token_id, "address": address, "balance": balance, "snapshot_at": snapshot_at}
+            for address, balance in balances.items()
+        ]
+        try:
+            self.db.execute(delete(HolderSnapshot).where(HolderSnapshot.token_id == token_id))
+            if rows:
+                self.db.execute(insert(HolderSnapshot), rows)
+            self.db.commit()
+        except Exception as e:
+            logger.error(f"Failed to store the holder snapshot of token {token_id}: {str(e)}")
+            self.db.rollback()
+            raise
+
+    def get_snapshot_totals(self, token_id: int) -> tuple[int, int, datetime | None]:
+        """
+        Get the number of owners, the total balance and the timestamp of a token's holder snapshot.
+
+        Args:
+            token_id (int): The ID of the token.
+
+        Returns:
+            tuple[int, int, datetime | None]: Owners, total balance and timestamp, None if there is no snapshot.
+        """
+        holders, total, snapshot_at = self.db.execute(
+            select(
+                func.count(),
+                func.coalesce(func.sum(HolderSnapshot.balance), 0),
+                func.max(HolderSnapshot.snapshot_at),
+            ).where(HolderSnapshot.token_id == token_id)
+        ).one()
+        return holders, int(total), snapshot_at
+
+    def get_top_snapshot_holders(self, token_id: int, limit: int) -> list[HolderSnapshot]:
+        """
+        Get the largest owners of a token's holder snapshot.
+
+        Args:
+            token_id (int): The ID of the token.
+            limit (int): Maximum number of owners.
+
+        Returns:
+            list[HolderSnapshot]: The owners, by descending balance.
+        """
+        return (
+            self.db.query(HolderSnapshot)
+            .filter(HolderSnapshot.token_id == token_id)
+            .order_by(HolderSnapshot.balance.desc(), HolderSnapshot.address)
+            .limit(limit)
+            .all()
+        )
+
 
 # Dependency
 def get_token_repository(db: Session = Depends(get_db)) -> HolderRepository:
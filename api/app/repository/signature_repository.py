@@ -1,8 +1,14 @@
+import logging
+from typing import Optional
 from fastapi import HTTPException
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from app.models.signature import Signature
 from sqlalchemy.exc import IntegrityError
 
+logger = logging.getLogger("resources")
+
 
 class SignatureRepository:
     """
@@ -63,3 +69,75 @@ class SignatureRepository:
             self.db.rollback()
             raise HTTPException(status_code=400, detail="Integrity error on signature insertion.")
         return signatures
+
+    def add_new_signatures(self, signatures: list[dict]) -> int:
+        """
+        Add signatures to the database, skipping the ones already stored.
+
+        Args:
+            signatures (list[dict]): The signature, slot, block_time and token_id of every signature.
+
+        Returns:
+            int: Number of signatures actually inserted.
+        """
+        if not signatures:
+            return 0
+        try:
+            inserted = self.db.execute(pg_insert(Signature).values(signatures).on_conflict_do_nothing()).rowcount
+            self.db.commit()
+            return inserted
+        except Exception as e:
+            logger.error(f"Failed to store signatures: {str(e)}")
+            self.db.rollback()
+            raise
+
+    def get_newest(self, token_id: int) -> Optional[Signature]:
+        """
+        Get the stored signature of a token with the highest slot, read from the (token_id, slot) index.
+
+        Args:
+            token_id (int): The ID of the token.
+
+        Returns:
+            Signature | None: The newest stored signature, or None if none are stored.
+        """
+        stmt = (
+            select(Signature)
+            .where(Signature.token_id == token_id)
+            .order_by(Signature.slot.desc(), Signature.signature.desc())
+        )
+        return self.db.scalars(stmt.limit(1)).first()
+
+    def get_oldest(self, token_id: int) -> Optional[Signature]:
+        """
+        Get the stored signature of a token with the lowest slot, read from the (token_id, slot) index.
+
+        Args:
+            token_id (int): The ID of the token.
+
+        Returns:
+            Signature | None: The oldest stored signature, or None if none are stored.
+        """
+        stmt = select(Signature).where(Signature.token_id == token_id).order_by(Signature.slot, Signature.signature)
+        return self.db.scalars(stmt.limit(1)).first()
+
+    def get_after(self, token_id: int, slot: int, signature: str, limit: int) -> list[Signature]:
+        """
+        Get the stored signatures of a token after a position, in (slot, signature) order.
+
+        Args:
+            token_id (int): The ID of the token.
+            slot (int): The slot of the position, -1 to start from the oldest signature.
+            signature (str): The signature of the position.
+            limit (int): Maximum number of signatures to return.
+
+        Returns:
+            list[Signature]: The signatures following the position.
+        """
+        stmt = (
+            select(Signature)
+            .where(Signature.token_id == token_id, tuple_(Signature.slot, Signature.signature) > (slot, signature))
+            .order_by(Signature.slot, Signature.signature)
+            .limit(limit)
+        )
+        return list(self.db.scalars(stmt))
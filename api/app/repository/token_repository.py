@@ -1,12 +1,136 @@
 import logging
+from datetime import datetime
+from typing import Optional
 from psycopg2 import IntegrityError
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 from fastapi import Depends, HTTPException
 from app import get_db
+from app.cache import LRUCache
+from app.config import TOKEN_ID_CACHE_SIZE, TOKEN_ID_CACHE_TTL
+from app.models.crawl import CRAWL_PENDING, CRAWL_RUNNING, TokenCrawl
 from app.models.token import Token
 
 logger = logging.getLogger("resources")
 
+# Cache namespace of the address -> token ID mappings
+TOKEN_ID_CACHE_NAMESPACE = "token_id"
+
+# Process-wide address -> token ID mappings. A token's ID never changes, so only inserts invalidate them,
+# and only existing tokens are cached so that a token added by another worker is found at once
+_token_ids = LRUCache(max_entries=TOKEN_ID_CACHE_SIZE)
+
+
+def forget_token_ids(addresses: list[str]):
+    """
+    Drop the cached IDs of token addresses, called whenever tokens are inserted.
+
+    Args:
+        addresses (list[str]): The addresses of the tokens.
+    """
+    for address in addresses:
+        _token_ids.delete(TOKEN_ID_CACHE_NAMESPACE, address)
+
+
+class TokenResolver:
+    """
+    Resolves token addresses to token IDs and tokens for the services of one request.
+
+    Addresses are looked up in the request's own mappings first, then in the process-wide LRU cache
+    and only then in the database, so the router and every service of a request share one lookup.
+    Tokens are loaded by primary key, which the session serves from its identity map once loaded.
+
+    Attributes:
+        db (Session): The SQLAlchemy database session.
+    """
+
+    def __init__(self, db: Session):
+        """
+        Initializes the TokenResolver with a database session.
+
+        Args:
+            db (Session): The SQLAlchemy database session.
+        """
+        self.db = db
+        self._ids: dict[str, int] = {}
+
+    @classmethod
+    def for_session(cls, db: Session) -> "TokenResolver":
+        """
+        Get the resolver of a session, creating it on first use.
+
+        Args:
+            db (Session): The SQLAlchemy database session of the request.
+
+        Returns:
+            TokenResolver: The resolver shared by everything using the session.
+        """
+        resolver = db.info.get("token_resolver")
+        if resolver is None:
+            resolver = db.info["token_resolver"] = cls(db)
+        return resolver
+
+    def get_id(self, address: str) -> Optional[int]:
+        """
+        Resolve a token address to its ID.
+
+        Args:
+            address (str): The address of the token.
+
+        Returns:
+            int | None: The ID of the token, or None if it does not exist.
+        """
+        token_id = self._ids.get(address)
+        if token_id is not None:
+            return token_id
+        token_id = _token_ids.get(TOKEN_ID_CACHE_NAMESPACE, address)
+        if token_id is None:
+            token_id = self.db.query(Token.id).filter(Token.address == address).scalar()
+            if token_id is None:
+                return None
+            _token_ids.set(TOKEN_ID_CACHE_NAMESPACE, address, token_id, TOKEN_ID_CACHE_TTL)
+        self._ids[address] = token_id
+        return token_id
+
+    def get(self, address: str) -> Optional[Token]:
+        """
+        Resolve a token address to the token.
+
+        Args:
+            address (str): The address of the token.
+
+        Returns:
+            Token | None: The token, or None if it does not exist.
+        """
+        token_id = self.get_id(address)
+        if token_id is None:
+            return None
+        token = self.db.get(Token, token_id)
+        if token is None:
+            # the cached mapping outlived its token
+            forget_token_ids([address])
+            self._ids.pop(address, None)
+        return token
+
+    def get_or_404(self, address: str) -> Token:
+        """
+        Resolve a token address to the token or raise HTTP 404 if it does not exist.
+
+        Args:
+            address (str): The address of the token.
+
+        Returns:
+            Token: The token.
+
+        Raises:
+            HTTPException: If token with the given address is not found.
+        """
+        token = self.get(address)
+        if token is None:
+            raise HTTPException(status_code=404, detail=f"Token with address {address} not found.")
+        return token
+
 
 class TokenRepository:
     """
@@ -24,6 +148,7 @@ class TokenRepository:
             db (Session): The SQLAlchemy database session.
         """
         self.db = db
+        self.tokens = TokenResolver.for_session(db)
 
     def add_token(self, address: str):
         """
@@ -38,7 +163,7 @@ class TokenRepository:
         Raises:
             HTTPException: If failed to create token due to integrity error.
         """
-        existing_token = self.db.query(Token).filter_by(address=address).first()
+        existing_token = self.tokens.get(address)
         if existing_token:
             return existing_token
 
@@ -46,6 +171,7 @@ class TokenRepository:
             new_token = Token(address=address)
             self.db.add(new_token)
             self.db.commit()
+            forget_token_ids([address])
             self.db.refresh(new_token)
             return new_token
         except IntegrityError as e:
@@ -53,6 +179,40 @@ class TokenRepository:
             logger.error(str(e))
             raise HTTPException(status_code=400, detail="Failed to create token due to integrity error.")
 
+    def add_tokens(self, addresses: list[str]) -> list[Token]:
+        """
+        Add multiple tokens to the database in a single statement, skipping already existing ones.
+
+        The onboarding crawls of the new tokens are recorded as pending in the same transaction, so a
+        token is never stored without the crawl that fills it.
+
+        Args:
+            addresses (list[str]): The addresses of the tokens.
+
+        Returns:
+            list[Token]: The newly created tokens.
+        """
+        if not addresses:
+            return []
+        stmt = (
+            insert(Token)
+            .values([{"address": address} for address in addresses])
+            .on_conflict_do_nothing(index_elements=[Token.address])
+            .returning(Token)
+        )
+        try:
+            new_tokens = self.db.scalars(stmt).all()
+            now = datetime.now()
+            self.db.add_all(
+                [TokenCrawl(token_id=token.id, status=CRAWL_PENDING, updated_at=now) for token in new_tokens]
+            )
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        forget_token_ids([token.address for token in new_tokens])
+        return new_tokens
+
     def get_or_create_token(self, token_address: str):
         """
         Retrieve a token by address or create it if it does not exist.
@@ -63,11 +223,66 @@ class TokenRepository:
         Returns:
             Token: The retrieved or newly created token.
         """
-        token = self.db.query(Token).filter(Token.address == token_address).first()
+        token = self.tokens.get(token_address)
         if not token:
             token = self.add_token(token_address)
         return token
 
+    def set_metadata(self, metadata: dict[str, dict], resolved_at: datetime):
+        """
+        Store the resolved on-chain metadata of tokens with one bulk update.
+
+        Args:
+            metadata (dict[str, dict]): Name, symbol and authorities per token address, all None
+                for addresses that are not token mints.
+            resolved_at (datetime): The timestamp of the resolution.
+        """
+        if not metadata:
+            return
+        ids = dict(self.db.query(Token.address, Token.id).filter(Token.address.in_(metadata)).all())
+        rows = [
+            {"id": ids[address], "metadata_updated_at": resolved_at, **values}
+            for address, values in metadata.items()
+            if address in ids
+        ]
+        try:
+            self.db.execute(update(Token), rows)
+            self.db.commit()
+        except Exception as e:
+            logger.error(f"Failed to store token metadata: {str(e)}")
+            self.db.rollback()
+            raise
+
+    def get_unresolved_addresses(self) -> list[str]:
+        """
+        Get the addresses of the tokens whose on-chain metadata has never been resolved.
+
+        Returns:
+            list[str]: The addresses, in insertion order.
+        """
+        query = self.db.query(Token.address).filter(Token.metadata_updated_at.is_(None)).order_by(Token.id)
+        return [address for (address,) in query]
+
+    def set_creation(self, token: Token, signature: str, slot: int, block_time: Optional[int]):
+        """
+        Store the creation transaction of a token.
+
+        Args:
+            token (Token): The token.
+            signature (str): The signature of the creation transaction.
+            slot (int): The slot of the creation transaction.
+            block_time (int | None): The Unix block time of the creation transaction, if known.
+        """
+        token.creation_signature = signature
+        token.creation_slot = slot
+        token.creation_time = datetime.utcfromtimestamp(block_time) if block_time is not None else None
+        try:
+            self.db.commit()
+        except Exception as e:
+            logger.error(f"Failed to store the creation transaction of {token.address}: {str(e)}")
+            self.db.rollback()
+            raise
+
     def get_or_404(self, token_address: str):
         """
         Retrieve a token by address or raise HTTP 404 if it does not exist.
@@ -81,10 +296,7 @@ class TokenRepository:
         Raises:
             HTTPException: If token with the given address is not found.
         """
-        token = self.db.query(Token).filter(Token.address == token_address).first()
-        if not token:
-            raise HTTPException(status_code=404, detail=f"Token with address {token_address} not found.")
-        return token
+        return self.tokens.get_or_404(token_address)
 
     def get_or_none(self, token_address: str):
         """
@@ -96,8 +308,67 @@ class TokenRepository:
         Returns:
             Token: The retrieved token or None if not found.
         """
-        token = self.db.query(Token).filter(Token.address == token_address).first()
-        return token
+        return self.tokens.get(token_address)
+
+    def set_crawl_status(self, token_id: int, status: str, error: Optional[str] = None):
+        """
+        Record the state of a token's onboarding crawl.
+
+        Args:
+            token_id (int): The ID of the token.
+            status (str): pending, running, done or failed.
+            error (str | None): The error of a failed crawl.
+        """
+        self.db.merge(TokenCrawl(token_id=token_id, status=status, updated_at=datetime.now(), error=error))
+        self.db.commit()
+
+    def claim_crawl(
+        self, token_id: int, from_status: str, to_status: str, updated_before: Optional[datetime] = None
+    ) -> bool:
+        """
+        Atomically move a crawl from one state to another, so only one caller wins a race.
+
+        Args:
+            token_id (int): The ID of the token.
+            from_status (str): The state the crawl must be in.
+            to_status (str): The new state.
+            updated_before (datetime | None): If given, the crawl must also not have been updated since.
+
+        Returns:
+            bool: True if this call changed the state.
+        """
+        stmt = update(TokenCrawl).where(TokenCrawl.token_id == token_id, TokenCrawl.status == from_status)
+        if updated_before is not None:
+            stmt = stmt.where(TokenCrawl.updated_at < updated_before)
+        result = self.db.execute(stmt.values(status=to_status, updated_at=datetime.now(), error=None))
+        self.db.commit()
+        return result.rowcount == 1
+
+    def touch_crawl(self, token_id: int):
+        """
+        Refresh the timestamp of a running crawl, showing that it is still making progress.
+
+        Args:
+            token_id (int): The ID of the token.
+        """
+        self.db.execute(
+            update(TokenCrawl)
+            .where(TokenCrawl.token_id == token_id, TokenCrawl.status == CRAWL_RUNNING)
+            .values(updated_at=datetime.now())
+        )
+        self.db.commit()
+
+    def get_crawl(self, token_id: int) -> Optional[TokenCrawl]:
+        """
+        Get the state of a token's onboarding crawl.
+
+        Args:
+            token_id (int): The ID of the token.
+
+        Returns:
+            TokenCrawl | None: The crawl state, or None for tokens onboarded before crawls were tracked.
+        """
+        return self.db.get(TokenCrawl, token_id)
 
 
 # Dependency
@@ -1,46 +1,74 @@
 import logging
 import traceback
-from typing import List
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from datetime import datetime
+from typing import List, Literal
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from app.config import HOLDERS_INFO_MAX_AGE, TOKEN_INFO_MAX_AGE
+from app.crawl_scheduler import get_scheduler
+from app.deadline import DeadlineExceeded
+from app.http_cache import cache_headers, etag_matches, make_etag, not_modified
+from app.models.balance_history import BalancePointModel
+from app.models.crawl import CrawlStatusModel
 from app.models.holder import HolderModel
+from app.models.holder_ledger import HolderLedgerModel, SellEventModel
+from app.models.holder_snapshot import HolderSnapshotModel
+from app.models.holder_summary import HolderSummaryModel
+from app.services.export_service import EXPORT_FORMATS, stream_export
 from app.services.holder_service import HolderService
-from app.repository.token_repository import get_token_repository
+from app.repository.token_repository import TokenResolver, get_token_repository
 from app.services.token_service import TokenService
-from app import get_db
-from app.models.token import Token, TokenData, TokenModel
+from app import get_db, get_read_db
+from app.models.token import AddTokensRequest, AddTokensResult, TokenAgeModel, TokenData, TokenMetadataModel
+from app.profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 logger = logging.getLogger("resources")
 
 
 @router.get("/get_token_info/{address}", response_model=TokenData)
-async def get_token_info(address: str, db: Session = Depends(get_db)) -> TokenData:
+def get_token_info(
+    address: str,
+    response: Response,
+    if_none_match: str | None = Header(default=None),
+    db: Session = Depends(get_read_db),
+) -> TokenData:
     """
     Retrieve detailed information about a token.
 
     Args:
         address (str): The address of the token.
+        response (Response): The response, used to set caching headers.
+        if_none_match (str | None): ETag of the representation the client already has.
 
     Returns:
-        TokenData: Detailed information about the token.
+        TokenData: Detailed information about the token, or an empty 304 response if it has not changed.
 
     Raises:
         HTTPException: If the token with the specified address is not found.
 
     Notes:
         This endpoint uses the `TokenService` and `get_token_repository` to retrieve token information.
+        The ETag is derived from the cached Dexscreener snapshot version.
+        Querying a token boosts its crawl if it is still being crawled.
     """
+    get_scheduler().touch(address)
     token_service = TokenService(db)
     token_rep = get_token_repository(db)
     token = token_rep.get_or_404(address)
-    return token_service.get_token_info(token.address)
+    data, version = token_service.get_token_snapshot(token.address)
+    etag = make_etag(token.address, version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, TOKEN_INFO_MAX_AGE)
+    response.headers.update(cache_headers(etag, TOKEN_INFO_MAX_AGE))
+    return token_service.to_token_data(data)
 
 
-@router.post("/add_token/{address}", response_model=TokenModel)
-async def add_token(
+@router.post("/add_token/{address}", response_model=CrawlStatusModel)
+def add_token(
     address: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)
-) -> TokenModel:
+) -> CrawlStatusModel:
     """
     Add a new token to the database.
 
@@ -50,46 +78,417 @@ async def add_token(
         db (Session, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
-        TokenModel: The added token model.
+        CrawlStatusModel: The address of the token and the state of its crawl, which can be polled
+        with `/crawl_status/{address}`.
 
     Raises:
         HTTPException: If an error occurs while adding the token.
 
     Notes:
         This endpoint uses the `TokenService` to add the token asynchronously with background tasks.
+        It is idempotent: repeated and concurrent requests for the same address attach to the same crawl.
+        It runs in the threadpool so that concurrent requests actually overlap and share one validation.
     """
     token_service = TokenService(db)
     try:
         token = token_service.add_new_token(address, background_tasks)
         return token
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         error_log = traceback.format_exc()
         logger.error(f"Failed to add new token {address}: {error_log}")
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.post("/get_holders_info/{address}", response_model=List[HolderModel])
-async def get_holders_info(address: str, db: Session = Depends(get_db)) -> List[HolderModel]:
+@router.get("/crawl_status/{address}", response_model=CrawlStatusModel)
+def get_crawl_status(address: str, db: Session = Depends(get_read_db)) -> CrawlStatusModel:
+    """
+    Retrieve the state of a token's onboarding crawl.
+
+    Args:
+        address (str): The address of the token.
+        db (Session, optional): The database session. Defaults to Depends(get_read_db).
+
+    Returns:
+        CrawlStatusModel: pending, running, done or failed, with the time of the last change, and the
+        progress and estimated time left while the crawl is in the scheduler.
+
+    Raises:
+        HTTPException: If the token with the specified address is not found.
+    """
+    get_scheduler().touch(address)
+    return TokenService(db).get_crawl_status(address)
+
+
+@router.get("/get_token_age/{address}", response_model=TokenAgeModel)
+def get_token_age(address: str, db: Session = Depends(get_read_db)) -> TokenAgeModel:
+    """
+    Retrieve the creation transaction and age of a token.
+
+    Args:
+        address (str): The address of the token.
+        db (Session, optional): The database session. Defaults to Depends(get_read_db).
+
+    Returns:
+        TokenAgeModel: The creation signature, slot and time and the age of the token.
+
+    Raises:
+        HTTPException: If the token or its creation transaction is not found.
+
+    Notes:
+        The creation transaction is stored on the token by its crawl, later requests read it with the
+        token. For tokens whose crawl has not finished it is looked up on first request.
+    """
+    return TokenService(db).get_token_age(address)
+
+
+@router.get("/get_token_metadata/{address}", response_model=TokenMetadataModel)
+def get_token_metadata(address: str, db: Session = Depends(get_read_db)) -> TokenMetadataModel:
+    """
+    Retrieve the on-chain name, symbol and authorities of a token.
+
+    Args:
+        address (str): The address of the token.
+        db (Session, optional): The database session. Defaults to Depends(get_read_db).
+
+    Returns:
+        TokenMetadataModel: The name, symbol, mint, freeze and update authorities of the token.
+
+    Raises:
+        HTTPException: If the token with the specified address is not found.
+
+    Notes:
+        The metadata is stored on the token when it is added, tokens without it are resolved on first request.
+    """
+    return TokenService(db).get_token_metadata(address)
+
+
+@router.post("/resolve_metadata", status_code=status.HTTP_202_ACCEPTED)
+async def resolve_metadata(background_tasks: BackgroundTasks) -> dict:
+    """
+    Resolve the on-chain metadata of every token that has none yet.
+
+    Args:
+        background_tasks (BackgroundTasks): Background tasks to execute asynchronously.
+
+    Returns:
+        dict: Confirmation that the resolution has been scheduled.
+
+    Notes:
+        The resolution runs in the background with `TokenService.resolve_metadata_backlog`, one
+        `getMultipleAccounts` call per 50 tokens.
+    """
+    background_tasks.add_task(TokenService(db=next(get_db())).resolve_metadata_backlog)
+    return {"detail": "Metadata resolution scheduled."}
+
+
+@router.post("/add_tokens", response_model=AddTokensResult)
+def add_tokens(
+    request: AddTokensRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)
+) -> AddTokensResult:
+    """
+    Add multiple new tokens to the database.
+
+    Args:
+        request (AddTokensRequest): The addresses of the tokens.
+        background_tasks (BackgroundTasks): Background tasks to execute asynchronously.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        AddTokensResult: Outcome per address: added, already existing or invalid.
+
+    Raises:
+        HTTPException: If an error occurs while adding the tokens.
+
+    Notes:
+        This endpoint uses the `TokenService` to validate mints in batches and collect their info in the background.
+    """
+    token_service = TokenService(db)
+    try:
+        return token_service.add_new_tokens(request.addresses, background_tasks)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        error_log = traceback.format_exc()
+        logger.error(f"Failed to add new tokens: {error_log}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.api_route("/get_holders_info/{address}", methods=["GET", "POST"], response_model=List[HolderModel])
+def get_holders_info(
+    address: str,
+    response: Response,
+    if_none_match: str | None = Header(default=None),
+    db: Session = Depends(get_db),
+) -> List[HolderModel]:
     """
     Retrieve information about token holders.
 
     Args:
         address (str): The address of the token.
+        response (Response): The response, used to set caching headers.
+        if_none_match (str | None): ETag of the representation the client already has.
         db (Session, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
-        List[HolderModel]: Information about token holders.
+        List[HolderModel]: Information about token holders, or an empty 304 response if it has not changed.
 
     Raises:
         HTTPException: If the token with the specified address is not found.
 
     Notes:
         This endpoint uses the `HolderService` to retrieve and update information about token holders.
+        Balances are refreshed at most once per `HOLDERS_INFO_MAX_AGE` seconds, and the ETag is derived
+        from the holders' `last_checked`. Querying a token boosts its crawl if it is still being crawled.
     """
-    token = db.query(Token).filter(Token.address == address).first()
-    if not token:
+    get_scheduler().touch(address)
+    token_id = TokenResolver.for_session(db).get_id(address)
+    if token_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=f"Token with address {address} not found."
         )
     holder_service = HolderService(db)
-    return holder_service.update_holders_info(token.address)
+    holders = holder_service.get_holders_info(address, HOLDERS_INFO_MAX_AGE)
+    etag = make_etag(token_id, max(holder.last_checked for holder in holders).isoformat(), len(holders))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, HOLDERS_INFO_MAX_AGE)
+    response.headers.update(cache_headers(etag, HOLDERS_INFO_MAX_AGE))
+    return holders
+
+
+@router.get("/get_holders_summary/{address}", response_model=HolderSummaryModel)
+def get_holders_summary(
+    address: str,
+    response: Response,
+    if_none_match: str | None = Header(default=None),
+    db: Session = Depends(get_read_db),
+) -> HolderSummaryModel:
+    """
+    Retrieve the retention summary of token holders.
+
+    Args:
+        address (str): The address of the token.
+        response (Response): The response, used to set caching headers.
+        if_none_match (str | None): ETag of the representation the client already has.
+        db (Session, optional): The database session. Defaults to Depends(get_read_db).
+
+    Returns:
+        HolderSummaryModel: Holder counts per retention bucket and supply totals, or an empty 304 response
+        if it has not changed.
+
+    Raises:
+        HTTPException: If the token or its holders are not found.
+
+    Notes:
+        The summary is served as stored, balances are refreshed by `get_holders_info` and `refresh_holders`.
+        Querying a token boosts its crawl if it is still being crawled.
+    """
+    get_scheduler().touch(address)
+    holder_service = HolderService(db)
+    summary = holder_service.get_holders_summary(address)
+    etag = make_etag(summary.token_id, summary.updated_at.isoformat())
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, HOLDERS_INFO_MAX_AGE)
+    response.headers.update(cache_headers(etag, HOLDERS_INFO_MAX_AGE))
+    return summary
+
+
+@router.post("/snapshot_holders/{address}", response_model=HolderSnapshotModel)
+def snapshot_holders(
+    address: str, limit: int = Query(20, ge=1, le=1000), db: Session = Depends(get_db)
+) -> HolderSnapshotModel:
+    """
+    Take a full holder snapshot of a token, covering every owner of its token accounts.
+
+    Args:
+        address (str): The address of the token.
+        limit (int): Number of largest owners to return.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        HolderSnapshotModel: The owner count, total balance, top-10 concentration and largest owners.
+
+    Raises:
+        HTTPException: If the token with the specified address is not found.
+
+    Notes:
+        The snapshot costs one `getProgramAccounts` call per token and replaces the previous one.
+    """
+    return HolderService(db).snapshot_holders(address, limit)
+
+
+@router.get("/get_holders_snapshot/{address}", response_model=HolderSnapshotModel)
+def get_holders_snapshot(
+    address: str, limit: int = Query(20, ge=1, le=1000), db: Session = Depends(get_read_db)
+) -> HolderSnapshotModel:
+    """
+    Retrieve the holder distribution of a token from its latest snapshot.
+
+    Args:
+        address (str): The address of the token.
+        limit (int): Number of largest owners to return.
+        db (Session, optional): The database session. Defaults to Depends(get_read_db).
+
+    Returns:
+        HolderSnapshotModel: The owner count, total balance, top-10 concentration and largest owners.
+
+    Raises:
+        HTTPException: If the token or its snapshot is not found.
+    """
+    return HolderService(db).get_holders_snapshot(address, limit)
+
+
+@router.post("/update_ledger/{address}", response_model=HolderLedgerModel)
+def update_ledger(
+    address: str, limit: int = Query(20, ge=1, le=1000), db: Session = Depends(get_db)
+) -> HolderLedgerModel:
+    """
+    Fold the transactions crawled since the last fold into the holder ledger of a token.
+
+    Args:
+        address (str): The address of the token.
+        limit (int): Number of largest owners to return.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        HolderLedgerModel: The holder count, total balance, watermark and largest owners, with `complete`
+        False if the fold stopped after `LEDGER_BATCHES_PER_REQUEST` batches and should be requested again.
+
+    Raises:
+        HTTPException: If the token is not found or its signatures are still being crawled.
+
+    Notes:
+        Costs one `getTransaction` call per new transaction and no balance calls. The onboarding
+        crawl builds the ledger as well if `LEDGER_ON_CRAWL` is 1.
+    """
+    return HolderService(db).update_ledger(address, limit)
+
+
+@router.get("/get_holders_ledger/{address}", response_model=HolderLedgerModel)
+def get_holders_ledger(
+    address: str, limit: int = Query(20, ge=1, le=1000), db: Session = Depends(get_read_db)
+) -> HolderLedgerModel:
+    """
+    Retrieve the exact holders of a token from its ledger.
+
+    Args:
+        address (str): The address of the token.
+        limit (int): Number of largest owners to return.
+        db (Session, optional): The database session. Defaults to Depends(get_read_db).
+
+    Returns:
+        HolderLedgerModel: The holder count, total balance, watermark and largest owners with their first buy.
+
+    Raises:
+        HTTPException: If the token or its ledger is not found.
+    """
+    return HolderService(db).get_holders_ledger(address, limit)
+
+
+@router.get("/get_sell_events/{address}", response_model=List[SellEventModel])
+def get_sell_events(
+    address: str, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_read_db)
+) -> List[SellEventModel]:
+    """
+    Retrieve the latest sell events of a token's holders from its ledger.
+
+    Args:
+        address (str): The address of the token.
+        limit (int): Maximum number of events to return.
+        db (Session, optional): The database session. Defaults to Depends(get_read_db).
+
+    Returns:
+        List[SellEventModel]: The transactions that lowered a holder's balance, latest first.
+
+    Raises:
+        HTTPException: If the token with the specified address is not found.
+    """
+    return HolderService(db).get_sell_events(address, limit)
+
+
+@router.get("/get_balance_history/{address}", response_model=List[BalancePointModel])
+def get_balance_history(
+    address: str,
+    resolution: Literal["1m", "1h", "1d"] = "1h",
+    holder: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    db: Session = Depends(get_read_db),
+) -> List[BalancePointModel]:
+    """
+    Retrieve a downsampled balance series of token holders.
+
+    Args:
+        address (str): The address of the token.
+        resolution (str): The bucket width: 1m, 1h or 1d.
+        holder (str | None): The address of a holder, omit for the total balance of all holders.
+        since (datetime | None): Earliest bucket start to include.
+        until (datetime | None): Latest bucket start to include.
+        db (Session, optional): The database session. Defaults to Depends(get_read_db).
+
+    Returns:
+        List[BalancePointModel]: Last, lowest and highest balance per bucket, in chronological order.
+
+    Raises:
+        HTTPException: If the token with the specified address is not found.
+
+    Notes:
+        The series is read from the rollups maintained when balances change, buckets without changes are omitted.
+    """
+    holder_service = HolderService(db)
+    return holder_service.get_balance_history(address, resolution, holder, since, until)
+
+
+@router.post("/refresh_holders", status_code=status.HTTP_202_ACCEPTED)
+async def refresh_holders(background_tasks: BackgroundTasks) -> dict:
+    """
+    Refresh the balances of the holders of every tracked token.
+
+    Args:
+        background_tasks (BackgroundTasks): Background tasks to execute asynchronously.
+
+    Returns:
+        dict: Confirmation that the refresh has been scheduled.
+
+    Notes:
+        The refresh runs in the background with `HolderService.update_all_holders_info`, fetching every
+        wallet once no matter how many tracked tokens it holds.
+    """
+    background_tasks.add_task(HolderService(db=next(get_db())).update_all_holders_info)
+    return {"detail": "Holder refresh scheduled."}
+
+
+@router.get("/export/{table}/{address}", response_class=StreamingResponse)
+def export_token_data(
+    table: Literal["signatures", "holders"],
+    address: str,
+    export_format: Literal["ndjson", "parquet", "arrow"] = Query("ndjson", alias="format"),
+    db: Session = Depends(get_read_db),
+) -> StreamingResponse:
+    """
+    Stream all signatures or holders of a token.
+
+    Args:
+        table (str): The data to export: signatures or holders.
+        address (str): The address of the token.
+        export_format (str): The output format, passed as `format`: ndjson, parquet or arrow (Arrow IPC stream).
+        db (Session, optional): The database session. Defaults to Depends(get_read_db).
+
+    Returns:
+        StreamingResponse: The chunked export.
+
+    Raises:
+        HTTPException: If the token with the specified address is not found.
+
+    Notes:
+        Rows are read through a server-side cursor and written in batches of `EXPORT_BATCH_SIZE`,
+        the response is streamed from the threadpool so request workers are not blocked.
+    """
+    token = get_token_repository(db).get_or_404(address)
+    extension = {"ndjson": "ndjson", "parquet": "parquet", "arrow": "arrows"}[export_format]
+    return StreamingResponse(
+        stream_export(token.id, table, export_format),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{table}_{token.address}.{extension}"'},
+    )
@@ -0,0 +1,151 @@
+import json
+import logging
+from typing import Iterator
+from sqlalchemy import select
+from app import get_db
+from app.config import EXPORT_BATCH_SIZE
+from app.models.holder import Holder
+from app.models.signature import Signature
+
+logger = logging.getLogger("resources")
+
+# Export formats and their media types
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+# Exported tables: name -> (model, exported columns, sort column)
+EXPORT_TABLES = {
+    "signatures": (Signature, ("signature", "slot", "block_time"), "slot"),
+    "holders": (Holder, ("address", "initial_balance", "current_balance", "last_checked"), "address"),
+}
+
+
+class _ChunkSink:
+    """
+    Write-only file object collecting what the Arrow writers produce, so it can be yielded chunk by chunk.
+    """
+
+    def __init__(self):
+        self.chunks: list[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        """
+        Take everything written since the previous call.
+
+        Returns:
+            bytes: The written data.
+        """
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _arrow_schema(table: str):
+    """
+    Arrow schema of an exported table.
+
+    Args:
+        table (str): One of `EXPORT_TABLES`.
+
+    Returns:
+        pyarrow.Schema: The schema.
+    """
+    import pyarrow as pa
+
+    if table == "signatures":
+        return pa.schema([("signature", pa.string()), ("slot", pa.int64()), ("block_time", pa.int64())])
+    return pa.schema(
+        [
+            ("address", pa.string()),
+            ("initial_balance", pa.int64()),
+            ("current_balance", pa.int64()),
+            ("last_checked", pa.timestamp("us")),
+        ]
+    )
+
+
+def _row_batches(token_id: int, table: str) -> Iterator[list[tuple]]:
+    """
+    Read a token's rows through a server-side cursor, `EXPORT_BATCH_SIZE` rows at a time.
+
+    The export opens its own session: it outlives the request dependencies while the response streams.
+
+    Args:
+        token_id (int): The ID of the token.
+        table (str): One of `EXPORT_TABLES`.
+
+    Yields:
+        list[tuple]: The next batch of rows.
+    """
+    model, columns, sort_column = EXPORT_TABLES[table]
+    stmt = (
+        select(*(getattr(model, column) for column in columns))
+        .where(model.token_id == token_id)
+        .order_by(getattr(model, sort_column))
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    db_gen = get_db()
+    db = next(db_gen)
+    try:
+        for partition in db.execute(stmt).partitions():
+            yield partition
+    finally:
+        db_gen.close()
+
+
+def stream_export(token_id: int, table: str, export_format: str) -> Iterator[bytes]:
+    """
+    Stream a token's signatures or holders as NDJSON, Parquet or an Arrow IPC stream.
+
+    Rows are read through a server-side cursor and written one batch at a time, so memory use
+    does not depend on the number of exported rows.
+
+    Args:
+        token_id (int): The ID of the token.
+        table (str): One of `EXPORT_TABLES`.
+        export_format (str): One of `EXPORT_FORMATS`.
+
+    Yields:
+        bytes: The next chunk of the export.
+    """
+    _, columns, _ = EXPORT_TABLES[table]
+    rows_written = 0
+    if export_format == "ndjson":
+        for rows in _row_batches(token_id, table):
+            rows_written += len(rows)
+            yield "".join(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows).encode()
+    else:
+        # pyarrow is only needed, and only imported, for the columnar formats
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = _arrow_schema(table)
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema) if export_format == "parquet" else pa.ipc.new_stream(sink, schema)
+        for rows in _row_batches(token_id, table):
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            rows_written += len(rows)
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+    logger.info(f"Exported {rows_written} {table} of token {token_id} as {export_format}")
@@ -1,12 +1,29 @@
+import itertools
 import logging
+from collections import defaultdict
 from datetime import datetime
-from typing import List
+from typing import Iterator, List, Optional
 from sqlalchemy.orm import Session
 from fastapi import Depends, HTTPException
-from app.solana.solscan import TokenChainInfo
-from app.repository.holder_repository import HolderRepository
+from app.cache import get_cache
+from app.config import HOLDERS_INFO_MAX_AGE, LEDGER_BATCH_SIZE, LEDGER_BATCHES_PER_REQUEST
+from app.deadline import DeadlineExceeded
+from app.metrics import CIRCUIT_FALLBACKS, track_task
+from app.tracing import traced
+from app.repository.balance_history_repository import BalanceHistoryRepository
+from app.repository.holder_ledger_repository import HolderLedgerRepository
+from app.repository.holder_repository import HOLDER_SUMMARY_CACHE_NAMESPACE, HolderRepository
+from app.repository.signature_repository import SignatureRepository
+from app.repository.token_repository import TokenRepository, TokenResolver
+from app.services.signature_service import SignatureService
+from app.solana.transactions import BalanceDeltas
 from app import get_db
+from app.models.balance_history import BalancePointModel
+from app.models.crawl import CRAWL_DONE
 from app.models.holder import Holder, HolderModel
+from app.models.holder_ledger import HolderLedgerModel, LedgerHolderModel, SellEventModel
+from app.models.holder_snapshot import HolderSnapshotModel, SnapshotHolderModel
+from app.models.holder_summary import HolderSummaryModel
 from app.models.token import Token
 from app.models.signature import Signature
 
@@ -20,6 +37,9 @@ class HolderService:
     Attributes:
         db (Session): The SQLAlchemy database session.
         holder_repository (HolderRepository): The repository for holder-related operations.
+        history_repository (BalanceHistoryRepository): The repository for the holder balance history.
+        ledger_repository (HolderLedgerRepository): The repository for the holder ledger.
+        tokens (TokenResolver): Resolves token addresses to token IDs.
     """
 
     def __init__(self, db: Session):
@@ -31,7 +51,12 @@ class HolderService:
         """
         self.db = db
         self.holder_repository = HolderRepository(db)
+        self.history_repository = BalanceHistoryRepository(db)
+        self.ledger_repository = HolderLedgerRepository(db)
+        self.tokens = TokenResolver.for_session(db)
 
+    @track_task
+    @traced
     def collect_holders(self, token_address):
         """
         Collect signatures and store them in the database in batches.
@@ -42,32 +67,40 @@ class HolderService:
         Raises:
             HTTPException: If token or holders are not found.
         """
-        token = self.db.query(Token).filter(Token.address == token_address).first()
-        if not token:
+        token_id = self.tokens.get_id(token_address)
+        if token_id is None:
             logger.error("Token not found")
             raise HTTPException(status_code=404, detail="Token not found.")
         signatures = (
             self.db.query(Signature)
-            .filter(Signature.token_id == token.id)
+            .filter(Signature.token_id == token_id)
             .order_by(Signature.slot.asc())
             .all()
         )
+        from app.solana.solscan import TokenChainInfo
         tci = TokenChainInfo(token_address)
-        logger.info(f"Collecting holders for {token.id} {token.address}")
+        logger.info(f"Collecting holders for {token_id} {token_address}")
         signatures = [signature.signature for signature in signatures]
         unique_holders = tci.find_first_50_transactions(signatures=signatures)
         last_checked = datetime.now()
-        for pk, amount in unique_holders.items():
-            holder_address = str(pk)
-            holder = Holder(
-                address=holder_address,
-                token_id=token.id,
-                initial_balance=amount,
-                current_balance=amount,
-                last_checked=last_checked,
-            )
-            self.holder_repository.add_holder(holder)
+        self.holder_repository.upsert_holders(
+            [
+                {
+                    "address": str(pk),
+                    "token_id": token_id,
+                    "initial_balance": amount,
+                    "current_balance": amount,
+                    "last_checked": last_checked,
+                }
+                for pk, amount in unique_holders.items()
+            ]
+        )
+        self.history_repository.record_changes(
+            [(token_id, str(pk), amount) for pk, amount in unique_holders.items()], last_checked
+        )
+        self.holder_repository.refresh_summaries([token_id])
 
+    @traced
     def update_holders_info(self, token_address) -> List[HolderModel]:
         """
         Update holders' information in the database.
@@ -81,30 +114,432 @@ class HolderService:
         Raises:
             HTTPException: If token or holders are not found or update fails.
         """
-        token = self.db.query(Token).filter(Token.address == token_address).first()
-        if not token:
+        token_id = self.tokens.get_id(token_address)
+        if token_id is None:
             logger.error("Token not found")
             raise HTTPException(status_code=404, detail="Token not found.")
-        holders = self.db.query(Holder).filter(Holder.token_id == token.id).all()
+        holders = self.db.query(Holder).filter(Holder.token_id == token_id).all()
         if not holders:
-            logger.error(f"No holders found for token {token.address}")
+            logger.error(f"No holders found for token {token_address}")
             raise HTTPException(status_code=404, detail="Holders not found.")
+        from app.solana.solscan import TokenChainInfo
         tci = TokenChainInfo(token_address)
-        logger.info(f"Collecting holders for {token.id} {token.address}")
+        logger.info(f"Collecting holders for {token_id} {token_address}")
         holders_addresses = [holder.address for holder in holders]
         current_balances = tci.get_current_holders_balances(holders_addresses)
         last_checked = datetime.now()
+        changes = []
+        updated = []
         for holder, current_balance in zip(holders, current_balances):
-            holder.current_balance = current_balance
-            holder.last_checked = last_checked
+            if holder.current_balance != current_balance:
+                changes.append((token_id, holder.address, current_balance))
+            updated.append(
+                HolderModel(
+                    address=holder.address,
+                    token_id=token_id,
+                    initial_balance=holder.initial_balance,
+                    current_balance=current_balance,
+                    last_checked=last_checked,
+                )
+            )
+        self._update_balances([(token_id, holder.address, holder.current_balance, last_checked) for holder in updated])
+        logger.info(f"Updated holders information for token {token_address}")
+        self.history_repository.record_changes(changes, last_checked)
+        self.holder_repository.refresh_summaries([token_id])
+        return updated
+
+    @traced
+    def get_holders_info(self, token_address: str, max_age: float) -> List[Holder]:
+        """
+        Get holders' information, refreshing balances only when they are older than `max_age`.
+
+        If the refresh fails because the RPC is unavailable, the stored balances are served.
+
+        Args:
+            token_address (str): The address of the token.
+            max_age (float): Seconds stored balances stay fresh.
+
+        Returns:
+            List[Holder]: List of holders.
+
+        Raises:
+            HTTPException: If token or holders are not found or update fails.
+        """
+        token_id = self.tokens.get_id(token_address)
+        if token_id is None:
+            logger.error("Token not found")
+            raise HTTPException(status_code=404, detail="Token not found.")
+        holders = self.db.query(Holder).filter(Holder.token_id == token_id).all()
+        if not holders:
+            logger.error(f"No holders found for token {token_address}")
+            raise HTTPException(status_code=404, detail="Holders not found.")
+        oldest_check = min(holder.last_checked for holder in holders)
+        if (datetime.now() - oldest_check).total_seconds() >= max_age:
+            from solana.exceptions import SolanaRpcException
+            try:
+                return self.update_holders_info(token_address)
+            except SolanaRpcException as e:
+                logger.warning(f"Serving stored holders of {token_address}, refresh failed: {str(e)}")
+                self.db.rollback()
+                CIRCUIT_FALLBACKS.labels("solana_rpc").inc()
+        return holders
+
+    @track_task
+    @traced
+    def update_all_holders_info(self) -> int:
+        """
+        Update the balances of the holders of every tracked token.
+
+        Holders are grouped by wallet so a wallet shared by many tokens is fetched once, with one
+        unfiltered token accounts lookup per token program, and its balances are spread across every
+        tracked mint it holds. All balances are written in a single bulk update. Wallets whose balances
+        cannot be fetched, including stored addresses that are not valid public keys, are skipped and
+        keep their previous balances, so one bad wallet does not abort the refresh of all the others.
+
+        Returns:
+            int: Number of updated holders.
+
+        Raises:
+            HTTPException: If the update fails.
+        """
+        rows = self.db.query(Holder.address, Holder.token_id, Holder.current_balance, Token.address).join(Token).all()
+        mints_by_wallet = defaultdict(list)
+        for wallet, token_id, previous_balance, mint in rows:
+            mints_by_wallet[wallet].append((token_id, mint, previous_balance))
+        logger.info(f"Refreshing {len(rows)} holders across {len(mints_by_wallet)} wallets")
+        from solana.exceptions import SolanaRpcException
+        from app.solana.solscan import TokenChainInfo
+        updates = []
+        changes = []
+        for wallet, mints in mints_by_wallet.items():
+            try:
+                balances = TokenChainInfo.get_wallet_balances(wallet)
+            except (SolanaRpcException, ValueError) as e:
+                # ValueError: the stored wallet address is not a valid public key
+                logger.error(f"Failed to fetch balances of {wallet}: {str(e)}")
+                continue
+            last_checked = datetime.now()
+            for token_id, mint, previous_balance in mints:
+                current_balance = balances.get(mint, 0)
+                if current_balance != previous_balance:
+                    changes.append((token_id, wallet, current_balance))
+                updates.append((token_id, wallet, current_balance, last_checked))
+        if not updates:
+            return 0
+        self._update_balances(updates)
+        logger.info(f"Updated {len(updates)} holders")
+        self.history_repository.record_changes(changes, datetime.now())
+        self.holder_repository.refresh_summaries(token_id for token_id, _, _, _ in updates)
+        return len(updates)
+
+    def _update_balances(self, updates: list[tuple[int, str, int, datetime]]):
+        """
+        Write refreshed holder balances with one set-based update.
+
+        Args:
+            updates (list[tuple[int, str, int, datetime]]): Token ID, address, balance and check time per holder.
+
+        Raises:
+            HTTPException: If the update fails.
+        """
         try:
-            self.db.commit()
-            logger.info(f"Updated holders information for token {token.address}")
-        except Exception as e:
-            logger.error(f"Failed to update holders: {str(e)}")
-            self.db.rollback()
+            self.holder_repository.update_balances(updates)
+        except DeadlineExceeded:
+            raise
+        except Exception:
             raise HTTPException(status_code=500, detail="Failed to update holder information")
-        return holders
+
+    @traced
+    def snapshot_holders(self, token_address: str, limit: int = 20) -> HolderSnapshotModel:
+        """
+        Take a full holder snapshot of a token: the balance of every owner of its token accounts.
+
+        The token accounts of the mint are loaded with a single `getProgramAccounts` call, summed per
+        owner locally, and stored in place of the previous snapshot.
+
+        Args:
+            token_address (str): The address of the token.
+            limit (int): Number of largest owners to return.
+
+        Returns:
+            HolderSnapshotModel: The holder distribution of the new snapshot.
+
+        Raises:
+            HTTPException: If the token is not found.
+            SolanaRpcException: If the RPC call fails.
+        """
+        token_id = self.tokens.get_id(token_address)
+        if token_id is None:
+            logger.error("Token not found")
+            raise HTTPException(status_code=404, detail="Token not found.")
+        from app.solana.solscan import TokenChainInfo
+
+        balances = TokenChainInfo(token_address).get_all_holder_balances()
+        self.holder_repository.replace_snapshot(token_id, balances, datetime.now())
+        logger.info(f"Stored a snapshot of {len(balances)} holders of token {token_address}")
+        return self.get_holders_snapshot(token_address, limit)
+
+    @traced
+    def get_holders_snapshot(self, token_address: str, limit: int = 20) -> HolderSnapshotModel:
+        """
+        Get the holder distribution of a token from its latest snapshot.
+
+        Args:
+            token_address (str): The address of the token.
+            limit (int): Number of largest owners to return.
+
+        Returns:
+            HolderSnapshotModel: The owner count, total balance, top-10 concentration and largest owners.
+
+        Raises:
+            HTTPException: If the token or its snapshot is not found.
+        """
+        token_id = self.tokens.get_id(token_address)
+        if token_id is None:
+            logger.error("Token not found")
+            raise HTTPException(status_code=404, detail="Token not found.")
+        holders, total, snapshot_at = self.holder_repository.get_snapshot_totals(token_id)
+        if snapshot_at is None:
+            raise HTTPException(status_code=404, detail="Holder snapshot not found.")
+        top = self.holder_repository.get_top_snapshot_holders(token_id, max(limit, 10))
+
+        def percent(balance: int) -> float:
+            return round(100 * balance / total, 4) if total else 0.0
+
+        return HolderSnapshotModel(
+            token_id=token_id,
+            holders=holders,
+            total_balance=total,
+            top10_percent=percent(sum(holder.balance for holder in top[:10])),
+            snapshot_at=snapshot_at,
+            top_holders=[
+                SnapshotHolderModel(address=holder.address, balance=holder.balance, percent=percent(holder.balance))
+                for holder in top[:limit]
+            ],
+        )
+
+    def iter_ledger_batches(self, token_address: str) -> Iterator[int]:
+        """
+        Fold the crawled transactions of a token past its watermark into its holder ledger, batch by batch.
+
+        Each batch of `LEDGER_BATCH_SIZE` signatures is fetched and decoded into balance changes, which
+        are applied in (slot, signature) order and committed together with the new watermark. A rise of
+        an owner's balance sets its first buy if it has none, a fall is recorded as a sell. Stops when
+        another fold of the token moves the watermark first.
+
+        Must only run once the signature history of the token is complete, signatures stored later
+        below the watermark are never folded.
+
+        Args:
+            token_address (str): The address of the token.
+
+        Yields:
+            int: Number of transactions folded by the batch just committed.
+
+        Raises:
+            HTTPException: If the token is not found.
+            SolanaRpcException: If a transaction cannot be fetched, its batch is not committed.
+            ValueError: If the RPC does not return a transaction, its batch is not committed.
+        """
+        token_id = self.tokens.get_id(token_address)
+        if token_id is None:
+            logger.error("Token not found")
+            raise HTTPException(status_code=404, detail="Token not found.")
+        from app.solana.solscan import TokenChainInfo
+
+        tci = TokenChainInfo(token_address)
+        signature_repository = SignatureRepository(self.db)
+        watermark = self.ledger_repository.get_watermark(token_id)
+        previous = (watermark.slot, watermark.signature) if watermark is not None else None
+        transactions = watermark.transactions if watermark is not None else 0
+        while True:
+            slot, signature = previous or (-1, "")
+            batch = signature_repository.get_after(token_id, slot, signature, LEDGER_BATCH_SIZE)
+            if not batch:
+                return
+            deltas = list(tci.iter_balance_deltas([sig.signature for sig in batch], skip_errors=False))
+            owners = {owner for tx_deltas in deltas if tx_deltas is not None for owner in tx_deltas.balances}
+            entries, sells = _fold_ledger(
+                token_id, batch, deltas, self.ledger_repository.get_entries(token_id, owners)
+            )
+            transactions += len(batch)
+            watermark = {
+                "slot": batch[-1].slot,
+                "signature": batch[-1].signature,
+                "transactions": transactions,
+                "updated_at": datetime.now(),
+            }
+            if not self.ledger_repository.apply_batch(token_id, entries, sells, watermark, previous):
+                logger.info(f"Holder ledger of {token_address} is being folded by another worker")
+                return
+            previous = (watermark["slot"], watermark["signature"])
+            yield len(batch)
+
+    @traced
+    def update_ledger(self, token_address: str, limit: int = 20) -> HolderLedgerModel:
+        """
+        Collect the signatures made since the last crawl and fold them into the holder ledger of a token.
+
+        At most `LEDGER_BATCHES_PER_REQUEST` batches are folded, so a long history is folded over several
+        calls, each continuing from the watermark left by the previous one.
+
+        Args:
+            token_address (str): The address of the token.
+            limit (int): Number of largest owners to return.
+
+        Returns:
+            HolderLedgerModel: The holder count, total balance, watermark and largest owners, with `complete`
+            False if crawled transactions are left to fold.
+
+        Raises:
+            HTTPException: If the token is not found or its signature crawl is not finished.
+        """
+        token_id = self.tokens.get_id(token_address)
+        if token_id is None:
+            logger.error("Token not found")
+            raise HTTPException(status_code=404, detail="Token not found.")
+        crawl = TokenRepository(self.db).get_crawl(token_id)
+        if crawl is not None and crawl.status != CRAWL_DONE:
+            raise HTTPException(status_code=409, detail="Signatures of the token are still being crawled.")
+        SignatureService(self.db).collect_new_signatures(token_address)
+        folded = sum(itertools.islice(self.iter_ledger_batches(token_address), LEDGER_BATCHES_PER_REQUEST))
+        logger.info(f"Folded {folded} transactions into the holder ledger of {token_address}")
+        ledger = self.get_holders_ledger(token_address, limit)
+        watermark = self.ledger_repository.get_watermark(token_id)
+        ledger.complete = not SignatureRepository(self.db).get_after(token_id, watermark.slot, watermark.signature, 1)
+        return ledger
+
+    def get_holders_ledger(self, token_address: str, limit: int = 20) -> HolderLedgerModel:
+        """
+        Get the holders of a token from its ledger.
+
+        Args:
+            token_address (str): The address of the token.
+            limit (int): Number of largest owners to return.
+
+        Returns:
+            HolderLedgerModel: The holder count, total balance, watermark and largest owners.
+
+        Raises:
+            HTTPException: If the token or its ledger is not found.
+        """
+        token_id = self.tokens.get_id(token_address)
+        if token_id is None:
+            logger.error("Token not found")
+            raise HTTPException(status_code=404, detail="Token not found.")
+        watermark = self.ledger_repository.get_watermark(token_id)
+        if watermark is None:
+            raise HTTPException(status_code=404, detail="Holder ledger not found.")
+        holders, total = self.ledger_repository.get_totals(token_id)
+        return HolderLedgerModel(
+            token_id=token_id,
+            holders=holders,
+            total_balance=total,
+            transactions=watermark.transactions,
+            watermark_slot=watermark.slot,
+            updated_at=watermark.updated_at,
+            top_holders=[
+                LedgerHolderModel(
+                    address=holder.address,
+                    balance=holder.balance,
+                    first_buy_at=holder.first_buy_at,
+                    sells=holder.sells,
+                )
+                for holder in self.ledger_repository.get_top_holders(token_id, limit)
+            ],
+        )
+
+    def get_sell_events(self, token_address: str, limit: int = 100) -> List[SellEventModel]:
+        """
+        Get the latest sell events of a token's holders from its ledger.
+
+        Args:
+            token_address (str): The address of the token.
+            limit (int): Maximum number of events to return.
+
+        Returns:
+            List[SellEventModel]: The events, latest first.
+
+        Raises:
+            HTTPException: If the token is not found.
+        """
+        token_id = self.tokens.get_id(token_address)
+        if token_id is None:
+            logger.error("Token not found")
+            raise HTTPException(status_code=404, detail="Token not found.")
+        return [SellEventModel.model_validate(sell) for sell in self.ledger_repository.get_sells(token_id, limit)]
+
+    @traced
+    def get_holders_summary(self, token_address: str) -> HolderSummaryModel:
+        """
+        Get the materialized retention summary of a token's holders.
+
+        The summary is recomputed whenever holder balances change; it is computed here only
+        for tokens whose holders were stored before summaries existed. Summaries are served from
+        the shared cache until they are recomputed or `HOLDERS_INFO_MAX_AGE` passes.
+
+        Args:
+            token_address (str): The address of the token.
+
+        Returns:
+            HolderSummaryModel: The retention summary.
+
+        Raises:
+            HTTPException: If token or holders are not found.
+        """
+        cache = get_cache()
+        cached = cache.get(HOLDER_SUMMARY_CACHE_NAMESPACE, token_address)
+        if cached is not None:
+            return HolderSummaryModel.model_validate(cached)
+        token_id = self.tokens.get_id(token_address)
+        if token_id is None:
+            logger.error("Token not found")
+            raise HTTPException(status_code=404, detail="Token not found.")
+        summary = self.holder_repository.get_summary(token_id)
+        if summary is None:
+            self.holder_repository.refresh_summaries([token_id])
+            summary = self.holder_repository.get_summary(token_id)
+        if not summary.holders:
+            logger.error(f"No holders found for token {token_address}")
+            raise HTTPException(status_code=404, detail="Holders not found.")
+        summary = HolderSummaryModel.model_validate(summary)
+        cache.set(HOLDER_SUMMARY_CACHE_NAMESPACE, token_address, summary.model_dump(mode="json"), HOLDERS_INFO_MAX_AGE)
+        return summary
+
+    @traced
+    def get_balance_history(
+        self,
+        token_address: str,
+        resolution: str,
+        holder_address: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> list[BalancePointModel]:
+        """
+        Get a downsampled balance series of a token's holders, or of one holder, from the rollups.
+
+        Args:
+            token_address (str): The address of the token.
+            resolution (str): The bucket width, one of `RESOLUTIONS`.
+            holder_address (str | None): The address of the holder, None for the total of all holders.
+            since (datetime | None): Earliest bucket start to include.
+            until (datetime | None): Latest bucket start to include.
+
+        Returns:
+            list[BalancePointModel]: The series in chronological order.
+
+        Raises:
+            HTTPException: If the token is not found.
+        """
+        token_id = self.tokens.get_id(token_address)
+        if token_id is None:
+            logger.error("Token not found")
+            raise HTTPException(status_code=404, detail="Token not found.")
+        if holder_address is None:
+            buckets = self.history_repository.get_token_series(token_id, resolution, since, until)
+        else:
+            buckets = self.history_repository.get_holder_series(token_id, holder_address, resolution, since, until)
+        return [BalancePointModel.model_validate(bucket) for bucket in buckets]
 
 
 # Dependency
@@ -119,3 +554,58 @@ def get_holder_service(db: Session = Depends(get_db)):
         HolderService: The HolderService instance.
     """
     return HolderService(db)
+
+
+def _fold_ledger(
+    token_id: int, signatures: list[Signature], deltas: list[Optional[BalanceDeltas]], entries: dict[str, dict]
+) -> tuple[list[dict], list[dict]]:
+    """
+    Apply the balance changes of a batch of transactions to the ledger entries of their owners.
+
+    Args:
+        token_id (int): The ID of the token.
+        signatures (list[Signature]): The transactions of the batch, in (slot, signature) order.
+        deltas (list[BalanceDeltas | None]): The balance changes of each transaction, None for failed ones.
+        entries (dict[str, dict]): The stored entries of the owners, updated in place.
+
+    Returns:
+        tuple[list[dict], list[dict]]: The entries changed by the batch, and its sell events.
+    """
+    changed = {}
+    sells = []
+    for signature, tx_deltas in zip(signatures, deltas):
+        if tx_deltas is None:
+            continue
+        block_time = datetime.utcfromtimestamp(signature.block_time)
+        for owner, (pre_balance, post_balance) in tx_deltas.balances.items():
+            entry = entries.get(owner)
+            if entry is None:
+                entry = entries[owner] = {
+                    "token_id": token_id,
+                    "address": owner,
+                    "balance": 0,
+                    "first_buy_at": None,
+                    "first_buy_slot": None,
+                    "sells": 0,
+                }
+            change = post_balance - pre_balance
+            entry["balance"] += change
+            entry["last_slot"] = signature.slot
+            if change > 0 and entry["first_buy_slot"] is None:
+                entry["first_buy_at"] = block_time
+                entry["first_buy_slot"] = signature.slot
+            elif change < 0:
+                entry["sells"] += 1
+                sells.append(
+                    {
+                        "token_id": token_id,
+                        "signature": signature.signature,
+                        "address": owner,
+                        "slot": signature.slot,
+                        "sold_at": block_time,
+                        "amount": -change,
+                        "balance": entry["balance"],
+                    }
+                )
+            changed[owner] = entry
+    return list(changed.values()), sells
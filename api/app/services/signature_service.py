@@ -1,10 +1,11 @@
 import logging
+from typing import Iterator
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
+from app.metrics import SIGNATURES_INGESTED, track_task
+from app.tracing import traced
 from app.repository.signature_repository import SignatureRepository
-from app.solana.solscan import TokenChainInfo
-from app.models.signature import Signature
-from app.models.token import Token
+from app.repository.token_repository import TokenResolver
 
 logger = logging.getLogger("resources")
 
@@ -16,6 +17,7 @@ class SignatureService:
     Attributes:
         db (Session): The SQLAlchemy database session.
         signature_repository (SignatureRepository): The repository for signature-related operations.
+        tokens (TokenResolver): Resolves token addresses to token IDs.
     """
 
     def __init__(self, db: Session):
@@ -27,7 +29,10 @@ class SignatureService:
         """
         self.db = db
         self.signature_repository = SignatureRepository(db)
+        self.tokens = TokenResolver.for_session(db)
 
+    @track_task
+    @traced
     def collect_signatures(self, token_address: str):
         """
         Collect signatures and store them in the database in batches.
@@ -38,24 +43,103 @@ class SignatureService:
         Raises:
             HTTPException: If token is not found.
         """
-        token = self.db.query(Token).filter(Token.address == token_address).first()
-        if not token:
+        for _ in self.iter_signature_pages(token_address):
+            pass
+
+    def iter_signature_pages(self, token_address: str) -> Iterator[int]:
+        """
+        Collect signatures page by page, storing every page before fetching the next one.
+
+        Lets the crawl scheduler interleave the signature crawls of several tokens. Pages are stored
+        newest first, so the stored signatures of an interrupted crawl are a contiguous stretch of the
+        history: a retried crawl collects what was made since its newest signature, then resumes before
+        its oldest one instead of fetching the stored pages again. Signatures already stored are
+        skipped, so overlapping pages are harmless.
+
+        Args:
+            token_address (str): The address of the token.
+
+        Yields:
+            int: Number of signatures stored from the page just fetched.
+
+        Raises:
+            HTTPException: If token is not found.
+        """
+        token_id = self.tokens.get_id(token_address)
+        if token_id is None:
             logger.error("Token not found")
             raise HTTPException(status_code=404, detail="Token not found.")
+        from app.solana.solscan import TokenChainInfo
         tci = TokenChainInfo(token_address)
-        current_batch = []
-        logger.info(f"Collecting signatures for {token.id} {token.address}")
-        for signatures_batch in tci.collect_token_signatures():
-            for signature in signatures_batch:
-                sig_model = Signature(
-                    signature=str(signature.signature),
-                    slot=int(signature.slot),
-                    block_time=int(signature.block_time),
-                    token_id=token.id,  # Assuming this is already known
-                )
-                current_batch.append(sig_model)
-                self.signature_repository.add_signatures(current_batch)
-                current_batch = []
-
-        if current_batch:
-            self.signature_repository.add_signatures(current_batch)
+        newest = self.signature_repository.get_newest(token_id)
+        oldest = self.signature_repository.get_oldest(token_id)
+        if newest is None:
+            logger.info(f"Collecting signatures for {token_id} {token_address}")
+            walks = [tci.collect_token_signatures()]
+        else:
+            logger.info(f"Resuming the signature collection of {token_id} {token_address}")
+            walks = [
+                tci.collect_token_signatures(until=newest.signature),
+                tci.collect_token_signatures(before=oldest.signature),
+            ]
+        for walk in walks:
+            for signatures_batch in walk:
+                yield self._store(token_id, signatures_batch)
+
+    @traced
+    def collect_new_signatures(self, token_address: str) -> int:
+        """
+        Collect the signatures made since the newest stored one, walking back only until it.
+
+        Signatures already stored are skipped, so an overlap with a running or earlier collection is harmless.
+        Tokens without stored signatures are left to their first crawl.
+
+        Args:
+            token_address (str): The address of the token.
+
+        Returns:
+            int: Number of signatures stored.
+
+        Raises:
+            HTTPException: If token is not found.
+        """
+        token_id = self.tokens.get_id(token_address)
+        if token_id is None:
+            logger.error("Token not found")
+            raise HTTPException(status_code=404, detail="Token not found.")
+        newest = self.signature_repository.get_newest(token_id)
+        if newest is None:
+            return 0
+        from app.solana.solscan import TokenChainInfo
+        tci = TokenChainInfo(token_address)
+        stored = sum(
+            self._store(token_id, signatures_batch)
+            for signatures_batch in tci.collect_token_signatures(until=newest.signature)
+        )
+        logger.info(f"Collected {stored} new signatures for {token_id} {token_address}")
+        return stored
+
+    def _store(self, token_id: int, signatures_batch: list) -> int:
+        """
+        Store a page of signatures of a token, skipping the ones already stored.
+
+        Args:
+            token_id (int): The ID of the token.
+            signatures_batch (list[RpcConfirmedTransactionStatusWithSignature]): The page.
+
+        Returns:
+            int: Number of signatures inserted.
+        """
+        inserted = self.signature_repository.add_new_signatures(
+            [
+                {
+                    "signature": str(signature.signature),
+                    "slot": int(signature.slot),
+                    "block_time": int(signature.block_time),
+                    "token_id": token_id,
+                }
+                for signature in signatures_batch
+            ]
+        )
+        SIGNATURES_INGESTED.inc(inserted)
+        return inserted
@@ -1,18 +1,37 @@
+import math
+import time
+from datetime import datetime, timedelta
 from functools import cached_property
+from typing import Callable, Iterator, Optional
 from fastapi import BackgroundTasks, HTTPException
 from pydantic import ValidationError
 from sqlalchemy.orm import Session
 import logging
+from app.config import CRAWL_STALE_AFTER, LEDGER_BATCH_SIZE, LEDGER_ON_CRAWL
+from app.metrics import track_task
+from app.tracing import traced
 from app.services.holder_service import HolderService
 from app.services.signature_service import SignatureService
+from app.repository.signature_repository import SignatureRepository
 from app.repository.token_repository import TokenRepository
-from app.solana.solscan import TokenChainInfo
-from app.solana.dexscreener import get_token_info_from_dex
-from app import get_db
-from app.models.token import Token, TokenData, TokenInfo
+from app.solana.dexscreener import get_token_info_from_dex, get_token_snapshot_from_dex
+from app import SessionLocal, get_engine
+from app.crawl_scheduler import CrawlStep, get_scheduler
+from app.models.crawl import (
+    CRAWL_DONE,
+    CRAWL_FAILED,
+    CRAWL_PENDING,
+    CRAWL_RUNNING,
+    CrawlStatusModel,
+)
+from app.models.token import AddTokenResult, AddTokensResult, Token, TokenAgeModel, TokenData, TokenMetadataModel
+from app.singleflight import SingleFlight
 
 logger = logging.getLogger("resources")
 
+# Onboardings in flight in this process, concurrent requests for the same address share one
+_onboarding = SingleFlight()
+
 
 class TokenService:
     """
@@ -41,9 +60,11 @@ class TokenService:
         """
         return TokenRepository(self.db)
 
+    @track_task
+    @traced
     def get_update_authority(self, token_address: str) -> Token:
         """
-        Get the update authority for a token.
+        Get the update authority for a token, resolving its on-chain metadata.
 
         Args:
             token_address (str): The address of the token.
@@ -52,46 +73,145 @@ class TokenService:
             Token: The token object with updated authority.
 
         Raises:
-            HTTPException: If token is not found or an error occurs during update.
+            HTTPException: If token is not found.
         """
-        db = get_db()
+        token = self.token_repository.get_or_404(token_address)
+        logger.info(f"Searching update authority for {token.address}...")
         try:
-            token = self.db.query(Token).filter(Token.address == token_address).first()
-            if not token:
-                logger.error("Token not found")
-                raise HTTPException(status_code=404, detail="Token not found.")
-            tci = TokenChainInfo(token.address)
-            logger.info(f"Searching update authority for {token.address}...")
-            token.update_authority = str(tci.get_token_update_authority())
-            logger.info(f"{token.update_authority=}")
-            self.token_repository.db.commit()
-            self.db.refresh(token)
-            return token
-
+            self.resolve_metadata([token.address])
         except Exception as e:
-            db.rollback()
             logger.error(f"Error updating token: {str(e)}")
-        finally:
-            db.close()
+        self.db.refresh(token)
+        logger.info(f"{token.update_authority=}")
+        return token
 
-    def get_deploy_transaction(self, tci: TokenChainInfo, token: Token) -> Token:
+    @traced
+    def resolve_metadata(self, token_addresses: list[str]) -> int:
         """
-        Get the deployment transaction for a token.
+        Resolve and store the name, symbol and authorities of tokens.
+
+        Mint and Metaplex metadata accounts are fetched together, one RPC call per
+        `METADATA_MINTS_PER_CALL` mints, and every chunk is stored with one bulk update.
 
         Args:
-            tci (TokenChainInfo): The TokenChainInfo instance.
-            token (Token): The token object.
+            token_addresses (list[str]): The addresses of the tokens.
 
         Returns:
-            Token: The token object with updated deployment transaction.
+            int: Number of tokens resolved as token mints.
+        """
+        from app.solana.layouts import METADATA_MINTS_PER_CALL
+        from app.solana.solscan import TokenChainInfo
+        resolved = 0
+        for i in range(0, len(token_addresses), METADATA_MINTS_PER_CALL):
+            chunk = token_addresses[i: i + METADATA_MINTS_PER_CALL]
+            found = TokenChainInfo.get_tokens_metadata(chunk)
+            metadata = {}
+            for address in chunk:
+                info = found.get(address)
+                metadata[address] = {
+                    "name": info.name if info else None,
+                    "symbol": info.symbol if info else None,
+                    "mint_authority": str(info.mint_authority) if info and info.mint_authority else None,
+                    "freeze_authority": str(info.freeze_authority) if info and info.freeze_authority else None,
+                    "update_authority": str(info.update_authority) if info and info.update_authority else None,
+                }
+            self.token_repository.set_metadata(metadata, datetime.utcnow())
+            resolved += len(found)
+        return resolved
+
+    @track_task
+    def resolve_metadata_backlog(self) -> int:
+        """
+        Resolve the on-chain metadata of every token that has none yet.
+
+        Returns:
+            int: Number of tokens resolved as token mints.
+        """
+        addresses = self.token_repository.get_unresolved_addresses()
+        logger.info(f"Resolving metadata of {len(addresses)} tokens")
+        return self.resolve_metadata(addresses)
+
+    def get_token_metadata(self, token_address: str) -> TokenMetadataModel:
+        """
+        Get the on-chain metadata of a token, resolving it on first use.
+
+        Args:
+            token_address (str): The address of the token.
+
+        Returns:
+            TokenMetadataModel: The name, symbol and authorities of the token.
+
+        Raises:
+            HTTPException: If the token is not found.
+        """
+        token = self.token_repository.get_or_404(token_address)
+        if token.metadata_updated_at is None:
+            self.resolve_metadata([token.address])
+            self.db.refresh(token)
+        return TokenMetadataModel.model_validate(token)
+
+    @track_task
+    @traced
+    def get_deploy_transaction(self, token_address: str, signatures_complete: bool = False) -> Token:
+        """
+        Find the creation transaction of a token and store its signature, slot and time on the token.
+
+        Once the token's signatures have been crawled, the oldest stored signature is the creation
+        transaction and is read from the (token_id, slot) index. Otherwise the history is walked
+        backwards on chain without storing it.
+
+        Args:
+            token_address (str): The address of the token.
+            signatures_complete (bool): Whether the caller has just crawled all the token's signatures.
+
+        Returns:
+            Token: The token with its creation transaction.
 
         Raises:
-            HTTPException: If an error occurs during retrieval.
+            HTTPException: If the token or its creation transaction is not found.
         """
-        token.initial_sig = str(tci.find_deploy_transaction())
-        self.token_repository.db.commit()
+        token = self.token_repository.get_or_404(token_address)
+        if token.creation_signature is not None:
+            return token
+        crawl = self.token_repository.get_crawl(token.id)
+        oldest = None
+        if signatures_complete or crawl is None or crawl.status == CRAWL_DONE:
+            oldest = SignatureRepository(self.db).get_oldest(token.id)
+        if oldest is None:
+            from app.solana.solscan import TokenChainInfo
+            logger.info(f"Walking the signature history of {token_address} back to its creation")
+            oldest = TokenChainInfo(token_address).find_deploy_transaction()
+        if oldest is None:
+            raise HTTPException(status_code=404, detail="Creation transaction not found.")
+        self.token_repository.set_creation(
+            token, str(oldest.signature), int(oldest.slot), int(oldest.block_time) if oldest.block_time else None
+        )
         return token
 
+    def get_token_age(self, token_address: str) -> TokenAgeModel:
+        """
+        Get the creation transaction and age of a token, finding the transaction on first use.
+
+        Args:
+            token_address (str): The address of the token.
+
+        Returns:
+            TokenAgeModel: The creation signature, slot and time and the age of the token.
+
+        Raises:
+            HTTPException: If the token or its creation transaction is not found.
+        """
+        token = self.get_deploy_transaction(token_address)
+        age = (datetime.utcnow() - token.creation_time).total_seconds() if token.creation_time else None
+        return TokenAgeModel(
+            address=token.address,
+            creation_signature=token.creation_signature,
+            creation_slot=token.creation_slot,
+            creation_time=token.creation_time,
+            age_seconds=age,
+        )
+
+    @traced
     def check_if_token(self, token_address: str):
         """
         Check if the provided address is a token address.
@@ -102,37 +222,222 @@ class TokenService:
         Raises:
             HTTPException: If the address is not a token address.
         """
+        from app.solana.solscan import TokenChainInfo
         tci = TokenChainInfo(token_address)
         is_token, msg = tci.check_if_token()
         if not is_token:
             logger.error(str(msg))
             raise HTTPException(status_code=404, detail=str(msg))
 
-    def add_new_token(self, token_address: str, background_tasks: BackgroundTasks) -> TokenInfo:
+    @traced
+    def add_new_token(self, token_address: str, background_tasks: BackgroundTasks) -> CrawlStatusModel:
         """
-        Add a new token to the database.
+        Add a new token to the database and schedule its crawl, or attach to the existing one.
+
+        Onboarding is idempotent: concurrent requests for the same address in this process share a
+        single validation, the insert is an upsert so only the request that created the token schedules
+        the crawl, and a failed or abandoned crawl is retried by whichever request claims it first.
 
         Args:
             token_address (str): The address of the token.
             background_tasks (BackgroundTasks): BackgroundTasks instance for scheduling tasks.
 
         Returns:
-            TokenInfo: The token information.
+            CrawlStatusModel: The state of the token's crawl.
 
         Raises:
-            HTTPException: If the token is not found or an error occurs during addition.
+            HTTPException: If the address is not a token address or an error occurs during addition.
         """
         logger.info("Adding new token to the database")
         token = self.token_repository.get_or_none(token_address)
         if token is None:
-            self.check_if_token(token_address)
-            token = self.token_repository.add_token(token_address)
-            # Schedule the collect_token_info to run in the background
-            background_tasks.add_task(self.get_update_authority, token_address)
-            background_tasks.add_task(SignatureService(db=next(get_db())).collect_signatures, token_address)
-            background_tasks.add_task(HolderService(db=next(get_db())).collect_holders, token_address)
-        return token
+            (token_id, created), shared = _onboarding.do(token_address, lambda: self._insert_token(token_address))
+            if created and not shared:
+                background_tasks.add_task(_schedule_crawl, token_address)
+        else:
+            token_id = token.id
+        retry = self.token_repository.claim_crawl(token_id, CRAWL_FAILED, CRAWL_PENDING)
+        if retry or self._claim_abandoned_crawl(token_id, token_address):
+            logger.info(f"Retrying failed or abandoned crawl of {token_address}")
+            background_tasks.add_task(_schedule_crawl, token_address)
+        return self.get_crawl_status(token_address)
+
+    def _claim_abandoned_crawl(self, token_id: int, token_address: str) -> bool:
+        """
+        Move a running crawl without progress for `CRAWL_STALE_AFTER` seconds back to pending.
+
+        Such a crawl was left running by a worker that stopped. Crawls running in this process are never claimed.
+
+        Args:
+            token_id (int): The ID of the token.
+            token_address (str): The address of the token.
+
+        Returns:
+            bool: True if this call claimed the crawl.
+        """
+        if get_scheduler().progress(token_address) is not None:
+            return False
+        stale_before = datetime.now() - timedelta(seconds=CRAWL_STALE_AFTER)
+        return self.token_repository.claim_crawl(token_id, CRAWL_RUNNING, CRAWL_PENDING, updated_before=stale_before)
+
+    def _insert_token(self, token_address: str) -> tuple[int, bool]:
+        """
+        Validate the address and insert the token together with its pending crawl, unless another worker already has.
+
+        Args:
+            token_address (str): The address of the token.
+
+        Returns:
+            tuple[int, bool]: The ID of the token and whether this call created it.
+
+        Raises:
+            HTTPException: If the address is not a token address.
+        """
+        self.check_if_token(token_address)
+        new_tokens = self.token_repository.add_tokens([token_address])
+        if not new_tokens:
+            return self.token_repository.get_or_404(token_address).id, False
+        return new_tokens[0].id, True
+
+    @track_task
+    @traced
+    def crawl_token(self, token_address: str):
+        """
+        Hand the crawl of a token's update authority, signatures and holders to the crawl scheduler.
+
+        The crawl is only scheduled if it can be moved from pending to running, so a crawl is never run twice.
+        It runs on crawl worker threads with a session of its own, sessions are not thread-safe.
+
+        Args:
+            token_address (str): The address of the token.
+        """
+        token = self.token_repository.get_or_404(token_address)
+        if not self.token_repository.claim_crawl(token.id, CRAWL_PENDING, CRAWL_RUNNING):
+            logger.info(f"Crawl of {token_address} is already running or finished")
+            return
+        if not get_scheduler().submit(token_address, _run_crawl(token.id, token_address), _crawl_done(token.id)):
+            logger.info(f"Crawl of {token_address} is already in the scheduler")
+            self.token_repository.claim_crawl(token.id, CRAWL_RUNNING, CRAWL_PENDING)
+
+    def _crawl_steps(self, token_address: str) -> Iterator[CrawlStep]:
+        """
+        The crawl of a token, one RPC page per step.
 
+        The signature history is walked backwards without knowing its length, so as many pages as
+        already fetched are assumed to be left, plus the holder and creation steps. Once the history
+        is complete and `LEDGER_ON_CRAWL` is set, its transactions are folded into the holder ledger
+        one batch per step.
+
+        Args:
+            token_address (str): The address of the token.
+
+        Yields:
+            CrawlStep: The progress after each step.
+        """
+        if self.token_repository.get_or_404(token_address).metadata_updated_at is None:
+            self.get_update_authority(token_address)
+            yield CrawlStep("authority", 0, None)
+        pages = 0
+        signatures = 0
+        for stored in SignatureService(self.db).iter_signature_pages(token_address):
+            pages += 1
+            signatures += stored
+            yield CrawlStep("signatures", stored, pages + 2)
+        HolderService(self.db).collect_holders(token_address)
+        yield CrawlStep("holders", 0, 1)
+        ledger_batches = math.ceil(signatures / LEDGER_BATCH_SIZE) if LEDGER_ON_CRAWL else 0
+        if signatures:
+            self.get_deploy_transaction(token_address, signatures_complete=True)
+            yield CrawlStep("creation", 0, ledger_batches)
+        if ledger_batches:
+            for folded in HolderService(self.db).iter_ledger_batches(token_address):
+                ledger_batches -= 1
+                yield CrawlStep("ledger", folded, max(ledger_batches, 0))
+
+    def get_crawl_status(self, token_address: str) -> CrawlStatusModel:
+        """
+        Get the state of a token's onboarding crawl.
+
+        Args:
+            token_address (str): The address of the token.
+
+        Returns:
+            CrawlStatusModel: The crawl state.
+
+        Raises:
+            HTTPException: If the token is not found.
+        """
+        token = self.token_repository.get_or_404(token_address)
+        crawl = self.token_repository.get_crawl(token.id)
+        if crawl is None:
+            return CrawlStatusModel(address=token.address)
+        status = CrawlStatusModel(
+            address=token.address, status=crawl.status, updated_at=crawl.updated_at, error=crawl.error
+        )
+        progress = get_scheduler().progress(token.address)
+        if progress is not None:
+            status.phase = progress.phase
+            status.steps = progress.steps
+            status.items = progress.items
+            status.eta_seconds = progress.eta_seconds
+        return status
+
+    @traced
+    def add_new_tokens(self, token_addresses: list[str], background_tasks: BackgroundTasks) -> AddTokensResult:
+        """
+        Add multiple new tokens to the database.
+
+        Candidate mints are validated with batched account lookups, new tokens are inserted in one
+        statement and their crawls are scheduled as a single background task.
+
+        Args:
+            token_addresses (list[str]): The addresses of the tokens.
+            background_tasks (BackgroundTasks): BackgroundTasks instance for scheduling tasks.
+
+        Returns:
+            AddTokensResult: The outcome for every requested address.
+        """
+        addresses = list(dict.fromkeys(address.strip() for address in token_addresses))
+        logger.info(f"Adding {len(addresses)} tokens to the database")
+        existing = {row.address for row in self.db.query(Token.address).filter(Token.address.in_(addresses))}
+        candidates = [address for address in addresses if address not in existing]
+        from app.solana.solscan import TokenChainInfo
+        checks = TokenChainInfo.check_if_tokens(candidates) if candidates else {}
+        valid = [address for address in candidates if checks[address][0]]
+        new_tokens = self.token_repository.add_tokens(valid)
+        added = {token.address for token in new_tokens}
+        if added:
+            background_tasks.add_task(self.collect_tokens_info, [address for address in valid if address in added])
+
+        results = []
+        for address in addresses:
+            if address in added:
+                results.append(AddTokenResult(address=address, status="added", detail="Token added"))
+            elif address in existing or address in valid:
+                results.append(AddTokenResult(address=address, status="exists", detail="Token already exists"))
+            else:
+                results.append(AddTokenResult(address=address, status="invalid", detail=checks[address][1]))
+        return AddTokensResult(results=results)
+
+    @track_task
+    def collect_tokens_info(self, token_addresses: list[str]):
+        """
+        Schedule the collection of update authority, signatures and holders for newly added tokens.
+
+        Their metadata is resolved up front in batches, then the crawl scheduler interleaves their
+        RPC pages, so large tokens do not hold up small ones.
+
+        Args:
+            token_addresses (list[str]): The addresses of the tokens.
+        """
+        try:
+            self.resolve_metadata(token_addresses)
+        except Exception as e:
+            logger.error(f"Failed to resolve metadata of new tokens: {str(e)}")
+        for token_address in token_addresses:
+            self.crawl_token(token_address)
+
+    @traced
     def get_token_info(self, token_address: str) -> TokenData:
         """
         Get information about a token.
@@ -146,7 +451,33 @@ class TokenService:
         Raises:
             ValidationError: If there is an error parsing token data.
         """
-        data = get_token_info_from_dex(token_address)
+        return self.to_token_data(get_token_info_from_dex(token_address))
+
+    def get_token_snapshot(self, token_address: str) -> tuple[dict, str]:
+        """
+        Get raw Dexscreener data about a token together with its snapshot version.
+
+        Args:
+            token_address (str): The address of the token.
+
+        Returns:
+            tuple[dict, str]: The raw token data and its version.
+        """
+        return get_token_snapshot_from_dex(token_address)
+
+    def to_token_data(self, data: dict) -> TokenData:
+        """
+        Parse raw Dexscreener data into the token data model.
+
+        Args:
+            data (dict): The raw token data.
+
+        Returns:
+            TokenData: The token data.
+
+        Raises:
+            ValidationError: If there is an error parsing token data.
+        """
         try:
             # Parse the JSON response into the Pydantic model
             token_data = TokenData(**data)
@@ -155,3 +486,61 @@ class TokenService:
             # Handle validation errors
             print(f"Error parsing token data: {str(e)}")
             raise
+
+
+def _schedule_crawl(token_address: str):
+    """
+    Background task handing the crawl of a token to the crawl scheduler, on a session of its own.
+
+    Args:
+        token_address (str): The address of the token.
+    """
+    with SessionLocal(bind=get_engine()) as db:
+        TokenService(db).crawl_token(token_address)
+
+
+def _run_crawl(token_id: int, token_address: str) -> Iterator[CrawlStep]:
+    """
+    The crawl of a token on a session of its own, refreshing its timestamp so that it is not taken as abandoned.
+
+    The scheduler interleaves the steps of many crawls, so the session gives its connection back
+    before every step is handed back, and only opens the session once the first step runs.
+
+    Args:
+        token_id (int): The ID of the token.
+        token_address (str): The address of the token.
+
+    Yields:
+        CrawlStep: The progress after each step.
+    """
+    with SessionLocal(bind=get_engine()) as db:
+        service = TokenService(db)
+        touched_ts = time.monotonic()
+        for step in service._crawl_steps(token_address):
+            if time.monotonic() - touched_ts >= CRAWL_STALE_AFTER / 3:
+                service.token_repository.touch_crawl(token_id)
+                touched_ts = time.monotonic()
+            # other crawls run until the next step, the session is used again afterwards
+            db.close()
+            yield step
+
+
+def _crawl_done(token_id: int) -> Callable[[Optional[Exception]], None]:
+    """
+    Build the callback recording the outcome of a token's crawl.
+
+    Args:
+        token_id (int): The ID of the token.
+
+    Returns:
+        Callable[[Exception | None], None]: Sets the crawl done, or failed with the error.
+    """
+
+    def on_done(error: Optional[Exception]):
+        with SessionLocal(bind=get_engine()) as db:
+            if error is None:
+                TokenRepository(db).set_crawl_status(token_id, CRAWL_DONE)
+            else:
+                TokenRepository(db).set_crawl_status(token_id, CRAWL_FAILED, str(error))
+
+    return on_done
@@ -0,0 +1,62 @@
+import threading
+from typing import Any, Callable, Hashable
+from app.deadline import current_deadline, time_left
+
+
+class _Call:
+    """
+    A call in flight and its outcome.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """
+    Registry of calls in flight, so concurrent calls with the same key run once and share the outcome.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> tuple[Any, bool]:
+        """
+        Run `func`, unless a call with the same key is already in flight, in which case wait for its outcome,
+        for no longer than the current request has left.
+
+        Args:
+            key (Hashable): Identifies calls that must not run concurrently.
+            func (Callable[[], Any]): The call.
+
+        Returns:
+            tuple[Any, bool]: The result, and whether it was shared with a call started by someone else.
+
+        Raises:
+            BaseException: The error raised by the call.
+            DeadlineExceeded: If the current request runs out of time while waiting.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            if not call.done.wait(time_left("singleflight")):
+                raise current_deadline().exceed("singleflight")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
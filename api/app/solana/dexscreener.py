@@ -1,4 +1,84 @@
+import hashlib
+import json
 import requests
+from app.cache import get_cache
+from app.circuit_breaker import CircuitOpenError, get_breaker
+from app.config import DEXSCREENER_API_URL, DEXSCREENER_CACHE_TTL, DEXSCREENER_STALE_TTL, DEXSCREENER_TIMEOUT
+from app.deadline import current_deadline, time_left
+from app.metrics import CIRCUIT_FALLBACKS, DEX_LATENCY
+
+# Cache namespace of Dexscreener snapshots, keyed by token address
+DEX_CACHE_NAMESPACE = "dexscreener"
+
+# Cache namespace of the last Dexscreener snapshot of every token, served while Dexscreener is unavailable
+DEX_STALE_CACHE_NAMESPACE = "dexscreener_stale"
+
+
+def get_token_snapshot_from_dex(token_address: str) -> tuple[dict, str]:
+    """
+    Fetch token information from the Dexscreener API together with its snapshot version.
+
+    Responses are reused for `DEXSCREENER_CACHE_TTL` seconds through the shared cache. The version is a digest of the
+    response content, so it only changes when Dexscreener returns different data.
+
+    Calls go through the "dexscreener" circuit breaker. While Dexscreener fails or the circuit is open,
+    the last snapshot of the token is served for up to `DEXSCREENER_STALE_TTL` seconds.
+
+    Within a request the call times out when the request's deadline is reached, if that comes first.
+
+    Args:
+        token_address (str): The address of the token.
+
+    Returns:
+        tuple[dict, str]: Token information retrieved from the Dexscreener API and its version.
+
+    Raises:
+        CircuitOpenError: If the circuit is open and no snapshot of the token is left.
+        requests.RequestException: If Dexscreener fails and no snapshot of the token is left.
+        DeadlineExceeded: If the current request runs out of time.
+    """
+    cache = get_cache()
+    cached = cache.get(DEX_CACHE_NAMESPACE, token_address)
+    if cached is not None:
+        return cached[0], cached[1]
+
+    breaker = get_breaker("dexscreener")
+    url = f"{DEXSCREENER_API_URL}/latest/dex/tokens/{token_address}"
+    try:
+        timeout = time_left("dexscreener", DEXSCREENER_TIMEOUT)
+        breaker.before_call()
+        try:
+            with DEX_LATENCY.time():
+                response = requests.get(url, timeout=timeout)
+            if response.status_code >= 500 or response.status_code == 429:
+                response.raise_for_status()
+            data = response.json()
+        except requests.Timeout as e:
+            deadline = current_deadline()
+            if deadline is not None and timeout < DEXSCREENER_TIMEOUT:
+                # cut short by the request's deadline rather than a slow Dexscreener
+                breaker.record_cancelled()
+                raise deadline.exceed("dexscreener") from e
+            breaker.record_failure()
+            raise
+        except (requests.RequestException, ValueError):
+            breaker.record_failure()
+            raise
+        except BaseException:
+            # every admitted call ends in exactly one outcome, or a half-open breaker keeps its trial slot
+            breaker.record_cancelled()
+            raise
+        breaker.record_success()
+    except (CircuitOpenError, requests.RequestException, ValueError):
+        stale = cache.get(DEX_STALE_CACHE_NAMESPACE, token_address)
+        if stale is None:
+            raise
+        CIRCUIT_FALLBACKS.labels("dexscreener").inc()
+        return stale[0], stale[1]
+    version = hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()
+    cache.set(DEX_CACHE_NAMESPACE, token_address, [data, version], DEXSCREENER_CACHE_TTL)
+    cache.set(DEX_STALE_CACHE_NAMESPACE, token_address, [data, version], DEXSCREENER_STALE_TTL)
+    return data, version
 
 
 def get_token_info_from_dex(token_address: str) -> dict:
@@ -11,7 +91,4 @@ def get_token_info_from_dex(token_address: str) -> dict:
     Returns:
         dict: Token information retrieved from the Dexscreener API.
     """
-    url = f"https://api.dexscreener.io/latest/dex/tokens/{token_address}"
-    response = requests.get(url)
-    data = response.json()
-    return data
+    return get_token_snapshot_from_dex(token_address)[0]
@@ -0,0 +1,245 @@
+import struct
+from typing import Iterable, NamedTuple, Optional
+from solders.pubkey import Pubkey
+
+# SPL Token programs
+TOKEN_PROGRAM_ID = Pubkey.from_string("TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA")
+TOKEN_2022_PROGRAM_ID = Pubkey.from_string("TokenzQdBNbLqP5VEhdkAS6EPFLC1PHnBqCXEpPxuEb")
+TOKEN_PROGRAMS = (TOKEN_PROGRAM_ID, TOKEN_2022_PROGRAM_ID)
+
+# Metaplex Token Metadata program, owner of the metadata account of most mints
+METADATA_PROGRAM_ID = Pubkey.from_string("metaqbxxUerdq28cj1RbAWkYQm3ybzjb6a8bt518x1s")
+
+# Key of Metaplex metadata accounts
+METADATA_KEY_V1 = 4
+
+# Sizes of the base SPL Token layouts, Token-2022 appends extensions after them
+MINT_SIZE = 82
+ACCOUNT_SIZE = 165
+
+# Token-2022 stores the account type right after the base account layout
+ACCOUNT_TYPE_OFFSET = ACCOUNT_SIZE
+ACCOUNT_TYPE_MINT = 1
+ACCOUNT_TYPE_ACCOUNT = 2
+
+# Token accounts start with the mint, followed by the owner and the amount: a slice of
+# OWNER_AMOUNT_LENGTH bytes at OWNER_OFFSET holds everything a holder snapshot needs
+OWNER_OFFSET = 32
+OWNER_AMOUNT_LENGTH = 40
+OWNER_AMOUNT_FORMAT = "<32sQ"
+
+# Maximum number of accounts per getMultipleAccounts call
+MULTIPLE_ACCOUNTS_LIMIT = 100
+
+# Mints resolved per getMultipleAccounts call, each needs its mint and its metadata account
+METADATA_MINTS_PER_CALL = MULTIPLE_ACCOUNTS_LIMIT // 2
+
+
+class MintInfo(NamedTuple):
+    """
+    Decoded SPL Token mint account.
+
+    Attributes:
+        mint_authority (Pubkey | None): Authority allowed to mint new tokens, None if minting is disabled.
+        supply (int): Total supply in raw token units.
+        decimals (int): Number of decimals.
+        is_initialized (bool): Whether the mint is initialized.
+        freeze_authority (Pubkey | None): Authority allowed to freeze token accounts, None if absent.
+    """
+
+    mint_authority: Optional[Pubkey]
+    supply: int
+    decimals: int
+    is_initialized: bool
+    freeze_authority: Optional[Pubkey]
+
+
+class MetadataInfo(NamedTuple):
+    """
+    Decoded Metaplex metadata account.
+
+    Attributes:
+        update_authority (Pubkey): Authority allowed to update the metadata.
+        mint (Pubkey): The mint the metadata describes.
+        name (str): The name of the token.
+        symbol (str): The symbol of the token.
+    """
+
+    update_authority: Pubkey
+    mint: Pubkey
+    name: str
+    symbol: str
+
+
+class TokenMetadata(NamedTuple):
+    """
+    On-chain metadata of a token, combined from its mint and Metaplex metadata accounts.
+
+    Attributes:
+        name (str | None): The name of the token, None without a metadata account.
+        symbol (str | None): The symbol of the token, None without a metadata account.
+        mint_authority (Pubkey | None): Authority allowed to mint new tokens.
+        freeze_authority (Pubkey | None): Authority allowed to freeze token accounts.
+        update_authority (Pubkey | None): Authority allowed to update the metadata, None without a metadata account.
+    """
+
+    name: Optional[str]
+    symbol: Optional[str]
+    mint_authority: Optional[Pubkey]
+    freeze_authority: Optional[Pubkey]
+    update_authority: Optional[Pubkey]
+
+
+class TokenAccountInfo(NamedTuple):
+    """
+    Decoded SPL Token account.
+
+    Attributes:
+        mint (Pubkey): The mint of the tokens held.
+        owner (Pubkey): The owner of the account.
+        amount (int): Balance in raw token units.
+    """
+
+    mint: Pubkey
+    owner: Pubkey
+    amount: int
+
+
+def _decode_coption_pubkey(data: bytes, offset: int) -> Optional[Pubkey]:
+    """
+    Decode a `COption<Pubkey>`: a u32 tag followed by 32 bytes.
+
+    Args:
+        data (bytes): The account data.
+        offset (int): Offset of the tag.
+
+    Returns:
+        Pubkey | None: The public key, or None if the option is empty.
+    """
+    (tag,) = struct.unpack_from("<I", data, offset)
+    return Pubkey(data[offset + 4: offset + 36]) if tag else None
+
+
+def _decode_string(data: bytes, offset: int) -> tuple[str, int]:
+    """
+    Decode a Borsh string: a u32 length followed by UTF-8 bytes, Metaplex pads them with null bytes.
+
+    Args:
+        data (bytes): The account data.
+        offset (int): Offset of the length.
+
+    Returns:
+        tuple[str, int]: The string without padding and the offset right after it.
+    """
+    (length,) = struct.unpack_from("<I", data, offset)
+    start = offset + 4
+    return data[start: start + length].decode("utf-8", errors="replace").rstrip("\x00"), start + length
+
+
+def metadata_address(mint: Pubkey) -> Pubkey:
+    """
+    Derive the address of the Metaplex metadata account of a mint.
+
+    Args:
+        mint (Pubkey): The mint.
+
+    Returns:
+        Pubkey: The metadata program derived address.
+    """
+    address, _ = Pubkey.find_program_address(
+        [b"metadata", bytes(METADATA_PROGRAM_ID), bytes(mint)], METADATA_PROGRAM_ID
+    )
+    return address
+
+
+def is_mint_account(owner: Pubkey, data: bytes) -> bool:
+    """
+    Check that an account is an SPL Token or Token-2022 mint.
+
+    Args:
+        owner (Pubkey): The program owning the account.
+        data (bytes): The account data.
+
+    Returns:
+        bool: True if the account has the mint layout of a token program.
+    """
+    if owner == TOKEN_PROGRAM_ID:
+        return len(data) == MINT_SIZE
+    if owner == TOKEN_2022_PROGRAM_ID:
+        return len(data) == MINT_SIZE or (
+            len(data) > ACCOUNT_TYPE_OFFSET and data[ACCOUNT_TYPE_OFFSET] == ACCOUNT_TYPE_MINT
+        )
+    return False
+
+
+def decode_mint(data: bytes) -> MintInfo:
+    """
+    Decode the base SPL Token mint layout.
+
+    Args:
+        data (bytes): The mint account data, at least `MINT_SIZE` bytes.
+
+    Returns:
+        MintInfo: The decoded mint.
+    """
+    supply, decimals, is_initialized = struct.unpack_from("<QB?", data, 36)
+    return MintInfo(
+        mint_authority=_decode_coption_pubkey(data, 0),
+        supply=supply,
+        decimals=decimals,
+        is_initialized=is_initialized,
+        freeze_authority=_decode_coption_pubkey(data, 46),
+    )
+
+
+def decode_token_account(data: bytes) -> TokenAccountInfo:
+    """
+    Decode the mint, owner and amount of the base SPL Token account layout.
+
+    Args:
+        data (bytes): The token account data, at least 72 bytes.
+
+    Returns:
+        TokenAccountInfo: The decoded token account.
+    """
+    (amount,) = struct.unpack_from("<Q", data, 64)
+    return TokenAccountInfo(mint=Pubkey(data[0:32]), owner=Pubkey(data[32:64]), amount=amount)
+
+
+def sum_owner_amounts(slices: Iterable[bytes]) -> dict[bytes, int]:
+    """
+    Sum the amounts of token accounts per owner, from the owner and amount slices of their data.
+
+    The slices are joined and unpacked in a single `struct.iter_unpack` pass, which stays fast
+    for the hundreds of thousands of accounts of a popular mint.
+
+    Args:
+        slices (Iterable[bytes]): `OWNER_AMOUNT_LENGTH` bytes at `OWNER_OFFSET` of every token account.
+
+    Returns:
+        dict[bytes, int]: Total amount in raw token units per owner public key, including owners of empty accounts.
+    """
+    totals: dict[bytes, int] = {}
+    for owner, amount in struct.iter_unpack(OWNER_AMOUNT_FORMAT, b"".join(slices)):
+        totals[owner] = totals.get(owner, 0) + amount
+    return totals
+
+
+def decode_metadata(data: bytes) -> MetadataInfo:
+    """
+    Decode the update authority, mint, name and symbol of a Metaplex metadata account.
+
+    Args:
+        data (bytes): The metadata account data.
+
+    Returns:
+        MetadataInfo: The decoded metadata.
+
+    Raises:
+        ValueError: If the data is not a Metaplex metadata account.
+    """
+    if len(data) < 69 or data[0] != METADATA_KEY_V1:
+        raise ValueError("Account is not a Metaplex metadata account")
+    name, offset = _decode_string(data, 65)
+    symbol, _ = _decode_string(data, offset)
+    return MetadataInfo(update_authority=Pubkey(data[1:33]), mint=Pubkey(data[33:65]), name=name, symbol=symbol)
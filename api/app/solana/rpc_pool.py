@@ -0,0 +1,376 @@
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Optional
+from urllib.parse import urlparse
+import httpx
+from solana.exceptions import SolanaRpcException, handle_exceptions
+from solana.rpc.api import Client
+from solders.signature import Signature
+from app.config import (
+    RPC_EJECT_AFTER_FAILURES,
+    RPC_HEALTH_CHECK_INTERVAL,
+    RPC_HEDGE_DELAY,
+    RPC_REQUEST_TIMEOUT,
+    SOLANA_RPC_URL,
+    SOLANA_RPC_URLS,
+)
+from app.deadline import DeadlineExceeded, check_deadline, current_deadline, time_left
+from app.metrics import RPC_ENDPOINT_HEALTHY, RPC_ENDPOINT_REQUESTS, RPC_HEDGED
+
+logger = logging.getLogger("resources")
+
+# Smoothing factor of the latency moving average
+LATENCY_EWMA_ALPHA = 0.2
+
+
+class RpcClient(Client):
+    """
+    Solana RPC client that can also return responses undecoded, for decoding in another process.
+    """
+
+    @handle_exceptions(SolanaRpcException, httpx.HTTPError)
+    def get_transaction_raw(self, tx_sig: Signature, max_supported_transaction_version: Optional[int] = None) -> str:
+        """
+        Fetch a transaction like `get_transaction` with the "json" encoding, without decoding the response.
+
+        Args:
+            tx_sig (Signature): The signature of the transaction.
+            max_supported_transaction_version (int | None): The highest transaction version to return.
+
+        Returns:
+            str: The JSON-RPC response.
+        """
+        body = self._get_transaction_body(tx_sig, "json", None, max_supported_transaction_version)
+        return self._provider.make_request_unparsed(body)
+
+
+class RpcEndpoint:
+    """
+    A single Solana RPC endpoint with its own rate limit and health statistics.
+
+    Attributes:
+        url (str): The RPC URL.
+        name (str): Host and port of the endpoint, safe to use in logs and metrics.
+        weight (float): Relative share of traffic the endpoint should receive.
+        rate_limit (float): Maximum requests per second, 0 for unlimited.
+        client (RpcClient): The Solana RPC client bound to the endpoint.
+        latency (float): Exponential moving average of successful call latency in seconds.
+        failures (int): Number of consecutive failed calls.
+        ejected (bool): Whether the endpoint is taken out of rotation until a health check passes.
+        in_flight (int): Number of calls currently running against the endpoint.
+    """
+
+    def __init__(self, url: str, weight: float = 1.0, rate_limit: float = 0.0):
+        if weight <= 0:
+            raise ValueError(f"Invalid weight {weight} of RPC endpoint {url}, expected a positive number.")
+        if rate_limit < 0:
+            raise ValueError(f"Invalid rate limit {rate_limit} of RPC endpoint {url}, expected 0 or more.")
+        self.url = url
+        parsed = urlparse(url)
+        self.name = f"{parsed.hostname}:{parsed.port}" if parsed.port else (parsed.hostname or url)
+        self.weight = weight
+        self.rate_limit = rate_limit
+        self.client = RpcClient(url, timeout=RPC_REQUEST_TIMEOUT)
+        self.latency = 0.1
+        self.failures = 0
+        self.ejected = False
+        self.in_flight = 0
+        # the bucket holds at least one token, an endpoint allowing less than a request per second still gets one
+        self._capacity = max(rate_limit, 1.0)
+        self._tokens = self._capacity
+        self._refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """
+        Take a request token from the endpoint's rate-limit bucket.
+
+        Returns:
+            float: 0 if a token was taken, otherwise seconds until the next token is available.
+        """
+        if not self.rate_limit:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._refilled_at) * self.rate_limit)
+            self._refilled_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate_limit
+
+    def score(self) -> float:
+        """
+        Routing cost of the endpoint, lower is better.
+
+        Returns:
+            float: Expected latency scaled by load and divided by weight.
+        """
+        return self.latency * (1 + self.in_flight) / self.weight
+
+    def track_in_flight(self, delta: int):
+        with self._lock:
+            self.in_flight += delta
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self.latency += LATENCY_EWMA_ALPHA * (latency - self.latency)
+            self.failures = 0
+
+    def record_failure(self) -> bool:
+        """
+        Count a failed call and eject the endpoint after too many consecutive failures.
+
+        Returns:
+            bool: True if the endpoint has just been ejected.
+        """
+        with self._lock:
+            self.failures += 1
+            if not self.ejected and self.failures >= RPC_EJECT_AFTER_FAILURES:
+                self.ejected = True
+                return True
+            return False
+
+
+class RpcPool:
+    """
+    Pool of Solana RPC endpoints with latency-aware routing, hedged reads and failover.
+
+    Any `Client` method can be called on the pool, e.g. `pool.get_transaction(signature)`.
+
+    Attributes:
+        endpoints (list[RpcEndpoint]): The endpoints of the pool.
+        hedge_delay (float): Seconds to wait before hedging a slow call to a second endpoint, 0 disables hedging.
+    """
+
+    def __init__(self, endpoints: list[RpcEndpoint], hedge_delay: float = RPC_HEDGE_DELAY):
+        if not endpoints:
+            raise ValueError("At least one RPC endpoint is required.")
+        self.endpoints = endpoints
+        self.hedge_delay = hedge_delay
+        self._executor = ThreadPoolExecutor(max_workers=8 * len(endpoints), thread_name_prefix="rpc-pool")
+        self._health_thread: Optional[threading.Thread] = None
+        self._health_lock = threading.Lock()
+        for endpoint in endpoints:
+            RPC_ENDPOINT_HEALTHY.labels(endpoint.name).set(1)
+
+    def __getattr__(self, method: str):
+        if method.startswith("_"):
+            raise AttributeError(method)
+        return functools.partial(self.call, method)
+
+    def _candidates(self, exclude: Optional[RpcEndpoint] = None) -> list[RpcEndpoint]:
+        """
+        Endpoints eligible for a call, best first.
+
+        Ejected endpoints are only used when every endpoint is ejected.
+
+        Args:
+            exclude (RpcEndpoint | None): Endpoint to leave out, e.g. the one a call is already running on.
+
+        Returns:
+            list[RpcEndpoint]: The endpoints ordered by score.
+        """
+        endpoints = [endpoint for endpoint in self.endpoints if endpoint is not exclude]
+        healthy = [endpoint for endpoint in endpoints if not endpoint.ejected]
+        return sorted(healthy or endpoints, key=RpcEndpoint.score)
+
+    def _acquire(self, exclude: Optional[RpcEndpoint] = None, block: bool = True) -> Optional[RpcEndpoint]:
+        """
+        Pick the best endpoint that has rate-limit budget left.
+
+        Args:
+            exclude (RpcEndpoint | None): Endpoint to leave out.
+            block (bool): Whether to wait for budget when every endpoint is throttled.
+
+        Returns:
+            RpcEndpoint | None: The endpoint, or None if none is available and `block` is False.
+        """
+        while True:
+            candidates = self._candidates(exclude)
+            if not candidates:
+                return None
+            waits = []
+            for endpoint in candidates:
+                wait_for = endpoint.try_acquire()
+                if not wait_for:
+                    return endpoint
+                waits.append(wait_for)
+            if not block:
+                return None
+            check_deadline("rpc.rate_limit")
+            time.sleep(min(waits))
+
+    def _run(self, endpoint: RpcEndpoint, method: str, args: tuple, kwargs: dict):
+        """
+        Run a call against one endpoint and update its statistics.
+
+        Args:
+            endpoint (RpcEndpoint): The endpoint to call.
+            method (str): Name of the `Client` method.
+            args (tuple): Positional arguments for the method.
+            kwargs (dict): Keyword arguments for the method.
+
+        Returns:
+            The RPC response.
+        """
+        endpoint.track_in_flight(1)
+        start_ts = time.perf_counter()
+        try:
+            result = getattr(endpoint.client, method)(*args, **kwargs)
+        except Exception:
+            RPC_ENDPOINT_REQUESTS.labels(endpoint.name, "error").inc()
+            if endpoint.record_failure():
+                logger.warning(f"Ejecting RPC endpoint {endpoint.name} after {endpoint.failures} failures")
+                RPC_ENDPOINT_HEALTHY.labels(endpoint.name).set(0)
+                self._ensure_health_checks()
+            raise
+        finally:
+            endpoint.track_in_flight(-1)
+        endpoint.record_success(time.perf_counter() - start_ts)
+        RPC_ENDPOINT_REQUESTS.labels(endpoint.name, "success").inc()
+        return result
+
+    def _run_within_deadline(self, endpoint: RpcEndpoint, method: str, args: tuple, kwargs: dict):
+        """
+        Run a call against one endpoint, waiting for it no longer than the current request has left.
+
+        A call given up on goes on in the executor until its own timeout, its result is dropped.
+
+        Args:
+            endpoint (RpcEndpoint): The endpoint to call.
+            method (str): Name of the `Client` method.
+            args (tuple): Positional arguments for the method.
+            kwargs (dict): Keyword arguments for the method.
+
+        Returns:
+            The RPC response.
+
+        Raises:
+            DeadlineExceeded: If the request runs out of time first.
+        """
+        deadline = current_deadline()
+        if deadline is None:
+            return self._run(endpoint, method, args, kwargs)
+        future = self._executor.submit(self._run, endpoint, method, args, kwargs)
+        try:
+            return future.result(timeout=time_left(f"rpc.{method}"))
+        except TimeoutError:
+            raise deadline.exceed(f"rpc.{method}") from None
+
+    def call(self, method: str, *args, **kwargs):
+        """
+        Call a `Client` method on the best endpoint, hedging to a second endpoint if it is slow
+        and failing over to the next endpoint if it fails.
+
+        Args:
+            method (str): Name of the `Client` method.
+            *args: Positional arguments for the method.
+            **kwargs: Keyword arguments for the method.
+
+        Returns:
+            The RPC response of the first endpoint that answered successfully.
+
+        Raises:
+            SolanaRpcException: If every attempted endpoint failed.
+            DeadlineExceeded: If the current request runs out of time first.
+        """
+        step = f"rpc.{method}"
+        primary = self._acquire()
+        # Only idempotent reads are hedged, anything else runs on one endpoint at a time
+        if len(self.endpoints) == 1 or not self.hedge_delay or not method.startswith("get_"):
+            try:
+                return self._run_within_deadline(primary, method, args, kwargs)
+            except DeadlineExceeded:
+                raise
+            except Exception:
+                fallback = self._acquire(exclude=primary, block=False)
+                if fallback is None:
+                    raise
+                return self._run_within_deadline(fallback, method, args, kwargs)
+
+        # Hedge a slow call, or fail over a failed one, to at most one other endpoint
+        attempted = 1
+        futures = {self._executor.submit(self._run, primary, method, args, kwargs): primary}
+        done, _ = wait(futures, timeout=time_left(step, self.hedge_delay))
+        error = None
+        while True:
+            for future in done:
+                endpoint = futures.pop(future)
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+                logger.warning(f"RPC {method} failed on {endpoint.name}: {str(error)}")
+            if attempted < 2:
+                second = self._acquire(exclude=primary, block=not futures)
+                if second is not None:
+                    if futures:
+                        RPC_HEDGED.labels(method).inc()
+                    attempted += 1
+                    futures[self._executor.submit(self._run, second, method, args, kwargs)] = second
+            if not futures:
+                raise error
+            done, _ = wait(futures, timeout=time_left(step), return_when=FIRST_COMPLETED)
+            if not done:
+                raise current_deadline().exceed(step)
+
+    def _ensure_health_checks(self):
+        with self._health_lock:
+            if self._health_thread is None:
+                self._health_thread = threading.Thread(target=self._health_loop, name="rpc-health", daemon=True)
+                self._health_thread.start()
+
+    def _health_loop(self):
+        """
+        Periodically probe ejected endpoints and put them back into rotation once they answer.
+        """
+        while True:
+            time.sleep(RPC_HEALTH_CHECK_INTERVAL)
+            for endpoint in self.endpoints:
+                if not endpoint.ejected:
+                    continue
+                start_ts = time.perf_counter()
+                try:
+                    endpoint.client.get_slot()
+                except Exception as e:
+                    logger.info(f"RPC endpoint {endpoint.name} still unhealthy: {str(e)}")
+                    continue
+                endpoint.record_success(time.perf_counter() - start_ts)
+                endpoint.ejected = False
+                RPC_ENDPOINT_HEALTHY.labels(endpoint.name).set(1)
+                logger.info(f"RPC endpoint {endpoint.name} is healthy again")
+
+
+def parse_rpc_endpoints(value: str) -> list[RpcEndpoint]:
+    """
+    Parse an endpoint list like `https://a.example|3|50,https://b.example|1|10`.
+
+    Each entry is `url[|weight[|requests per second]]`.
+
+    Args:
+        value (str): The endpoint list.
+
+    Returns:
+        list[RpcEndpoint]: The parsed endpoints.
+
+    Raises:
+        ValueError: If a weight or rate limit is not a number, the weight is not positive or the rate limit negative.
+    """
+    endpoints = []
+    for entry in filter(None, (item.strip() for item in value.split(","))):
+        url, weight, rate_limit = (entry.split("|") + ["1", "0"])[:3]
+        endpoints.append(RpcEndpoint(url, weight=float(weight or 1), rate_limit=float(rate_limit or 0)))
+    return endpoints
+
+
+def create_rpc_pool() -> RpcPool:
+    """
+    Build the RPC pool from `SOLANA_RPC_URLS`, falling back to the single `SOLANA_RPC_URL`.
+
+    Returns:
+        RpcPool: The RPC pool.
+    """
+    return RpcPool(parse_rpc_endpoints(SOLANA_RPC_URLS or SOLANA_RPC_URL or ""))
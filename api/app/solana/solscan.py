@@ -1,8 +1,38 @@
+from collections import deque
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime
 import logging
+import struct
+import threading
+import time
 from time import sleep
-from app.config import SOLANA_RPC_URL
-from solana.rpc.api import Client
+from typing import Iterator, Optional
+import httpx
+from app.circuit_breaker import OPEN, CircuitOpenError, get_breaker
+from app.config import RPC_RETRY_DELAY, TX_PARSE_WORKERS
+from app.deadline import DeadlineExceeded, check_deadline, current_deadline, time_left
+from app.metrics import RPC_ERRORS, RPC_LATENCY, RPC_RATE_LIMITED, RPC_RETRIES
+from app.solana.layouts import (
+    ACCOUNT_SIZE,
+    METADATA_MINTS_PER_CALL,
+    METADATA_PROGRAM_ID,
+    MULTIPLE_ACCOUNTS_LIMIT,
+    OWNER_AMOUNT_LENGTH,
+    OWNER_OFFSET,
+    TOKEN_2022_PROGRAM_ID,
+    TOKEN_PROGRAM_ID,
+    TOKEN_PROGRAMS,
+    TokenMetadata,
+    decode_metadata,
+    decode_mint,
+    decode_token_account,
+    is_mint_account,
+    metadata_address,
+    sum_owner_amounts,
+)
+from app.solana.rpc_pool import RpcPool, create_rpc_pool
+from app.solana.transactions import BalanceDeltas, get_parse_pool, parse_balance_deltas
+from app.tracing import span, traced
 from solders.pubkey import Pubkey
 from solders.signature import Signature
 from solana.rpc import types
@@ -12,18 +42,27 @@ from solana.exceptions import SolanaRpcException
 logger = logging.getLogger("resources")
 
 
+class RpcCircuitOpenError(CircuitOpenError, SolanaRpcException):
+    """
+    Raised instead of calling the Solana RPC while its circuit is open.
+
+    It is a `SolanaRpcException`, so callers handling RPC failures handle it as well.
+    """
+
+
 class TokenChainInfo:
     """
     Class for retrieving information about a token on the Solana blockchain.
 
     Attributes:
-        client (Client): The Solana RPC client.
+        client (RpcPool): The pool of Solana RPC endpoints, used like a `Client`, created on first use.
         token_pb (Pubkey): The public key of the token.
         token_update_authority (Pubkey): The public key of the token's update authority.
         init_mint_sig (Signature): The signature of the token's initialization mint.
     """
 
-    client = Client(SOLANA_RPC_URL)
+    client: RpcPool | None = None
+    _client_lock = threading.Lock()
 
     def __init__(self, token_address: str) -> None:
         """
@@ -36,6 +75,87 @@ class TokenChainInfo:
         self.token_update_authority = None
         self.init_mint_sig = None
 
+    @classmethod
+    def get_client(cls) -> RpcPool:
+        """
+        Gets the RPC pool, building it on the first call.
+
+        Returns:
+            RpcPool: The pool of Solana RPC endpoints.
+        """
+        if cls.client is None:
+            with cls._client_lock:
+                if cls.client is None:
+                    cls.client = create_rpc_pool()
+        return cls.client
+
+    @classmethod
+    def _call(cls, method: str, *args, **kwargs):
+        """
+        Calls a Solana RPC client method, retrying once after a pause on failure.
+
+        Calls go through the "solana_rpc" circuit breaker: while it is open they fail at once, and a
+        failure that opens it is not retried.
+
+        Within a request no attempt starts, and no retry is waited for, past the request's deadline.
+
+        Records per-method latency, retries, rate limiting and errors.
+
+        Args:
+            method (str): Name of the `Client` method, e.g. "get_transaction".
+            *args: Positional arguments for the method.
+            **kwargs: Keyword arguments for the method.
+
+        Returns:
+            The RPC response.
+
+        Raises:
+            SolanaRpcException: If the retry fails as well, or the circuit is open.
+            DeadlineExceeded: If the current request runs out of time.
+        """
+        breaker = get_breaker("solana_rpc")
+        for attempt in range(2):
+            check_deadline(f"rpc.{method}")
+            try:
+                breaker.before_call()
+            except CircuitOpenError as e:
+                RPC_ERRORS.labels(method).inc()
+                raise RpcCircuitOpenError(e.dependency, e.retry_after) from None
+            start_ts = time.perf_counter()
+            try:
+                try:
+                    with span(f"rpc.{method}", attempt=attempt):
+                        result = getattr(cls.get_client(), method)(*args, **kwargs)
+                finally:
+                    # observed before any retry pause, so the latency is the call's alone
+                    RPC_LATENCY.labels(method).observe(time.perf_counter() - start_ts)
+                breaker.record_success()
+                return result
+            except DeadlineExceeded:
+                breaker.record_cancelled()
+                raise
+            except SolanaRpcException as e:
+                breaker.record_failure()
+                cause = e.__cause__
+                if isinstance(cause, httpx.HTTPStatusError) and cause.response.status_code == 429:
+                    RPC_RATE_LIMITED.labels(method).inc()
+                if attempt or breaker.state == OPEN:
+                    RPC_ERRORS.labels(method).inc()
+                    raise
+                deadline = current_deadline()
+                if deadline is not None and deadline.remaining() < RPC_RETRY_DELAY:
+                    # the request would run out of time before the retry
+                    RPC_ERRORS.labels(method).inc()
+                    raise deadline.exceed(f"rpc.{method}") from e
+                RPC_RETRIES.labels(method).inc()
+                sleep(RPC_RETRY_DELAY)
+            except BaseException:
+                # e.g. a JSON-RPC error response: neither a success nor an outage, but the trial slot of a
+                # half-open breaker must be given back
+                breaker.record_cancelled()
+                raise
+
+    @traced
     def check_if_token(self) -> tuple[bool, str]:
         """
         Checks if the provided address corresponds to a token.
@@ -46,29 +166,122 @@ class TokenChainInfo:
         Raises:
             SolanaRpcException: If an error occurs during the RPC call.
         """
-        ans = self.client.get_token_supply(self.token_pb)
+        ans = self._call("get_token_supply", self.token_pb)
         if isinstance(ans, InvalidParamsMessage):
             return False, ans.message
         return True, "Token found"
 
-    def get_token_update_authority(self) -> Pubkey:
+    @classmethod
+    @traced
+    def check_if_tokens(cls, token_addresses: list[str]) -> dict[str, tuple[bool, str]]:
+        """
+        Checks which of the provided addresses correspond to initialized token mints.
+
+        Accounts are fetched in chunks with `getMultipleAccounts` and the owner program and
+        mint layout are checked locally.
+
+        Args:
+            token_addresses (list[str]): The addresses to check.
+
+        Returns:
+            dict[str, tuple[bool, str]]: For every address, whether it is a token and a message.
+
+        Raises:
+            SolanaRpcException: If an error occurs during the RPC call.
+        """
+        results = {}
+        pubkeys = []
+        for address in token_addresses:
+            try:
+                pubkeys.append(Pubkey.from_string(address))
+            except ValueError:
+                results[address] = (False, "Invalid address")
+
+        for i in range(0, len(pubkeys), MULTIPLE_ACCOUNTS_LIMIT):
+            chunk = pubkeys[i: i + MULTIPLE_ACCOUNTS_LIMIT]
+            accounts = cls._call("get_multiple_accounts", chunk, encoding="base64").value
+            for pubkey, account in zip(chunk, accounts):
+                if account is None:
+                    results[str(pubkey)] = (False, "Account not found")
+                elif not is_mint_account(account.owner, bytes(account.data)):
+                    results[str(pubkey)] = (False, "Account is not a token mint")
+                elif not decode_mint(bytes(account.data)).is_initialized:
+                    results[str(pubkey)] = (False, "Token mint is not initialized")
+                else:
+                    results[str(pubkey)] = (True, "Token found")
+        return results
+
+    @classmethod
+    @traced
+    def get_tokens_metadata(cls, token_addresses: list[str]) -> dict[str, TokenMetadata]:
         """
-        Retrieves the update authority of the token.
+        Resolves the name, symbol and authorities of many tokens.
+
+        The mint and Metaplex metadata accounts of `METADATA_MINTS_PER_CALL` mints are fetched
+        together with one `getMultipleAccounts` call and decoded locally.
+
+        Args:
+            token_addresses (list[str]): The addresses of the tokens.
 
         Returns:
-            Pubkey: The public key of the token's update authority.
+            dict[str, TokenMetadata]: The metadata of every address that is a token mint.
 
         Raises:
             SolanaRpcException: If an error occurs during the RPC call.
         """
-        account_info = self.client.get_account_info(self.token_pb)
-        update_authority_bytes = account_info.value.data[4:36]
-        self.token_update_authority = Pubkey(update_authority_bytes)
-        return Pubkey(update_authority_bytes)
+        results = {}
+        mints = []
+        for address in token_addresses:
+            try:
+                mints.append(Pubkey.from_string(address))
+            except ValueError:
+                logger.warning(f"Skipping metadata of invalid address {address}")
+
+        for i in range(0, len(mints), METADATA_MINTS_PER_CALL):
+            chunk = mints[i: i + METADATA_MINTS_PER_CALL]
+            keys = [key for mint in chunk for key in (mint, metadata_address(mint))]
+            accounts = cls._call("get_multiple_accounts", keys, encoding="base64").value
+            for mint, mint_account, metadata_account in zip(chunk, accounts[0::2], accounts[1::2]):
+                if mint_account is None or not is_mint_account(mint_account.owner, bytes(mint_account.data)):
+                    continue
+                mint_info = decode_mint(bytes(mint_account.data))
+                metadata = None
+                if metadata_account is not None and metadata_account.owner == METADATA_PROGRAM_ID:
+                    try:
+                        metadata = decode_metadata(bytes(metadata_account.data))
+                    except (ValueError, struct.error) as e:
+                        logger.warning(f"Failed to decode the metadata of {mint}: {str(e)}")
+                results[str(mint)] = TokenMetadata(
+                    name=metadata.name if metadata else None,
+                    symbol=metadata.symbol if metadata else None,
+                    mint_authority=mint_info.mint_authority,
+                    freeze_authority=mint_info.freeze_authority,
+                    update_authority=metadata.update_authority if metadata else None,
+                )
+        return results
+
+    @traced
+    def get_token_update_authority(self) -> Pubkey | None:
+        """
+        Retrieves the Metaplex update authority of the token.
+
+        Returns:
+            Pubkey | None: The public key of the token's update authority, None without a metadata account.
 
-    def collect_token_signatures(self):
+        Raises:
+            SolanaRpcException: If an error occurs during the RPC call.
+        """
+        metadata = self.get_tokens_metadata([str(self.token_pb)]).get(str(self.token_pb))
+        self.token_update_authority = metadata.update_authority if metadata is not None else None
+        return self.token_update_authority
+
+    def collect_token_signatures(self, until: Optional[str] = None, before: Optional[str] = None):
         """
-        Collects token signatures from the Solana blockchain in batches.
+        Collects token signatures from the Solana blockchain in batches, newest first.
+
+        Args:
+            until (str | None): Stop at this signature, which is not returned. None walks the whole history.
+            before (str | None): Start right after this signature, going back in time. None starts from the newest.
 
         Yields:
             list[Signature]: A batch of valid transaction signatures.
@@ -76,11 +289,11 @@ class TokenChainInfo:
         Raises:
             SolanaRpcException: If an error occurs during the RPC call.
         """
-        try:
-            signatures = self.client.get_signatures_for_address(self.token_pb, limit=1000).value
-        except SolanaRpcException:
-            sleep(15)
-            signatures = self.client.get_signatures_for_address(self.token_pb, limit=1000).value
+        until_sig = Signature.from_string(until) if until else None
+        before_sig = Signature.from_string(before) if before else None
+        signatures = self._call(
+            "get_signatures_for_address", self.token_pb, before=before_sig, until=until_sig, limit=1000
+        ).value
 
         start_ts = datetime.now()
 
@@ -90,75 +303,133 @@ class TokenChainInfo:
 
             last_signature = signatures[-1].signature
 
-            try:
-                signatures = self.client.get_signatures_for_address(
-                    self.token_pb, before=last_signature, limit=1000
-                ).value
-            except SolanaRpcException:
-                sleep(15)
-                signatures = self.client.get_signatures_for_address(
-                    self.token_pb, before=last_signature, limit=1000
-                ).value
+            signatures = self._call(
+                "get_signatures_for_address", self.token_pb, before=last_signature, until=until_sig, limit=1000
+            ).value
 
         end_ts = datetime.now()
         logger.info(end_ts - start_ts)
 
-    def find_first_50_transactions(self, signatures):
+    @traced
+    def find_deploy_transaction(self):
         """
-        Finds the first 50 transactions involving the token.
+        Finds the token's creation transaction by walking its signature history backwards.
 
-        Args:
-            signatures (list[str]): List of transaction signatures.
+        Only the cursor and the current page are kept in memory, so the walk costs one RPC call
+        per 1000 signatures and no memory proportional to the history.
 
         Returns:
-            dict: Dictionary containing unique buyers and their balances.
+            RpcConfirmedTransactionStatusWithSignature | None: The oldest successful transaction
+            involving the token, or None if it has none.
 
         Raises:
             SolanaRpcException: If an error occurs during the RPC call.
         """
-        unique_buyers = {}
+        oldest = None
+        before = None
+        while True:
+            signatures = self._call("get_signatures_for_address", self.token_pb, before=before, limit=1000).value
+            if not signatures:
+                break
+            successful = [sig for sig in signatures if sig.err is None]
+            if successful:
+                oldest = successful[-1]
+            before = signatures[-1].signature
+            if len(signatures) < 1000:
+                break
+        self.init_mint_sig = oldest.signature if oldest is not None else None
+        return oldest
 
-        for sig in signatures:
-            signature = Signature.from_string(sig)
+    def iter_balance_deltas(self, signatures, skip_errors: bool = True) -> Iterator[Optional[BalanceDeltas]]:
+        """
+        Fetches transactions and decodes them into the balance changes of the token, in signature order.
 
-            try:
-                transaction = self.client.get_transaction(
-                    signature, max_supported_transaction_version=0
-                ).value.transaction
-            except SolanaRpcException:
-                sleep(15)
-                transaction = self.client.get_transaction(
-                    signature, max_supported_transaction_version=0
-                ).value.transaction
+        Transactions are fetched undecoded and decoded by the parsing process pool while the next
+        ones are fetched, so decoding scales with the cores and keeps off the request thread. At most
+        twice `TX_PARSE_WORKERS` transactions are in flight, and those not consumed yet when the
+        caller stops are cancelled.
 
-            if transaction.meta.err:
-                continue
+        Args:
+            signatures (list[str]): List of transaction signatures.
+            skip_errors (bool): Log and skip transactions the RPC fails to return, instead of raising.
 
-            signer = transaction.transaction.message.account_keys[0]
+        Yields:
+            BalanceDeltas | None: The balance changes of each transaction, None for failed transactions.
 
-            pre_balances = [bal for bal in transaction.meta.pre_token_balances if bal.mint == self.token_pb]
-            post_balances = [bal for bal in transaction.meta.post_token_balances if bal.mint == self.token_pb]
+        Raises:
+            SolanaRpcException: If an error occurs during the RPC call.
+            ValueError: If a transaction is not returned and `skip_errors` is False.
+        """
+        mint = str(self.token_pb)
+        pool = get_parse_pool()
+        pending = deque()
 
-            pre_dict = {bal.owner: int(bal.ui_token_amount.amount) for bal in pre_balances}
-            post_dict = {bal.owner: int(bal.ui_token_amount.amount) for bal in post_balances}
+        def parsed(parse, *args):
+            try:
+                return parse(*args)
+            except ValueError as e:
+                if not skip_errors:
+                    raise
+                logger.warning(f"Skipping transaction of {mint}: {str(e)}")
+                return None
+
+        def next_parsed():
+            try:
+                return parsed(pending.popleft().result, time_left("tx_parse"))
+            except FutureTimeoutError as e:
+                # only a request deadline bounds the wait
+                raise current_deadline().exceed("tx_parse") from e
 
-            for owner, post_bal in post_dict.items():
-                pre_bal = pre_dict.get(owner, 0)
-                balance_change = post_bal - pre_bal
+        try:
+            for sig in signatures:
+                raw = self._call(
+                    "get_transaction_raw", Signature.from_string(sig), max_supported_transaction_version=0
+                )
+                if pool is None:
+                    yield parsed(parse_balance_deltas, raw, mint)
+                    continue
+                pending.append(pool.submit(parse_balance_deltas, raw, mint))
+                # hand out what is decoded already, waiting only while too many transactions are in flight
+                while pending and (pending[0].done() or len(pending) > 2 * TX_PARSE_WORKERS):
+                    yield next_parsed()
+            while pending:
+                yield next_parsed()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    @traced
+    def find_first_50_transactions(self, signatures):
+        """
+        Finds the first 50 transactions involving the token.
 
-                if balance_change > 0 and owner not in unique_buyers and str(signer) == str(owner):
-                    unique_buyers[owner] = post_bal
+        Args:
+            signatures (list[str]): List of transaction signatures.
 
+        Returns:
+            dict: Dictionary containing unique buyers and their balances.
+
+        Raises:
+            SolanaRpcException: If an error occurs during the RPC call.
+        """
+        unique_buyers = {}
+        deltas_iter = self.iter_balance_deltas(signatures)
+        try:
+            for deltas in deltas_iter:
+                if deltas is None or deltas.signer in unique_buyers:
+                    continue
+                pre_balance, post_balance = deltas.balances.get(deltas.signer, (0, 0))
+                if post_balance > pre_balance:
+                    unique_buyers[deltas.signer] = post_balance
+                    logger.info(f"Found {len(unique_buyers)} holders...")
                     if len(unique_buyers) >= 50:
                         break
-
-            logger.info(f"Found {len(unique_buyers)} holders...")
-
-            if len(unique_buyers) >= 50:
-                break
+        finally:
+            deltas_iter.close()
 
         return unique_buyers
 
+    @traced
     def get_current_holders_balances(self, holders):
         """
         Gets the current balances of token holders.
@@ -179,23 +450,70 @@ class TokenChainInfo:
             pk = Pubkey.from_string(holder_address)
             current_amount = 0
 
-            try:
-                token_accounts = self.client.get_token_accounts_by_owner(pk, opts=opts)
-            except SolanaRpcException:
-                sleep(15)
-                token_accounts = self.client.get_token_accounts_by_owner(pk, opts=opts)
+            token_accounts = self._call("get_token_accounts_by_owner", pk, opts=opts)
 
             for token_acc in token_accounts.value:
-                try:
-                    current_amount += int(
-                        self.client.get_token_account_balance(token_acc.pubkey).value.amount
-                    )
-                except SolanaRpcException:
-                    sleep(15)
-                    current_amount += int(
-                        self.client.get_token_account_balance(token_acc.pubkey).value.amount
-                    )
+                current_amount += int(self._call("get_token_account_balance", token_acc.pubkey).value.amount)
 
             current_balances.append(current_amount)
 
         return current_balances
+
+    @traced
+    def get_all_holder_balances(self) -> dict[str, int]:
+        """
+        Gets the balance of every holder of the token from a snapshot of all its token accounts.
+
+        One `getProgramAccounts` call selects the token accounts of the mint with a `dataSize` and
+        a mint `memcmp` filter, and returns only their owner and amount through `dataSlice`. The
+        slices are summed per owner locally. Token-2022 accounts may carry extensions and have no
+        fixed size, so if the token program has no accounts of the mint, they are queried without
+        the size filter.
+
+        Returns:
+            dict[str, int]: Balance in raw token units per owner address, owners of empty accounts left out.
+
+        Raises:
+            SolanaRpcException: If an error occurs during the RPC call.
+        """
+        mint_filter = types.MemcmpOpts(offset=0, bytes=str(self.token_pb))
+        data_slice = types.DataSliceOpts(offset=OWNER_OFFSET, length=OWNER_AMOUNT_LENGTH)
+        queries = ((TOKEN_PROGRAM_ID, [ACCOUNT_SIZE, mint_filter]), (TOKEN_2022_PROGRAM_ID, [mint_filter]))
+        totals = {}
+        for program_id, filters in queries:
+            accounts = self._call(
+                "get_program_accounts", program_id, encoding="base64", data_slice=data_slice, filters=filters
+            ).value
+            if accounts:
+                totals = sum_owner_amounts(bytes(keyed.account.data) for keyed in accounts)
+                logger.info(f"Loaded {len(accounts)} token accounts of {self.token_pb}")
+                break
+        return {str(Pubkey(owner)): amount for owner, amount in totals.items() if amount}
+
+    @classmethod
+    @traced
+    def get_wallet_balances(cls, owner_address: str) -> dict[str, int]:
+        """
+        Gets the balances of every token held by a wallet.
+
+        Makes one unfiltered `getTokenAccountsByOwner` call per SPL token program and decodes
+        the token accounts locally.
+
+        Args:
+            owner_address (str): The address of the wallet.
+
+        Returns:
+            dict[str, int]: Balance in raw token units per mint address.
+
+        Raises:
+            SolanaRpcException: If an error occurs during the RPC call.
+        """
+        owner = Pubkey.from_string(owner_address)
+        balances = {}
+        for program_id in TOKEN_PROGRAMS:
+            opts = types.TokenAccountOpts(program_id=program_id, encoding="base64")
+            for token_acc in cls._call("get_token_accounts_by_owner", owner, opts=opts).value:
+                account = decode_token_account(bytes(token_acc.account.data))
+                mint = str(account.mint)
+                balances[mint] = balances.get(mint, 0) + account.amount
+        return balances
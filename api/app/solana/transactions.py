@@ -0,0 +1,84 @@
+import json
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Optional
+from app.config import TX_PARSE_WORKERS
+
+
+class BalanceDeltas(NamedTuple):
+    """
+    Token balance changes of one successful transaction, for one mint.
+
+    Attributes:
+        signer (str): The address of the fee payer, the first account of the transaction.
+        balances (dict[str, tuple[int, int]]): Balance before and after the transaction in raw token
+            units, per owner whose balance changed.
+    """
+
+    signer: str
+    balances: dict[str, tuple[int, int]]
+
+
+def parse_balance_deltas(raw: str, mint: str) -> Optional[BalanceDeltas]:
+    """
+    Decode a raw `getTransaction` response into the balance changes of one mint.
+
+    Runs in the parsing processes: only the small result crosses the process boundary, never the
+    decoded transaction. The balances of all token accounts of an owner are summed.
+
+    Args:
+        raw (str): The JSON-RPC response of `getTransaction` with the "json" encoding.
+        mint (str): The address of the mint.
+
+    Returns:
+        BalanceDeltas | None: The balance changes, or None for failed transactions.
+
+    Raises:
+        ValueError: If the RPC answered with an error or does not know the transaction.
+    """
+    response = json.loads(raw)
+    if "error" in response:
+        raise ValueError(f"getTransaction failed: {response['error'].get('message')}")
+    transaction = response.get("result")
+    if transaction is None:
+        raise ValueError("Transaction not found")
+    if transaction["meta"] is None or transaction["meta"]["err"] is not None:
+        return None
+    amounts: dict[str, list[int]] = {}
+    for index, key in enumerate(("preTokenBalances", "postTokenBalances")):
+        for balance in transaction["meta"].get(key) or ():
+            if balance.get("mint") != mint or not balance.get("owner"):
+                continue
+            amounts.setdefault(balance["owner"], [0, 0])[index] += int(balance["uiTokenAmount"]["amount"])
+    return BalanceDeltas(
+        signer=transaction["transaction"]["message"]["accountKeys"][0],
+        balances={owner: (pre, post) for owner, (pre, post) in amounts.items() if pre != post},
+    )
+
+
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
+
+
+def get_parse_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Get the process pool decoding transactions, starting it on first use.
+
+    The workers are spawned rather than forked, the parent runs threads whose locks must not be
+    copied into them.
+
+    Returns:
+        ProcessPoolExecutor | None: The pool of `TX_PARSE_WORKERS` processes, None if decoding runs in
+        the calling thread.
+    """
+    global _parse_pool
+    if TX_PARSE_WORKERS <= 0:
+        return None
+    if _parse_pool is None:
+        with _parse_pool_lock:
+            if _parse_pool is None:
+                _parse_pool = ProcessPoolExecutor(
+                    max_workers=TX_PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+                )
+    return _parse_pool
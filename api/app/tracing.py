@@ -0,0 +1,254 @@
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+import requests
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config import TRACING_COLLECTOR_URL, TRACING_EXPORTER, TRACING_JSON_PATH, TRACING_SAMPLE_RATE
+
+logger = logging.getLogger("resources")
+
+# Header a client can send to force tracing of a single request
+TRACE_HEADER = "X-Trace"
+
+
+class Span:
+    """
+    A timed operation inside a trace.
+
+    Attributes:
+        trace_id (str): The ID of the trace the span belongs to.
+        span_id (str): The ID of the span.
+        parent_id (str | None): The ID of the parent span, None for the root span.
+        name (str): The name of the operation.
+        tags (dict[str, str]): Additional attributes of the operation.
+        start_us (int): Start time in microseconds since the epoch.
+        duration_us (int): Duration in microseconds, set when the span ends.
+    """
+
+    def __init__(self, trace_id: str, parent_id: Optional[str], name: str, tags: dict):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.tags = {key: str(value) for key, value in tags.items()}
+        self.start_us = int(time.time() * 1_000_000)
+        self.duration_us = 0
+        self._start_ts = time.perf_counter()
+
+    def end(self):
+        """
+        Mark the span as finished.
+        """
+        self.duration_us = int((time.perf_counter() - self._start_ts) * 1_000_000)
+
+    def to_zipkin(self) -> dict:
+        """
+        Serialize the span in the Zipkin v2 JSON format.
+
+        Returns:
+            dict: The serialized span.
+        """
+        data = {
+            "traceId": self.trace_id,
+            "id": self.span_id,
+            "name": self.name,
+            "timestamp": self.start_us,
+            "duration": self.duration_us,
+            "localEndpoint": {"serviceName": "solana-chat-bot-api"},
+            "tags": self.tags,
+        }
+        if self.parent_id:
+            data["parentId"] = self.parent_id
+        return data
+
+
+class Trace:
+    """
+    All spans recorded for a single request.
+
+    Attributes:
+        trace_id (str): The ID of the trace.
+        spans (list[Span]): Finished and in-flight spans of the trace.
+    """
+
+    def __init__(self):
+        self.trace_id = f"{random.getrandbits(128):032x}"
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def should_trace(header_value: Optional[str]) -> bool:
+    """
+    Decide whether a request is traced.
+
+    Args:
+        header_value (str | None): Value of the `X-Trace` request header.
+
+    Returns:
+        bool: True if the request was opted in or sampled.
+    """
+    if TRACING_EXPORTER == "none":
+        return False
+    if header_value in ("1", "true"):
+        return True
+    return random.random() < TRACING_SAMPLE_RATE
+
+
+@contextmanager
+def span(name: str, **tags):
+    """
+    Context manager recording a child span of the current span.
+
+    Does nothing when the current request is not traced.
+
+    Args:
+        name (str): The name of the operation.
+        **tags: Additional attributes of the operation.
+
+    Yields:
+        Span | None: The recorded span, or None when not tracing.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _current_span.get()
+    current = Span(trace.trace_id, parent.span_id if parent else None, name, tags)
+    trace.add(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.tags["error"] = type(e).__name__
+        raise
+    finally:
+        current.end()
+        _current_span.reset(token)
+
+
+def traced(func):
+    """
+    Decorator recording a span named after the function for every call.
+
+    Args:
+        func (Callable): The function to trace.
+
+    Returns:
+        Callable: The wrapped function.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with span(func.__qualname__):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def start_trace(name: str, **tags):
+    """
+    Start a new trace with a root span and export it once finished.
+
+    Args:
+        name (str): The name of the root operation.
+        **tags: Additional attributes of the root operation.
+
+    Yields:
+        Trace: The started trace.
+    """
+    trace = Trace()
+    trace_token = _current_trace.set(trace)
+    try:
+        with span(name, **tags):
+            yield trace
+    finally:
+        _current_trace.reset(trace_token)
+        _exporter.submit(trace)
+
+
+class _Exporter:
+    """
+    Background exporter writing finished traces to a JSON file or a Zipkin-compatible collector.
+    """
+
+    def __init__(self):
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, trace: Trace):
+        """
+        Queue a finished trace for export.
+
+        Args:
+            trace (Trace): The finished trace.
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+        self._queue.put(trace)
+
+    def _run(self):
+        while True:
+            trace = self._queue.get()
+            spans = [span.to_zipkin() for span in trace.spans]
+            try:
+                if TRACING_EXPORTER == "json":
+                    os.makedirs(os.path.dirname(TRACING_JSON_PATH) or ".", exist_ok=True)
+                    with open(TRACING_JSON_PATH, "a") as f:
+                        f.write(json.dumps(spans) + "\n")
+                elif TRACING_EXPORTER == "zipkin":
+                    requests.post(TRACING_COLLECTOR_URL, json=spans, timeout=5)
+            except Exception as e:
+                logger.error(f"Failed to export trace {trace.trace_id}: {str(e)}")
+
+
+_exporter = _Exporter()
+
+
+def trace_engine(engine: Engine):
+    """
+    Register SQLAlchemy event listeners recording a span for every SQL statement.
+
+    Args:
+        engine (Engine): The SQLAlchemy engine.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_trace.get() is None:
+            return
+        db_span = span("db.query", statement=statement[:200])
+        db_span.__enter__()
+        conn.info.setdefault("trace_spans", []).append(db_span)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get("trace_spans"):
+            conn.info["trace_spans"].pop().__exit__(None, None, None)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        connection = context.connection
+        if connection is not None and connection.info.get("trace_spans"):
+            error = context.original_exception
+            connection.info["trace_spans"].pop().__exit__(type(error), error, None)
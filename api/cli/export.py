@@ -0,0 +1,57 @@
+import argparse
+import sys
+import time
+import requests
+
+# Size of the chunks read from the response and written to the output
+CHUNK_SIZE = 1024 * 1024
+
+
+def export(base_url: str, table: str, address: str, export_format: str, out) -> int:
+    """
+    Download a token export from the API and write it as it arrives.
+
+    Args:
+        base_url (str): Base URL of the API service.
+        table (str): The data to export: signatures or holders.
+        address (str): The address of the token.
+        export_format (str): The output format: ndjson, parquet or arrow.
+        out: Binary file object to write to.
+
+    Returns:
+        int: Number of bytes written.
+
+    Raises:
+        requests.HTTPError: If the API rejects the export.
+    """
+    written = 0
+    with requests.get(
+        f"{base_url}/export/{table}/{address}", params={"format": export_format}, stream=True, timeout=60
+    ) as response:
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            out.write(chunk)
+            written += len(chunk)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the signatures or holders of a token as NDJSON or Parquet.")
+    parser.add_argument("table", choices=["signatures", "holders"], help="The data to export.")
+    parser.add_argument("address", help="The address of the token.")
+    parser.add_argument("--format", dest="export_format", choices=["ndjson", "parquet", "arrow"], default="ndjson")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="Base URL of the API service.")
+    parser.add_argument("--out", help="Output file, stdout if omitted.")
+    args = parser.parse_args()
+
+    start_ts = time.perf_counter()
+    if args.out:
+        with open(args.out, "wb") as out:
+            written = export(args.base_url, args.table, args.address, args.export_format, out)
+    else:
+        written = export(args.base_url, args.table, args.address, args.export_format, sys.stdout.buffer)
+    print(f"Exported {written} bytes in {time.perf_counter() - start_ts:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
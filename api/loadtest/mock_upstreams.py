@@ -0,0 +1,271 @@
+import asyncio
+import base64
+import hashlib
+import os
+import time
+import uvicorn
+from fastapi import FastAPI, Request
+from solders.pubkey import Pubkey
+
+# Artificial upstream latency in milliseconds, to mimic a real RPC provider and Dexscreener
+MOCK_RPC_LATENCY_MS = float(os.environ.get("MOCK_RPC_LATENCY_MS", 50))
+MOCK_DEX_LATENCY_MS = float(os.environ.get("MOCK_DEX_LATENCY_MS", 100))
+MOCK_PORT = int(os.environ.get("MOCK_PORT", 9000))
+# Mints every wallet holds when its token accounts are listed by program, comma separated
+MOCK_WALLET_MINTS = [mint for mint in os.environ.get("MOCK_WALLET_MINTS", "").split(",") if mint]
+# Number of token accounts of every mint returned by getProgramAccounts, every tenth owner holds two
+MOCK_MINT_ACCOUNTS = int(os.environ.get("MOCK_MINT_ACCOUNTS", 1000))
+
+TOKEN_PROGRAM_ID = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+METADATA_PROGRAM_ID = "metaqbxxUerdq28cj1RbAWkYQm3ybzjb6a8bt518x1s"
+WSOL_ADDRESS = "So11111111111111111111111111111111111111112"
+MOCK_SLOT = 250_000_000
+
+app = FastAPI()
+
+
+def _balance_for(address: str) -> int:
+    """
+    Derive a stable pseudo-random token balance for an address.
+
+    Args:
+        address (str): The address of the holder or token account.
+
+    Returns:
+        int: The balance in raw token units.
+    """
+    digest = hashlib.sha256(address.encode()).digest()
+    return int.from_bytes(digest[:4], "little") * 1000
+
+
+def _context(value) -> dict:
+    """
+    Wrap a value into the `{context, value}` envelope used by RPC responses.
+
+    Args:
+        value: The RPC response value.
+
+    Returns:
+        dict: The wrapped value.
+    """
+    return {"context": {"slot": MOCK_SLOT}, "value": value}
+
+
+def _mint_account() -> dict:
+    """
+    Build an initialized SPL mint account owned by the token program.
+
+    Returns:
+        dict: The account in base64 encoding.
+    """
+    data = bytearray(82)
+    data[44] = 6  # decimals
+    data[45] = 1  # is_initialized
+    return {
+        "data": [base64.b64encode(bytes(data)).decode(), "base64"],
+        "executable": False,
+        "lamports": 1461600,
+        "owner": TOKEN_PROGRAM_ID,
+        "rentEpoch": 0,
+        "space": 82,
+    }
+
+
+def _metadata_address(mint: str) -> str:
+    """
+    Derive the address of the Metaplex metadata account of a mint.
+
+    Args:
+        mint (str): The mint.
+
+    Returns:
+        str: The metadata account address.
+    """
+    program = Pubkey.from_string(METADATA_PROGRAM_ID)
+    address, _ = Pubkey.find_program_address([b"metadata", bytes(program), bytes(Pubkey.from_string(mint))], program)
+    return str(address)
+
+
+def _metadata_account(mint: str) -> dict:
+    """
+    Build a Metaplex metadata account naming the mint after its address.
+
+    Args:
+        mint (str): The mint described by the metadata.
+
+    Returns:
+        dict: The account in base64 encoding.
+    """
+    name, symbol = f"Mock {mint[:6]}".encode(), mint[:4].upper().encode()
+    data = bytearray([4]) + bytes(32) + bytes(Pubkey.from_string(mint))
+    data += len(name).to_bytes(4, "little") + name + len(symbol).to_bytes(4, "little") + symbol
+    return {
+        "data": [base64.b64encode(bytes(data)).decode(), "base64"],
+        "executable": False,
+        "lamports": 5616720,
+        "owner": METADATA_PROGRAM_ID,
+        "rentEpoch": 0,
+        "space": len(data),
+    }
+
+
+def _token_account(owner: str, mint: str) -> dict:
+    """
+    Build a keyed SPL token account holding a stable balance of the mint.
+
+    Args:
+        owner (str): The owner of the token account.
+        mint (str): The mint of the token account.
+
+    Returns:
+        dict: The keyed account in base64 encoding.
+    """
+    owner_pk = Pubkey.from_string(owner)
+    mint_pk = Pubkey.from_string(mint)
+    account_pk = Pubkey(hashlib.sha256(bytes(owner_pk) + bytes(mint_pk)).digest())
+    data = bytearray(165)
+    data[0:32] = bytes(mint_pk)
+    data[32:64] = bytes(owner_pk)
+    data[64:72] = _balance_for(str(account_pk)).to_bytes(8, "little")
+    data[108] = 1  # state: initialized
+    return {
+        "pubkey": str(account_pk),
+        "account": {
+            "data": [base64.b64encode(bytes(data)).decode(), "base64"],
+            "executable": False,
+            "lamports": 2039280,
+            "owner": TOKEN_PROGRAM_ID,
+            "rentEpoch": 0,
+            "space": 165,
+        },
+    }
+
+
+def _mint_token_accounts(mint: str, options: dict) -> list[dict]:
+    """
+    Build the token accounts of a mint as returned by `getProgramAccounts`, applying `dataSlice`.
+
+    Args:
+        mint (str): The mint of the token accounts.
+        options (dict): The getProgramAccounts options.
+
+    Returns:
+        list[dict]: `MOCK_MINT_ACCOUNTS` keyed accounts in base64 encoding.
+    """
+    data_slice = options.get("dataSlice") or {"offset": 0, "length": 165}
+    accounts = []
+    for i in range(MOCK_MINT_ACCOUNTS):
+        owner_index = i - 1 if i % 10 == 1 else i
+        owner = str(Pubkey(hashlib.sha256(f"{mint}:{owner_index}".encode()).digest()))
+        account = _token_account(owner, mint)
+        account["pubkey"] = str(Pubkey(hashlib.sha256(f"{mint}:account:{i}".encode()).digest()))
+        data = base64.b64decode(account["account"]["data"][0])
+        data = data[data_slice["offset"]: data_slice["offset"] + data_slice["length"]]
+        account["account"]["data"] = [base64.b64encode(data).decode(), "base64"]
+        accounts.append(account)
+    return accounts
+
+
+def _rpc_result(method: str, params: list):
+    """
+    Produce a canned result for a Solana JSON-RPC method.
+
+    Args:
+        method (str): The JSON-RPC method name.
+        params (list): The JSON-RPC params.
+
+    Returns:
+        The JSON-serializable result, or None for unsupported methods.
+    """
+    if method == "getTokenSupply":
+        return _context({"amount": "1000000000000000", "decimals": 6, "uiAmount": 1e9, "uiAmountString": "1000000000"})
+    if method == "getAccountInfo":
+        return _context(_mint_account())
+    if method == "getMultipleAccounts":
+        # Metadata accounts are returned for the metadata addresses of the other requested mints
+        metadata = {_metadata_address(key): key for key in params[0]}
+        return _context(
+            [_metadata_account(metadata[key]) if key in metadata else _mint_account() for key in params[0]]
+        )
+    if method == "getSignaturesForAddress":
+        return []
+    if method == "getTokenAccountsByOwner":
+        if "mint" in params[1]:
+            return _context([_token_account(params[0], params[1]["mint"])])
+        if params[1].get("programId") == TOKEN_PROGRAM_ID:
+            return _context([_token_account(params[0], mint) for mint in MOCK_WALLET_MINTS])
+        return _context([])
+    if method == "getProgramAccounts":
+        if params[0] != TOKEN_PROGRAM_ID:
+            return []
+        options = params[1] if len(params) > 1 else {}
+        filters = options.get("filters", [])
+        mints = [f["memcmp"]["bytes"] for f in filters if "memcmp" in f and not f["memcmp"]["offset"]]
+        return _mint_token_accounts(mints[0], options) if mints else []
+    if method == "getTokenAccountBalance":
+        amount = _balance_for(params[0])
+        return _context(
+            {"amount": str(amount), "decimals": 6, "uiAmount": amount / 1e6, "uiAmountString": str(amount / 1e6)}
+        )
+    if method == "getSlot":
+        return MOCK_SLOT
+    if method == "getHealth":
+        return "ok"
+    return None
+
+
+@app.post("/")
+async def rpc(request: Request):
+    """
+    Mock Solana JSON-RPC endpoint supporting single and batched requests.
+
+    Args:
+        request (Request): The incoming JSON-RPC request.
+
+    Returns:
+        dict | list: The JSON-RPC response(s).
+    """
+    payload = await request.json()
+    await asyncio.sleep(MOCK_RPC_LATENCY_MS / 1000)
+    calls = payload if isinstance(payload, list) else [payload]
+    answers = [
+        {"jsonrpc": "2.0", "id": call.get("id"), "result": _rpc_result(call["method"], call.get("params", []))}
+        for call in calls
+    ]
+    return answers if isinstance(payload, list) else answers[0]
+
+
+@app.get("/latest/dex/tokens/{address}")
+async def dex_tokens(address: str):
+    """
+    Mock Dexscreener token endpoint returning a single SOL pair for any address.
+
+    Args:
+        address (str): The address of the token.
+
+    Returns:
+        dict: Dexscreener-shaped token data.
+    """
+    await asyncio.sleep(MOCK_DEX_LATENCY_MS / 1000)
+    return {
+        "schemaVersion": "1.0.0",
+        "pairs": [
+            {
+                "chainId": "solana",
+                "dexId": "raydium",
+                "url": f"https://dexscreener.com/solana/{address}",
+                "pairAddress": address,
+                "baseToken": {"address": address, "name": "Load Test", "symbol": "LOAD"},
+                "quoteToken": {"address": WSOL_ADDRESS, "name": "Wrapped SOL", "symbol": "SOL"},
+                "priceUsd": "0.0001",
+                "volume": {"h24": 1000.0, "h6": 250.0, "h1": 40.0, "m5": 3.0},
+                "liquidity": {"usd": 50000.0, "base": 1e9, "quote": 150.0},
+                "fdv": 100000,
+                "pairCreatedAt": int((time.time() - 86400) * 1000),
+            }
+        ],
+    }
+
+
+if __name__ == "__main__":
+    uvicorn.run("loadtest.mock_upstreams:app", host="0.0.0.0", port=MOCK_PORT)
@@ -0,0 +1,195 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from collections import defaultdict
+import httpx
+
+# Endpoints driven by the load test: name -> (HTTP method, path template)
+ENDPOINTS = {
+    "get_token_info": ("GET", "/get_token_info/{address}"),
+    "get_holders_info": ("POST", "/get_holders_info/{address}"),
+}
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+
+    Args:
+        sorted_values (list[float]): The sorted samples.
+        pct (float): The percentile, between 0 and 100.
+
+    Returns:
+        float: The percentile value, 0.0 for an empty list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class Stats:
+    """
+    Latency and status counters collected per endpoint.
+
+    Attributes:
+        latencies (dict[str, list[float]]): Latencies of successful requests in seconds.
+        statuses (dict[str, dict[int, int]]): Response status counts, 0 for transport errors.
+    """
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint: str, status: int, latency: float):
+        """
+        Record a single request outcome.
+
+        Args:
+            endpoint (str): The endpoint name.
+            status (int): The HTTP status, 0 for transport errors.
+            latency (float): The request latency in seconds.
+        """
+        self.statuses[endpoint][status] += 1
+        if 200 <= status < 300:
+            self.latencies[endpoint].append(latency)
+
+    def report(self, elapsed: float) -> dict:
+        """
+        Summarize the collected samples.
+
+        Args:
+            elapsed (float): Wall-clock duration of the stage in seconds.
+
+        Returns:
+            dict: Per-endpoint throughput, error counts and latency percentiles in milliseconds.
+        """
+        summary = {}
+        for endpoint, statuses in self.statuses.items():
+            latencies = sorted(self.latencies[endpoint])
+            total = sum(statuses.values())
+            summary[endpoint] = {
+                "requests": total,
+                "errors": total - len(latencies),
+                "statuses": dict(statuses),
+                "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+                "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+                "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+            }
+        return summary
+
+
+async def worker(client: httpx.AsyncClient, addresses: list[str], mix: list[str], deadline: float, stats: Stats):
+    """
+    Issue requests back to back until the deadline.
+
+    Args:
+        client (httpx.AsyncClient): The HTTP client.
+        addresses (list[str]): Token addresses to query.
+        mix (list[str]): Endpoint names to pick from, repeated according to their weight.
+        deadline (float): `time.perf_counter()` value at which to stop.
+        stats (Stats): Collector for the outcomes.
+    """
+    while time.perf_counter() < deadline:
+        endpoint = random.choice(mix)
+        method, path = ENDPOINTS[endpoint]
+        start_ts = time.perf_counter()
+        try:
+            response = await client.request(method, path.format(address=random.choice(addresses)))
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 0
+        stats.record(endpoint, status, time.perf_counter() - start_ts)
+
+
+async def run_stage(base_url: str, addresses: list[str], mix: list[str], concurrency: int, duration: float) -> dict:
+    """
+    Run a fixed-concurrency load stage.
+
+    Args:
+        base_url (str): Base URL of the API service.
+        addresses (list[str]): Token addresses to query.
+        mix (list[str]): Weighted endpoint names.
+        concurrency (int): Number of concurrent clients.
+        duration (float): Stage duration in seconds.
+
+    Returns:
+        dict: The stage report.
+    """
+    stats = Stats()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        start_ts = time.perf_counter()
+        deadline = start_ts + duration
+        await asyncio.gather(*(worker(client, addresses, mix, deadline, stats) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start_ts
+    return {"concurrency": concurrency, "elapsed_s": round(elapsed, 2), "endpoints": stats.report(elapsed)}
+
+
+def parse_mix(value: str) -> list[str]:
+    """
+    Parse an endpoint mix like `get_token_info=3,get_holders_info=1`.
+
+    Args:
+        value (str): The mix specification.
+
+    Returns:
+        list[str]: Endpoint names repeated according to their weight.
+    """
+    mix = []
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint {name}, expected one of {list(ENDPOINTS)}")
+        mix += [name] * int(weight or 1)
+    return mix
+
+
+def print_stage(stage: dict):
+    print(f"\nconcurrency={stage['concurrency']} elapsed={stage['elapsed_s']}s")
+    print(
+        f"{'endpoint':<20}{'reqs':>8}{'errors':>8}{'rps':>10}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    )
+    for endpoint, row in stage["endpoints"].items():
+        print(
+            f"{endpoint:<20}{row['requests']:>8}{row['errors']:>8}{row['throughput_rps']:>10}"
+            f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}{row['max_ms']:>10}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the API endpoints and report throughput and latency.")
+    parser.add_argument("--base-url", default="http://localhost:5002", help="Base URL of the API service.")
+    parser.add_argument("--tokens-file", default="tokens.txt", help="File with token addresses, one per line.")
+    parser.add_argument(
+        "--mix", type=parse_mix, default=parse_mix("get_token_info=1,get_holders_info=1"), help="Endpoint weights."
+    )
+    parser.add_argument(
+        "--concurrency", default="1,4,16,64", help="Comma-separated concurrency levels, one stage per level."
+    )
+    parser.add_argument("--duration", type=float, default=30, help="Duration of each stage in seconds.")
+    parser.add_argument("--json", dest="json_out", help="Write the full report as JSON to this file.")
+    args = parser.parse_args()
+
+    with open(args.tokens_file) as f:
+        addresses = [line.strip() for line in f if line.strip()]
+
+    stages = []
+    for concurrency in (int(level) for level in args.concurrency.split(",")):
+        stage = asyncio.run(run_stage(args.base_url, addresses, args.mix, concurrency, args.duration))
+        print_stage(stage)
+        stages.append(stage)
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(stages, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
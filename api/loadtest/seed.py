@@ -0,0 +1,177 @@
+import argparse
+import io
+import logging
+import random
+import time
+from datetime import datetime
+import psycopg2
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+from app.config import POSTGRES_DB, POSTGRES_HOST, POSTGRES_PASSWORD, POSTGRES_USER
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger("resources")
+
+# Slot and block time the synthetic history starts from
+BASE_SLOT = 200_000_000
+BASE_BLOCK_TIME = 1_700_000_000
+
+
+class RowStream(io.TextIOBase):
+    """
+    Read-only text stream over lazily generated COPY rows.
+
+    Lets `copy_expert` pull tab-separated rows on demand, so seeding millions of rows
+    never materializes them in memory.
+
+    Attributes:
+        rows (Iterator[tuple]): The rows to serialize.
+    """
+
+    def __init__(self, rows):
+        """
+        Initializes the RowStream with a row iterator.
+
+        Args:
+            rows (Iterator[tuple]): The rows to serialize.
+        """
+        self.rows = iter(rows)
+        self._buffer = ""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        """
+        Read up to `size` characters of serialized rows.
+
+        Args:
+            size (int): Maximum number of characters to return, -1 for everything.
+
+        Returns:
+            str: The serialized rows, empty when exhausted.
+        """
+        while size < 0 or len(self._buffer) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self._buffer += "\t".join(str(value) for value in row) + "\n"
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+def random_pubkey(rng: random.Random) -> str:
+    """
+    Generate a random base58 public key.
+
+    Args:
+        rng (random.Random): The random generator.
+
+    Returns:
+        str: The public key.
+    """
+    return str(Pubkey(rng.randbytes(32)))
+
+
+def signature_rows(token_ids: list[int], signatures_per_token: int, rng: random.Random):
+    """
+    Generate synthetic signature rows for every token.
+
+    Args:
+        token_ids (list[int]): IDs of the seeded tokens.
+        signatures_per_token (int): Number of signatures per token.
+        rng (random.Random): The random generator.
+
+    Yields:
+        tuple: (signature, slot, block_time, token_id) rows.
+    """
+    for token_id in token_ids:
+        for i in range(signatures_per_token):
+            yield str(Signature(rng.randbytes(64))), BASE_SLOT + i, BASE_BLOCK_TIME + i // 2, token_id
+
+
+def holder_rows(token_ids: list[int], holders_per_token: int, rng: random.Random):
+    """
+    Generate synthetic holder rows for every token.
+
+    Args:
+        token_ids (list[int]): IDs of the seeded tokens.
+        holders_per_token (int): Number of holders per token.
+        rng (random.Random): The random generator.
+
+    Yields:
+        tuple: (address, token_id, initial_balance, current_balance, last_checked) rows.
+    """
+    last_checked = datetime.now().isoformat(sep=" ")
+    for token_id in token_ids:
+        for _ in range(holders_per_token):
+            initial_balance = rng.randint(1, 10**12)
+            current_balance = rng.choice([0, initial_balance // 3, initial_balance, initial_balance * 2])
+            yield random_pubkey(rng), token_id, initial_balance, current_balance, last_checked
+
+
+def seed(dsn: str, tokens: int, signatures_per_token: int, holders_per_token: int, seed_value: int) -> list[str]:
+    """
+    Seed the database with synthetic tokens, signatures and holders.
+
+    Args:
+        dsn (str): The PostgreSQL connection string.
+        tokens (int): Number of tokens to create.
+        signatures_per_token (int): Number of signatures per token.
+        holders_per_token (int): Number of holders per token.
+        seed_value (int): Seed for the random generator, for reproducible datasets.
+
+    Returns:
+        list[str]: Addresses of the seeded tokens.
+    """
+    rng = random.Random(seed_value)
+    addresses = [random_pubkey(rng) for _ in range(tokens)]
+    with psycopg2.connect(dsn) as conn, conn.cursor() as cur:
+        start_ts = time.perf_counter()
+        cur.execute(
+            "INSERT INTO token (address) SELECT unnest(%s::varchar[]) RETURNING id",
+            (addresses,),
+        )
+        token_ids = [row[0] for row in cur.fetchall()]
+        logger.info(f"Inserted {len(token_ids)} tokens")
+
+        cur.copy_expert(
+            "COPY signature (signature, slot, block_time, token_id) FROM STDIN",
+            RowStream(signature_rows(token_ids, signatures_per_token, rng)),
+        )
+        logger.info(f"Inserted {len(token_ids) * signatures_per_token} signatures")
+
+        cur.copy_expert(
+            "COPY holder (address, token_id, initial_balance, current_balance, last_checked) FROM STDIN",
+            RowStream(holder_rows(token_ids, holders_per_token, rng)),
+        )
+        logger.info(f"Inserted {len(token_ids) * holders_per_token} holders")
+        cur.execute("ANALYZE token; ANALYZE signature; ANALYZE holder;")
+        logger.info(f"Seeding took {time.perf_counter() - start_ts:.1f}s")
+    return addresses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed Postgres with synthetic load-test data.")
+    parser.add_argument(
+        "--dsn",
+        default=f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:5432/{POSTGRES_DB}",
+        help="PostgreSQL connection string.",
+    )
+    parser.add_argument("--tokens", type=int, default=100, help="Number of tokens to create.")
+    parser.add_argument("--signatures-per-token", type=int, default=10_000, help="Signatures per token.")
+    parser.add_argument("--holders-per-token", type=int, default=50, help="Holders per token.")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed.")
+    parser.add_argument("--out", default="tokens.txt", help="File to write the seeded token addresses to.")
+    args = parser.parse_args()
+
+    addresses = seed(args.dsn, args.tokens, args.signatures_per_token, args.holders_per_token, args.seed)
+    with open(args.out, "w") as f:
+        f.write("\n".join(addresses) + "\n")
+    logger.info(f"Token addresses written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Default budget for importing the application, in seconds
+DEFAULT_BUDGET = float(os.environ.get("STARTUP_TIME_BUDGET", 2.0))
+
+# Modules that must stay out of the import path of the application
+DEFAULT_FORBIDDEN = "solana,solders,uvicorn"
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imports the application in a fresh interpreter, prints the import time and the loaded top-level packages
+PROBE = """
+import sys, time
+start_ts = time.perf_counter()
+import main
+print(time.perf_counter() - start_ts)
+print(",".join(sorted({name.split(".")[0] for name in sys.modules})))
+"""
+
+
+def measure_startup() -> tuple[float, set[str]]:
+    """
+    Import the application once in a fresh interpreter.
+
+    No database or RPC endpoint is needed: connections are only made in the application lifespan
+    and on first use.
+
+    Returns:
+        tuple[float, set[str]]: Import time in seconds and the top-level packages that were loaded.
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=API_DIR, capture_output=True, text=True, check=True
+    ).stdout.split("\n")
+    return float(output[0]), set(output[1].split(","))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how long importing the API takes and enforce a budget.")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters to time.")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="Maximum median import time in seconds.")
+    parser.add_argument(
+        "--forbid", default=DEFAULT_FORBIDDEN, help="Comma-separated packages that must not be imported at startup."
+    )
+    args = parser.parse_args()
+
+    durations = []
+    loaded = set()
+    for _ in range(args.runs):
+        duration, modules = measure_startup()
+        durations.append(duration)
+        loaded |= modules
+    median = statistics.median(durations)
+    print(f"import main: median {median * 1000:.0f} ms, max {max(durations) * 1000:.0f} ms over {args.runs} runs")
+
+    failures = []
+    if median > args.budget:
+        failures.append(f"median import time {median:.3f}s exceeds the budget of {args.budget:.3f}s")
+    forbidden = sorted(loaded & {name for name in args.forbid.split(",") if name})
+    if forbidden:
+        failures.append(f"heavy packages imported at startup: {', '.join(forbidden)}")
+    for failure in failures:
+        print(failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,195 @@
-from fastapi import FastAPI
-import uvicorn
+import time
+from contextlib import asynccontextmanager, nullcontext
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import FileResponse, JSONResponse
+from requests import RequestException
+from app import init_db
+from app.admission import AdmissionController, AdmissionMiddleware
+from app.circuit_breaker import CircuitOpenError
+from app.cache import get_cache
 from app.config import PORT
+from app.deadline import DeadlineExceeded, DeadlineMiddleware
+from app.metrics import HTTP_LATENCY, render_metrics
+from app.profiling import PROFILE_HEADER, is_profiling_requested, new_profile_id, profile_path, start_profile
 from app.router import router
+from app.tracing import TRACE_HEADER, should_trace, start_trace
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application lifespan: create the database engine and tables once the server starts.
+
+    Args:
+        app (FastAPI): The application.
+    """
+    init_db()
+    yield
+
 
 # Initialize the FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Include router from the routers module
 app.include_router(router)
 
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError) -> JSONResponse:
+    """
+    Answer requests needing a dependency whose circuit is open with 503 and `Retry-After`.
+
+    Args:
+        request (Request): The incoming request.
+        exc (CircuitOpenError): The error.
+
+    Returns:
+        JSONResponse: The 503 response.
+    """
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, int(exc.retry_after)))},
+    )
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded) -> JSONResponse:
+    """
+    Answer requests that ran out of time with 504, naming the step that did.
+
+    Args:
+        request (Request): The incoming request.
+        exc (DeadlineExceeded): The error.
+
+    Returns:
+        JSONResponse: The 504 response.
+    """
+    return JSONResponse(status_code=504, content={"detail": str(exc), "step": exc.step, "reason": exc.reason})
+
+
+@app.exception_handler(RequestException)
+async def upstream_error_handler(request: Request, exc: RequestException) -> JSONResponse:
+    """
+    Answer requests whose upstream HTTP call failed with 502.
+
+    Args:
+        request (Request): The incoming request.
+        exc (RequestException): The error.
+
+    Returns:
+        JSONResponse: The 502 response.
+    """
+    return JSONResponse(status_code=502, content={"detail": f"Upstream request failed: {type(exc).__name__}"})
+
+
+# Admission control of the expensive endpoints of this worker
+admission = AdmissionController()
+
+
+# Innermost: capacity is held exactly while the application handles the request
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
+
+@app.middleware("http")
+async def trace_and_profile(request: Request, call_next):
+    """
+    Middleware tracing opted-in or sampled requests and profiling requests carrying the admin token.
+
+    Args:
+        request (Request): The incoming request.
+        call_next (Callable): The next handler in the chain.
+
+    Returns:
+        Response: The response of the next handler, with `X-Trace-Id` and `X-Profile-Id` headers when applicable.
+    """
+    profiling = start_profile() if is_profiling_requested(request.headers.get(PROFILE_HEADER)) else nullcontext()
+    with profiling as profiler:
+        if should_trace(request.headers.get(TRACE_HEADER)):
+            with start_trace(f"{request.method} {request.url.path}", method=request.method) as trace:
+                response = await call_next(request)
+                response.headers["X-Trace-Id"] = trace.trace_id
+        else:
+            response = await call_next(request)
+    if profiler is not None:
+        profile_id = new_profile_id()
+        profiler.write_folded(profile_id)
+        response.headers["X-Profile-Id"] = profile_id
+    return response
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """
+    Middleware recording the latency of every request, labelled by route template.
+
+    Args:
+        request (Request): The incoming request.
+        call_next (Callable): The next handler in the chain.
+
+    Returns:
+        Response: The response of the next handler.
+    """
+    start_ts = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        endpoint = route.path if route is not None else "unmatched"
+        HTTP_LATENCY.labels(request.method, endpoint, status_code).observe(time.perf_counter() - start_ts)
+
+
+# Outermost: every request gets its deadline before it waits for admission, and loses it on disconnect
+app.add_middleware(DeadlineMiddleware)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    """
+    Expose Prometheus metrics.
+
+    Returns:
+        Response: The metrics in the Prometheus text format.
+    """
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
+
+@app.get("/cache/stats", include_in_schema=False)
+def cache_stats() -> dict:
+    """
+    Expose the cache backend, its number of entries and the hit rate per namespace seen by this worker.
+
+    Returns:
+        dict: The cache statistics.
+    """
+    return get_cache().stats()
+
+
+@app.get("/profiles/{profile_id}", include_in_schema=False)
+def get_profile(profile_id: str, request: Request) -> FileResponse:
+    """
+    Download a collapsed-stack flamegraph recorded for a profiled request.
+
+    Args:
+        profile_id (str): The value of the `X-Profile-Id` response header.
+        request (Request): The incoming request, which must carry the admin token.
+
+    Returns:
+        FileResponse: The collapsed stacks, viewable with speedscope or flamegraph.pl.
+
+    Raises:
+        HTTPException: If the admin token is missing or the profile does not exist.
+    """
+    if not is_profiling_requested(request.headers.get(PROFILE_HEADER)):
+        raise HTTPException(status_code=403, detail="Profiling is not allowed.")
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found.")
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
+
 
 def start():
     """
@@ -17,6 +198,8 @@ def start():
     Notes:
         This function runs the FastAPI application using uvicorn with the specified host and port.
     """
+    import uvicorn
+
     uvicorn.run("main:app", host="0.0.0.0", port=PORT)
 
 
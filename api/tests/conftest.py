@@ -0,0 +1,42 @@
+import os
+import sys
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+# The unit tests import the API package directly, test_api.py talks to a running API instead
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    """In-memory SQLite database with every table, used as the primary of the API package"""
+    import app
+    import app.models.balance_history  # noqa: F401
+    import app.models.crawl  # noqa: F401
+    import app.models.holder  # noqa: F401
+    import app.models.holder_ledger  # noqa: F401
+    import app.models.holder_snapshot  # noqa: F401
+    import app.models.holder_summary  # noqa: F401
+    import app.models.signature  # noqa: F401
+    import app.models.token  # noqa: F401
+    from app.repository.token_repository import TOKEN_ID_CACHE_NAMESPACE, _token_ids
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    app.Base.metadata.create_all(engine)
+    monkeypatch.setattr(app, "_engine", engine)
+    app.SessionLocal.configure(bind=engine)
+    # token IDs restart in every database
+    _token_ids.invalidate(TOKEN_ID_CACHE_NAMESPACE)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    """Session of the in-memory database"""
+    import app
+
+    session = app.SessionLocal()
+    yield session
+    session.close()
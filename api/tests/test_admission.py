@@ -0,0 +1,15 @@
+from app.admission import client_key
+
+
+def test_client_key_prefers_client_id_header():
+    """Test that requests from one address with different client ids get their own per-client budgets"""
+    scope = {"client": ("10.0.0.5", 51000), "headers": [(b"x-client-id", b"telegram:42")]}
+    other = {"client": ("10.0.0.5", 51001), "headers": [(b"x-client-id", b"telegram:43")]}
+    assert client_key(scope) == "id:telegram:42"
+    assert client_key(scope) != client_key(other)
+
+
+def test_client_key_falls_back_to_ip():
+    """Test that a request without a client id is keyed on its IP address"""
+    assert client_key({"client": ("10.0.0.5", 51000), "headers": []}) == "ip:10.0.0.5"
+    assert client_key({"client": None, "headers": [(b"x-client-id", b"")]}) == "unknown"
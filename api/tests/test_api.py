@@ -1,8 +1,16 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
 
 # Base URL for the API
 BASE_URL = "http://localhost:5001"
 TOKEN_ADDRESS = "E5c1ZLiMkSt46W9tvWbSR6DMQRUpkxUpkEdLRcPr9akC"
+# Seconds to wait for the onboarding crawl of TOKEN_ADDRESS before testing what depends on it
+CRAWL_WAIT_TIMEOUT = 600
 
 
 def test_get_token_info_nonexistent():
@@ -28,3 +36,183 @@ def test_get_token_info_existent():
     assert (
         data["pairs"][0]["baseToken"]["address"] == TOKEN_ADDRESS
     ), f"Error {response.text} \n {response.json()}"
+
+
+def test_metrics():
+    """Test that Prometheus metrics are exposed"""
+    response = requests.get(f"{BASE_URL}/metrics")
+    assert response.status_code == 200, f"Error {response.text}"
+    assert "http_request_duration_seconds" in response.text, f"Error {response.text}"
+
+
+def test_get_token_info_not_modified():
+    """Test that a repeated request with the returned ETag is answered with 304"""
+    response = requests.get(f"{BASE_URL}/get_token_info/{TOKEN_ADDRESS}")
+    assert response.status_code == 200, f"Error {response.text}"
+    etag = response.headers["ETag"]
+    response = requests.get(f"{BASE_URL}/get_token_info/{TOKEN_ADDRESS}", headers={"If-None-Match": etag})
+    assert response.status_code == 304, f"Error {response.text}"
+    assert response.headers["ETag"] == etag
+
+
+def test_add_tokens():
+    """Test bulk token onboarding with an existing and an invalid address"""
+    response = requests.post(
+        f"{BASE_URL}/add_tokens", json={"addresses": [TOKEN_ADDRESS, "nonexistent_token_address"]}
+    )
+    assert response.status_code == 200, f"Error {response.text}"
+    statuses = [result["status"] for result in response.json()["results"]]
+    assert statuses == ["exists", "invalid"], f"Error {response.text}"
+
+
+def test_refresh_holders():
+    """Test that the cross-token holder refresh is scheduled"""
+    response = requests.post(f"{BASE_URL}/refresh_holders")
+    assert response.status_code == 202, f"Error {response.text}"
+
+
+def test_get_holders_summary():
+    """Test that the holder retention summary adds up to the holder list"""
+    holders = requests.get(f"{BASE_URL}/get_holders_info/{TOKEN_ADDRESS}").json()
+    response = requests.get(f"{BASE_URL}/get_holders_summary/{TOKEN_ADDRESS}")
+    assert response.status_code == 200, f"Error {response.text}"
+    summary = response.json()
+    buckets = ["blue", "green", "yellow", "orange", "red", "white"]
+    assert summary["holders"] == len(holders) == sum(summary[bucket] for bucket in buckets), f"Error {response.text}"
+
+
+def test_get_balance_history():
+    """Test that the downsampled balance history is returned in chronological order"""
+    response = requests.get(f"{BASE_URL}/get_balance_history/{TOKEN_ADDRESS}", params={"resolution": "1d"})
+    assert response.status_code == 200, f"Error {response.text}"
+    buckets = [point["bucket_start"] for point in response.json()]
+    assert buckets == sorted(buckets), f"Error {response.text}"
+
+
+def test_startup_time_budget():
+    """Test that importing the API stays within the startup budget without loading the chain libraries"""
+    api_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-m", "loadtest.startup", "--runs", "3"], cwd=api_dir, capture_output=True, text=True
+    )
+    assert result.returncode == 0, f"Error {result.stdout} {result.stderr}"
+
+
+def test_export_signatures_ndjson():
+    """Test streaming export of token signatures as NDJSON"""
+    response = requests.get(f"{BASE_URL}/export/signatures/{TOKEN_ADDRESS}", params={"format": "ndjson"}, stream=True)
+    assert response.status_code == 200, f"Error {response.text}"
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    for line in response.iter_lines():
+        assert set(json.loads(line)) == {"signature", "slot", "block_time"}, f"Error {line}"
+
+
+def test_cache_stats():
+    """Test that repeated token info requests are served from the cache"""
+    requests.get(f"{BASE_URL}/get_token_info/{TOKEN_ADDRESS}")
+    requests.get(f"{BASE_URL}/get_token_info/{TOKEN_ADDRESS}")
+    response = requests.get(f"{BASE_URL}/cache/stats")
+    assert response.status_code == 200, f"Error {response.text}"
+    assert response.json()["namespaces"]["dexscreener"]["hits"] > 0, f"Error {response.text}"
+
+
+def test_add_token_idempotent():
+    """Test that adding an already tracked token returns its crawl status"""
+    response = requests.post(f"{BASE_URL}/add_token/{TOKEN_ADDRESS}")
+    assert response.status_code == 200, f"Error {response.text}"
+    status = requests.get(f"{BASE_URL}/crawl_status/{TOKEN_ADDRESS}")
+    assert status.status_code == 200, f"Error {status.text}"
+    assert response.json()["address"] == status.json()["address"] == TOKEN_ADDRESS
+
+
+def test_crawl_status_progress():
+    """Test that the crawl status reports scheduler progress fields"""
+    response = requests.get(f"{BASE_URL}/crawl_status/{TOKEN_ADDRESS}")
+    assert response.status_code == 200, f"Error {response.text}"
+    assert {"phase", "steps", "items", "eta_seconds"} <= set(response.json())
+
+
+def test_get_token_age():
+    """Test retrieving the creation transaction of a token"""
+    response = requests.get(f"{BASE_URL}/get_token_age/{TOKEN_ADDRESS}")
+    assert response.status_code == 200, f"Error {response.text}"
+    assert response.json()["address"] == TOKEN_ADDRESS
+    assert isinstance(response.json()["creation_slot"], int)
+
+
+def test_get_token_metadata():
+    """Test retrieving the on-chain metadata of a token"""
+    response = requests.get(f"{BASE_URL}/get_token_metadata/{TOKEN_ADDRESS}")
+    assert response.status_code == 200, f"Error {response.text}"
+    assert response.json()["address"] == TOKEN_ADDRESS
+    assert response.json()["metadata_updated_at"] is not None
+
+
+def test_admission_control_burst():
+    """Test that a burst of expensive requests is either served or rejected with Retry-After"""
+    url = f"{BASE_URL}/get_holders_info/{TOKEN_ADDRESS}"
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        responses = list(executor.map(lambda _: requests.get(url), range(16)))
+    assert {response.status_code for response in responses} <= {200, 429}
+    assert all("Retry-After" in response.headers for response in responses if response.status_code == 429)
+
+
+def test_circuit_breaker_metrics():
+    """Test that circuit breaker states are exported once the dependencies have been called"""
+    requests.get(f"{BASE_URL}/get_token_info/{TOKEN_ADDRESS}")
+    response = requests.get(f"{BASE_URL}/metrics")
+    assert response.status_code == 200, f"Error {response.text}"
+    assert 'circuit_breaker_state{dependency="dexscreener"}' in response.text
+
+
+def test_request_deadline_exceeded():
+    """Test that a request running out of time is answered with 504 naming the step that did"""
+
+    def late_body():
+        # the deadline starts with the headers, so it is over before the endpoint gets its body
+        time.sleep(0.5)
+        yield json.dumps({"addresses": [TOKEN_ADDRESS]}).encode()
+
+    response = requests.post(
+        f"{BASE_URL}/add_tokens",
+        data=late_body(),
+        headers={"X-Request-Deadline": "0.1", "Content-Type": "application/json"},
+    )
+    assert response.status_code == 504, f"Error {response.text}"
+    assert response.json()["step"]
+
+
+def test_snapshot_holders():
+    """Test that a full holder snapshot reports every owner and the top-10 concentration"""
+    response = requests.post(f"{BASE_URL}/snapshot_holders/{TOKEN_ADDRESS}", params={"limit": 5})
+    assert response.status_code == 200, f"Error {response.text}"
+    snapshot = response.json()
+    assert snapshot["holders"] >= len(snapshot["top_holders"])
+    assert 0 <= snapshot["top10_percent"] <= 100
+    response = requests.get(f"{BASE_URL}/get_holders_snapshot/{TOKEN_ADDRESS}", params={"limit": 5})
+    assert response.status_code == 200, f"Error {response.text}"
+    assert response.json()["holders"] == snapshot["holders"]
+
+
+def test_holders_ledger():
+    """Test that the holder ledger folds the crawled transactions and reports exact holders"""
+    deadline = time.monotonic() + CRAWL_WAIT_TIMEOUT
+    while True:
+        status = requests.get(f"{BASE_URL}/crawl_status/{TOKEN_ADDRESS}").json()["status"]
+        if status not in ("pending", "running") or time.monotonic() > deadline:
+            break
+        time.sleep(1)
+    assert status in ("done", None), f"Crawl not finished: {status}"
+    while True:
+        response = requests.post(f"{BASE_URL}/update_ledger/{TOKEN_ADDRESS}", params={"limit": 5})
+        assert response.status_code == 200, f"Error {response.text}"
+        ledger = response.json()
+        if ledger["complete"]:
+            break
+    assert ledger["holders"] >= len(ledger["top_holders"])
+    response = requests.get(f"{BASE_URL}/get_holders_ledger/{TOKEN_ADDRESS}", params={"limit": 5})
+    assert response.status_code == 200, f"Error {response.text}"
+    assert response.json()["transactions"] == ledger["transactions"]
+    response = requests.get(f"{BASE_URL}/get_sell_events/{TOKEN_ADDRESS}", params={"limit": 5})
+    assert response.status_code == 200, f"Error {response.text}"
+    assert len(response.json()) <= 5
@@ -0,0 +1,121 @@
+import threading
+from app import crawl_scheduler
+from app.crawl_scheduler import CrawlScheduler, CrawlStep
+
+
+def run_crawls(scheduler: CrawlScheduler, crawls: dict[str, int], before_start=None) -> list[str]:
+    """Submit crawls of the given number of steps, wait for all of them and return the order their steps ran in"""
+    log = []
+    gate = threading.Event()
+    done = {key: threading.Event() for key in crawls}
+
+    def steps(key: str, count: int):
+        gate.wait(5)
+        for index in range(count):
+            log.append(key)
+            yield CrawlStep("signatures", 1, count - index - 1)
+
+    for key, count in crawls.items():
+        assert scheduler.submit(key, steps(key, count), lambda error, key=key: done[key].set())
+    if before_start is not None:
+        before_start()
+    gate.set()
+    for event in done.values():
+        assert event.wait(5)
+    return log
+
+
+def test_started_crawls_limited_to_concurrency():
+    """Test that a crawl only starts once a started one finishes when every worker has a crawl"""
+    scheduler = CrawlScheduler(concurrency=1)
+    log = run_crawls(scheduler, {"a": 3, "b": 3})
+    assert log == ["a", "a", "a", "b", "b", "b"]
+
+
+def test_queried_waiting_crawl_starts_first():
+    """Test that a waiting crawl of a queried token starts before the ones submitted earlier"""
+    scheduler = CrawlScheduler(concurrency=1)
+    log = run_crawls(scheduler, {"a": 1, "b": 1, "c": 1}, before_start=lambda: scheduler.touch("c"))
+    assert log == ["a", "c", "b"]
+
+
+def test_waiting_crawl_progress():
+    """Test that a crawl waiting to start is reported as queued without an ETA"""
+    scheduler = CrawlScheduler(concurrency=1)
+    gate = threading.Event()
+
+    def steps():
+        gate.wait(5)
+        yield CrawlStep("signatures", 1, 0)
+
+    scheduler.submit("a", steps(), lambda error: None)
+    scheduler.submit("b", steps(), lambda error: None)
+    progress = scheduler.progress("b")
+    gate.set()
+    assert progress.state == "queued"
+    assert progress.steps == 0
+    assert progress.eta_seconds is None
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+def run_on_one_worker(scheduler: CrawlScheduler, crawls: dict[str, int], queried=()) -> list[str]:
+    """Start crawls together on a single worker, so their steps run strictly in finish-tag order"""
+    log = []
+    done = {key: threading.Event() for key in crawls}
+
+    def steps(key: str, count: int):
+        for index in range(count):
+            log.append(key)
+            yield CrawlStep("signatures", 1, count - index - 1)
+
+    scheduler._start_workers = lambda: None
+    for key, count in crawls.items():
+        scheduler.submit(key, steps(key, count), lambda error, key=key: done[key].set())
+    for key in queried:
+        scheduler.touch(key)
+    threading.Thread(target=scheduler._work, daemon=True).start()
+    for event in done.values():
+        assert event.wait(5)
+    return log
+
+
+def test_crawls_interleave_step_by_step():
+    """Test that started crawls take turns instead of the first one running to completion"""
+    log = run_on_one_worker(CrawlScheduler(concurrency=2), {"big": 4, "small": 2})
+    assert log == ["big", "small", "big", "small", "big", "big"]
+
+
+def test_queried_crawl_gets_boosted_share():
+    """Test that a queried token gets CRAWL_QUERY_BOOST steps for every step of the others"""
+    log = run_on_one_worker(CrawlScheduler(concurrency=2), {"big": 3, "queried": 9}, queried=["queried"])
+    assert log[:10] == ["big"] + ["queried"] * 4 + ["big"] + ["queried"] * 4
+
+
+def test_eta_from_step_interval(monkeypatch):
+    """Test that the ETA is the remaining steps times the interval between the crawl's steps"""
+    clock = FakeClock()
+    monkeypatch.setattr(crawl_scheduler, "time", clock)
+    scheduler = CrawlScheduler(concurrency=1)
+    reached = threading.Event()
+    gate = threading.Event()
+
+    def steps():
+        for remaining in (9, 8, 7):
+            clock.now += 2
+            yield CrawlStep("signatures", 10, remaining)
+        reached.set()
+        gate.wait(5)
+
+    scheduler.submit("a", steps(), lambda error: None)
+    assert reached.wait(5)
+    progress = scheduler.progress("a")
+    gate.set()
+    assert (progress.state, progress.steps, progress.items) == ("running", 3, 30)
+    assert progress.eta_seconds == 14.0
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from app.models.holder import Holder
+from app.models.token import Token
+from app.repository.holder_repository import HolderRepository
+
+
+def holder_row(address: str, token_id: int, balance: int, last_checked: datetime) -> dict:
+    return {
+        "address": address,
+        "token_id": token_id,
+        "initial_balance": balance,
+        "current_balance": balance,
+        "last_checked": last_checked,
+    }
+
+
+def test_upsert_holders_is_one_statement(db, engine):
+    """Test that holders are stored with one INSERT that keeps the initial balance of stored holders"""
+    token = Token(address="So11111111111111111111111111111111111111112")
+    db.add(token)
+    db.commit()
+    token_id = token.id
+    checked = datetime(2024, 1, 1)
+    repository = HolderRepository(db)
+    repository.upsert_holders([holder_row("a", token_id, 5, checked)])
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    repository.upsert_holders(
+        [holder_row("a", token_id, 9, checked + timedelta(hours=1)), holder_row("b", token_id, 1, checked)]
+    )
+
+    assert [statement.split()[0] for statement in statements] == ["INSERT"]
+    holders = {holder.address: holder for holder in db.query(Holder).filter(Holder.token_id == token_id)}
+    assert (holders["a"].initial_balance, holders["a"].current_balance) == (5, 9)
+    assert holders["a"].last_checked == checked + timedelta(hours=1)
+    assert (holders["b"].initial_balance, holders["b"].current_balance) == (1, 1)
+
+
+def test_update_balances_is_one_update_from_values(db, monkeypatch):
+    """Test that refreshed balances of many holders are written with a single UPDATE ... FROM (VALUES ...)"""
+    statements = []
+    monkeypatch.setattr(db, "execute", lambda statement, *args, **kwargs: statements.append(statement))
+    checked = datetime(2024, 1, 1)
+
+    HolderRepository(db).update_balances([(1, "a", 3, checked), (1, "b", 0, checked), (2, "a", 7, checked)])
+
+    assert len(statements) == 1
+    # SQLite has no column list for a VALUES alias, the statement is the PostgreSQL one
+    compiled = statements[0].compile(dialect=postgresql.dialect())
+    sql = " ".join(str(compiled).split())
+    assert sql.startswith("UPDATE holder SET current_balance=balances.current_balance")
+    assert "FROM (VALUES" in sql
+    assert len(compiled.params) == 12
+
+
+def test_update_balances_without_rows_writes_nothing(db, monkeypatch):
+    """Test that no statement is issued when no balance changed"""
+    statements = []
+    monkeypatch.setattr(db, "execute", lambda statement, *args, **kwargs: statements.append(statement))
+    HolderRepository(db).update_balances([])
+    assert statements == []
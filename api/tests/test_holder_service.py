@@ -0,0 +1,43 @@
+from app.models.signature import Signature
+from app.models.token import Token
+from app.services import holder_service
+from app.services.holder_service import HolderService
+from app.services.signature_service import SignatureService
+from app.solana.solscan import TokenChainInfo
+from app.solana.transactions import BalanceDeltas
+
+TOKEN_ADDRESS = "So11111111111111111111111111111111111111112"
+
+
+def add_token(db, signatures: int) -> int:
+    token = Token(address=TOKEN_ADDRESS)
+    db.add(token)
+    db.commit()
+    db.add_all(
+        Signature(signature=f"sig{slot:05d}", slot=slot, block_time=1700000000 + slot, token_id=token.id)
+        for slot in range(1, signatures + 1)
+    )
+    db.commit()
+    return token.id
+
+
+def test_update_ledger_folds_long_history_over_several_requests(db, monkeypatch):
+    """Test that a fold stops after the batch cap, reports itself incomplete and the next request continues it"""
+    monkeypatch.setattr(holder_service, "LEDGER_BATCH_SIZE", 100)
+    monkeypatch.setattr(holder_service, "LEDGER_BATCHES_PER_REQUEST", 2)
+    monkeypatch.setattr(SignatureService, "collect_new_signatures", lambda self, token_address: None)
+
+    def iter_balance_deltas(self, signatures, skip_errors=True):
+        for signature in signatures:
+            yield BalanceDeltas("payer", {f"owner{signature[-1]}": (0, 1)})
+
+    monkeypatch.setattr(TokenChainInfo, "iter_balance_deltas", iter_balance_deltas)
+    add_token(db, 250)
+
+    ledger = HolderService(db).update_ledger(TOKEN_ADDRESS)
+    assert (ledger.transactions, ledger.complete) == (200, False)
+    ledger = HolderService(db).update_ledger(TOKEN_ADDRESS)
+    assert (ledger.transactions, ledger.complete) == (250, True)
+    assert ledger.holders == 10
+    assert ledger.total_balance == 250
+    assert HolderService(db).get_holders_ledger(TOKEN_ADDRESS).complete is None
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.pool import StaticPool
+import app
+from app.models.token import Token
+
+TOKEN_ADDRESS = "So11111111111111111111111111111111111111112"
+
+
+@pytest.fixture
+def replica(engine, monkeypatch):
+    """Separate in-memory database standing in for a replica that has not caught up with the primary"""
+    replica = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    app.Base.metadata.create_all(replica)
+    monkeypatch.setattr(app, "POSTGRES_REPLICA_URL", "postgresql://replica")
+    monkeypatch.setattr(app, "_replica_engine", replica)
+    with app.SessionLocal(bind=engine) as db:
+        db.add(Token(address=TOKEN_ADDRESS))
+        db.commit()
+    yield replica
+    replica.dispose()
+
+
+def read_session(request_state) -> app.RoutingSession:
+    db = app.ReadSessionLocal()
+    db.info["request_state"] = request_state
+    return db
+
+
+def find_token(db) -> Token | None:
+    return db.query(Token).filter(Token.address == TOKEN_ADDRESS).first()
+
+
+def test_reads_go_to_replica(engine, replica):
+    """Test that a read-only session reads from the replica until anything is written"""
+    with read_session(SimpleNamespace()) as db:
+        assert db.get_bind() is replica
+        assert find_token(db) is None
+
+
+def test_reads_switch_to_primary_after_write(engine, replica):
+    """Test that a session reads its own writes from the primary once it has written"""
+    with read_session(SimpleNamespace()) as db:
+        db.execute(update(Token).where(Token.address == TOKEN_ADDRESS).values(name="Wrapped SOL"))
+        assert db.get_bind() is engine
+        assert find_token(db).name == "Wrapped SOL"
+
+
+def test_reads_switch_to_primary_after_flush(engine, replica):
+    """Test that a flushed ORM change routes the session to the primary as well"""
+    with read_session(SimpleNamespace()) as db:
+        db.add(Token(address="11111111111111111111111111111111"))
+        db.flush()
+        assert db.get_bind() is engine
+
+
+def test_reads_switch_to_primary_after_commit_of_request(engine, replica):
+    """Test that a commit of another session of the same request routes the read session to the primary"""
+    request_state = SimpleNamespace()
+    other_request = SimpleNamespace()
+    with read_session(request_state) as db, read_session(other_request) as other:
+        with app.SessionLocal(bind=engine) as writer:
+            writer.info["request_state"] = request_state
+            writer.execute(update(Token).where(Token.address == TOKEN_ADDRESS).values(symbol="SOL"))
+            writer.commit()
+        assert request_state.committed
+        assert find_token(db).symbol == "SOL"
+        assert other.get_bind() is replica
+
+
+def test_commit_without_write_keeps_reading_replica(engine, replica):
+    """Test that committing a read-only session does not route the request to the primary"""
+    request_state = SimpleNamespace()
+    with read_session(request_state) as db:
+        find_token(db)
+        db.commit()
+        assert not getattr(request_state, "committed", False)
+        assert db.get_bind() is replica
@@ -0,0 +1,37 @@
+import pytest
+from app.solana import rpc_pool
+from app.solana.rpc_pool import RpcEndpoint, parse_rpc_endpoints
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_fractional_rate_limit_grants_tokens(monkeypatch):
+    """Test that an endpoint allowed less than one request per second still gets a request through at that rate"""
+    clock = FakeClock()
+    monkeypatch.setattr(rpc_pool.time, "monotonic", clock)
+    endpoint = RpcEndpoint("http://127.0.0.1:8899", rate_limit=0.5)
+
+    assert endpoint.try_acquire() == 0
+    assert endpoint.try_acquire() == pytest.approx(2)
+    clock.now += 1
+    assert endpoint.try_acquire() == pytest.approx(1)
+    clock.now += 1
+    assert endpoint.try_acquire() == 0
+    # an idle endpoint saves up a single request, not a burst
+    clock.now += 60
+    assert endpoint.try_acquire() == 0
+    assert endpoint.try_acquire() == pytest.approx(2)
+
+
+def test_invalid_endpoint_config_is_rejected():
+    """Test that endpoints with a weight that is not positive or a negative rate limit are rejected"""
+    assert [endpoint.rate_limit for endpoint in parse_rpc_endpoints("http://a:8899|2|0.5,http://b:8899")] == [0.5, 0]
+    for value in ("http://a:8899|0", "http://a:8899|1|-1", "http://a:8899|1|fast"):
+        with pytest.raises(ValueError):
+            parse_rpc_endpoints(value)
@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+import pytest
+from solders.rpc.responses import RpcConfirmedTransactionStatusWithSignature
+from solders.signature import Signature as SolanaSignature
+from app.models.signature import Signature
+from app.models.token import Token
+from app.services.signature_service import SignatureService
+from app.solana.solscan import TokenChainInfo
+
+TOKEN_ADDRESS = "So11111111111111111111111111111111111111112"
+
+
+class FakeChain:
+    """Signature history of a token served like getSignaturesForAddress, newest first"""
+
+    def __init__(self, size: int):
+        self.statuses = [self.status(slot) for slot in range(size, 0, -1)]
+        self.calls = []
+
+    @staticmethod
+    def status(slot: int) -> RpcConfirmedTransactionStatusWithSignature:
+        return RpcConfirmedTransactionStatusWithSignature(
+            SolanaSignature.new_unique(), slot, None, None, 1700000000 + slot, None
+        )
+
+    def grow(self, count: int):
+        newest = self.statuses[0].slot
+        self.statuses[:0] = [self.status(slot) for slot in range(newest + count, newest, -1)]
+
+    def call(self, method, account, before=None, until=None, limit=1000):
+        self.calls.append((before, until))
+        signatures = [status.signature for status in self.statuses]
+        start = signatures.index(before) + 1 if before is not None else 0
+        page = []
+        for status in self.statuses[start:]:
+            if status.signature == until or len(page) == limit:
+                break
+            page.append(status)
+        return SimpleNamespace(value=page)
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    chain = FakeChain(2500)
+    monkeypatch.setattr(TokenChainInfo, "_call", chain.call)
+    return chain
+
+
+def test_retry_resumes_half_finished_crawl(db, chain):
+    """Test that a retried crawl stores the rest of the history without refetching or failing on stored pages"""
+    db.add(Token(address=TOKEN_ADDRESS))
+    db.commit()
+    pages = SignatureService(db).iter_signature_pages(TOKEN_ADDRESS)
+    assert next(pages) == 1000
+    pages.close()
+    chain.grow(5)
+    chain.calls.clear()
+
+    stored = list(SignatureService(db).iter_signature_pages(TOKEN_ADDRESS))
+
+    assert sum(stored) == 1505
+    assert db.query(Signature).count() == 2505
+    # the new signatures are fetched down to the newest stored one, the history resumes before the oldest
+    assert all(before != chain.statuses[5].signature for before, _ in chain.calls)
+    # one page of new signatures and two of older ones, each walk ending on an empty page
+    assert len(chain.calls) == 5
+
+
+def test_retry_of_finished_crawl_stores_nothing(db, chain):
+    """Test that re-running a complete crawl skips the stored signatures instead of raising"""
+    db.add(Token(address=TOKEN_ADDRESS))
+    db.commit()
+    assert sum(SignatureService(db).iter_signature_pages(TOKEN_ADDRESS)) == 2500
+    assert sum(SignatureService(db).iter_signature_pages(TOKEN_ADDRESS)) == 0
+    assert db.query(Signature).count() == 2500
@@ -0,0 +1,28 @@
+from types import SimpleNamespace
+from solana.exceptions import SolanaRpcException
+from app.metrics import RPC_LATENCY
+from app.solana import solscan
+from app.solana.solscan import TokenChainInfo
+
+
+def test_rpc_latency_excludes_retry_pause(monkeypatch):
+    """Test that a retried call records the latency of each attempt without the pause between them"""
+    pauses = []
+    attempts = []
+
+    def get_balance(*args):
+        attempts.append(args)
+        if len(attempts) == 1:
+            raise SolanaRpcException(ConnectionError("connection reset"), get_balance, None, "getBalance")
+        return "balance"
+
+    monkeypatch.setattr(TokenChainInfo, "client", SimpleNamespace(get_balance=get_balance))
+    monkeypatch.setattr(solscan, "RPC_RETRY_DELAY", 5)
+    monkeypatch.setattr(solscan, "sleep", lambda seconds: pauses.append(seconds) or solscan.time.sleep(0.2))
+    histogram = RPC_LATENCY.labels("get_balance")
+    observed = histogram._sum.get()
+
+    assert TokenChainInfo._call("get_balance", "owner") == "balance"
+    assert pauses == [5]
+    assert len(attempts) == 2
+    assert histogram._sum.get() - observed < 0.2
@@ -0,0 +1,67 @@
+from sqlalchemy import event
+import app
+from app.models.token import Token
+from app.repository.token_repository import (
+    TOKEN_ID_CACHE_NAMESPACE,
+    TokenRepository,
+    TokenResolver,
+    _token_ids,
+    forget_token_ids,
+)
+
+TOKEN_ADDRESS = "So11111111111111111111111111111111111111112"
+
+
+def count_queries(engine) -> list[str]:
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_cached_id_shared_across_requests(db, engine):
+    """Test that a token ID looked up by one request is served to the next without a query"""
+    token_id = TokenRepository(db).add_tokens([TOKEN_ADDRESS])[0].id
+    assert TokenResolver(db).get_id(TOKEN_ADDRESS) == token_id
+    statements = count_queries(engine)
+    with app.SessionLocal() as other:
+        resolver = TokenResolver.for_session(other)
+        assert resolver.get_id(TOKEN_ADDRESS) == token_id
+        assert TokenResolver.for_session(other) is resolver
+    assert statements == []
+
+
+def test_inserted_token_found_after_miss(db):
+    """Test that a missing address is not cached, so a token inserted afterwards is found at once"""
+    assert TokenResolver(db).get_id(TOKEN_ADDRESS) is None
+    with app.SessionLocal() as other:
+        TokenRepository(other).add_tokens([TOKEN_ADDRESS])
+    assert TokenResolver(db).get_id(TOKEN_ADDRESS) is not None
+
+
+def test_insert_forgets_cached_id(db):
+    """Test that inserting a token drops a mapping cached for its address"""
+    _token_ids.set(TOKEN_ID_CACHE_NAMESPACE, TOKEN_ADDRESS, 999, 60)
+    token_id = TokenRepository(db).add_tokens([TOKEN_ADDRESS])[0].id
+    assert _token_ids.get(TOKEN_ID_CACHE_NAMESPACE, TOKEN_ADDRESS) is None
+    assert TokenResolver(db).get_id(TOKEN_ADDRESS) == token_id
+
+
+def test_stale_cached_id_is_forgotten(db):
+    """Test that a cached ID whose token is gone resolves to None and is dropped from the cache"""
+    _token_ids.set(TOKEN_ID_CACHE_NAMESPACE, TOKEN_ADDRESS, 999, 60)
+    resolver = TokenResolver(db)
+    assert resolver.get(TOKEN_ADDRESS) is None
+    assert _token_ids.get(TOKEN_ID_CACHE_NAMESPACE, TOKEN_ADDRESS) is None
+    db.add(Token(address=TOKEN_ADDRESS))
+    db.commit()
+    assert resolver.get(TOKEN_ADDRESS).address == TOKEN_ADDRESS
+
+
+def test_forget_token_ids():
+    """Test that forgetting addresses drops only their mappings"""
+    _token_ids.set(TOKEN_ID_CACHE_NAMESPACE, "a", 1, 60)
+    _token_ids.set(TOKEN_ID_CACHE_NAMESPACE, "b", 2, 60)
+    forget_token_ids(["a", "missing"])
+    assert _token_ids.get(TOKEN_ID_CACHE_NAMESPACE, "a") is None
+    assert _token_ids.get(TOKEN_ID_CACHE_NAMESPACE, "b") == 2
+    forget_token_ids(["b"])
@@ -0,0 +1,54 @@
+from datetime import datetime
+from sqlalchemy import create_engine
+import app
+from app.crawl_scheduler import CrawlStep
+from app.models.crawl import CRAWL_PENDING, CRAWL_RUNNING, TokenCrawl
+from app.models.token import Token
+from app.services import token_service
+from app.services.token_service import TokenService
+
+TOKEN_ADDRESS = "So11111111111111111111111111111111111111112"
+
+
+def add_token(db, status: str) -> int:
+    token = Token(address=TOKEN_ADDRESS)
+    db.add(token)
+    db.commit()
+    db.add(TokenCrawl(token_id=token.id, status=status, updated_at=datetime.now()))
+    db.commit()
+    return token.id
+
+
+def test_crawl_releases_connection_between_steps(tmp_path, monkeypatch):
+    """Test that a scheduled crawl holds no database connection while other crawls run"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'crawl.db'}")
+    app.Base.metadata.create_all(engine)
+    monkeypatch.setattr(app, "_engine", engine)
+
+    def crawl_steps(self, token_address):
+        for phase in ("authority", "signatures", "holders"):
+            self.token_repository.get_or_404(token_address)
+            yield CrawlStep(phase, 0, None)
+
+    monkeypatch.setattr(TokenService, "_crawl_steps", crawl_steps)
+    with app.SessionLocal(bind=engine) as db:
+        token_id = add_token(db, CRAWL_RUNNING)
+    steps = token_service._run_crawl(token_id, TOKEN_ADDRESS)
+    assert engine.pool.checkedout() == 0
+    for _ in steps:
+        assert engine.pool.checkedout() == 0
+    engine.dispose()
+
+
+def test_crawl_not_scheduled_is_put_back_to_pending(db, monkeypatch):
+    """Test that a claimed crawl the scheduler does not take goes back to pending instead of staying running"""
+
+    class FullScheduler:
+        def submit(self, key, steps, on_done):
+            return False
+
+    monkeypatch.setattr(token_service, "get_scheduler", lambda: FullScheduler())
+    token_id = add_token(db, CRAWL_PENDING)
+    TokenService(db).crawl_token(TOKEN_ADDRESS)
+    db.expire_all()
+    assert db.get(TokenCrawl, token_id).status == CRAWL_PENDING
@@ -0,0 +1,94 @@
+import json
+import pytest
+from solders.signature import Signature as SolanaSignature
+from app.solana import solscan, transactions
+from app.solana.solscan import TokenChainInfo
+from app.solana.transactions import BalanceDeltas, parse_balance_deltas
+
+MINT = "So11111111111111111111111111111111111111112"
+OTHER_MINT = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
+
+
+def balance(owner: str, amount: int, mint: str = MINT) -> dict:
+    return {"mint": mint, "owner": owner, "uiTokenAmount": {"amount": str(amount)}}
+
+
+def raw_transaction(pre: list[dict], post: list[dict], err=None, signer: str = "payer") -> str:
+    return json.dumps(
+        {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "result": {
+                "meta": {"err": err, "preTokenBalances": pre, "postTokenBalances": post},
+                "transaction": {"message": {"accountKeys": [signer, "program"]}},
+            },
+        }
+    )
+
+
+def test_parse_balance_deltas_sums_accounts_of_owner():
+    """Test that the balances of an owner's token accounts are summed and unchanged owners and mints are left out"""
+    raw = raw_transaction(
+        pre=[balance("buyer", 0), balance("seller", 70), balance("seller", 30), balance("holder", 5)],
+        post=[balance("buyer", 40), balance("seller", 60), balance("holder", 5), balance("buyer", 9, OTHER_MINT)],
+    )
+    assert parse_balance_deltas(raw, MINT) == BalanceDeltas("payer", {"buyer": (0, 40), "seller": (100, 60)})
+
+
+def test_parse_balance_deltas_of_failed_transaction():
+    """Test that a failed transaction has no balance changes"""
+    raw = raw_transaction(pre=[balance("buyer", 0)], post=[balance("buyer", 40)], err={"InstructionError": [0, {}]})
+    assert parse_balance_deltas(raw, MINT) is None
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        json.dumps({"jsonrpc": "2.0", "id": 1, "error": {"code": -32005, "message": "Node is behind"}}),
+        json.dumps({"jsonrpc": "2.0", "id": 1, "result": None}),
+    ],
+)
+def test_parse_balance_deltas_of_missing_transaction(raw):
+    """Test that an RPC error or an unknown transaction is raised instead of read as no changes"""
+    with pytest.raises(ValueError):
+        parse_balance_deltas(raw, MINT)
+
+
+@pytest.fixture
+def parse_pool(monkeypatch):
+    """Two spawned parsing processes, shut down after the test"""
+    monkeypatch.setattr(transactions, "TX_PARSE_WORKERS", 2)
+    monkeypatch.setattr(solscan, "TX_PARSE_WORKERS", 2)
+    monkeypatch.setattr(transactions, "_parse_pool", None)
+    pool = transactions.get_parse_pool()
+    yield pool
+    pool.shutdown(cancel_futures=True)
+
+
+def test_iter_balance_deltas_in_pool_keeps_signature_order(parse_pool, monkeypatch):
+    """Test that transactions decoded by the process pool come back in signature order, errors skipped"""
+    signatures = [str(SolanaSignature.new_unique()) for _ in range(7)]
+    missing = signatures[3]
+    responses = {
+        signature: raw_transaction(pre=[balance("owner", index)], post=[balance("owner", index + 1)])
+        for index, signature in enumerate(signatures)
+    }
+    responses[missing] = json.dumps({"jsonrpc": "2.0", "id": 1, "result": None})
+    monkeypatch.setattr(
+        TokenChainInfo, "_call", staticmethod(lambda method, signature, **kwargs: responses[str(signature)])
+    )
+
+    deltas = list(TokenChainInfo(MINT).iter_balance_deltas(signatures))
+
+    assert transactions.get_parse_pool() is parse_pool
+    assert [None if tx is None else tx.balances["owner"] for tx in deltas] == [
+        (0, 1), (1, 2), (2, 3), None, (4, 5), (5, 6), (6, 7)
+    ]
+    with pytest.raises(ValueError):
+        list(TokenChainInfo(MINT).iter_balance_deltas(signatures, skip_errors=False))
+
+
+def test_no_pool_without_workers(monkeypatch):
+    """Test that decoding runs in the calling thread when TX_PARSE_WORKERS is 0"""
+    monkeypatch.setattr(transactions, "TX_PARSE_WORKERS", 0)
+    assert transactions.get_parse_pool() is None
@@ -1,12 +1,37 @@
+-- Схема базы данных. Все шаги идемпотентны: файл применяется и к новому, и к уже существующему тому
 -- Инициализация таблицы для токенов
-CREATE TABLE token (
+CREATE TABLE IF NOT EXISTS token (
     id SERIAL PRIMARY KEY,
     address VARCHAR NOT NULL UNIQUE,
-    update_authority VARCHAR
+    update_authority VARCHAR,
+    name VARCHAR,
+    symbol VARCHAR,
+    mint_authority VARCHAR,
+    freeze_authority VARCHAR,
+    metadata_updated_at TIMESTAMP,
+    creation_signature VARCHAR,
+    creation_slot INTEGER,
+    creation_time TIMESTAMP
 );
 
+-- Колонки, добавленные после первой версии схемы, для томов, созданных ею
+ALTER TABLE token ADD COLUMN IF NOT EXISTS name VARCHAR;
+ALTER TABLE token ADD COLUMN IF NOT EXISTS symbol VARCHAR;
+ALTER TABLE token ADD COLUMN IF NOT EXISTS mint_authority VARCHAR;
+ALTER TABLE token ADD COLUMN IF NOT EXISTS freeze_authority VARCHAR;
+ALTER TABLE token ADD COLUMN IF NOT EXISTS metadata_updated_at TIMESTAMP;
+ALTER TABLE token ADD COLUMN IF NOT EXISTS creation_signature VARCHAR;
+ALTER TABLE token ADD COLUMN IF NOT EXISTS creation_slot INTEGER;
+ALTER TABLE token ADD COLUMN IF NOT EXISTS creation_time TIMESTAMP;
+
+-- Поиск токенов по возрасту
+CREATE INDEX IF NOT EXISTS ix_token_creation_time ON token (creation_time);
+
+-- Поиск токенов, метаданные которых ещё не получены
+CREATE INDEX IF NOT EXISTS ix_token_metadata_pending ON token (id) WHERE metadata_updated_at IS NULL;
+
 -- Инициализация таблицы для подписей
-CREATE TABLE signature (
+CREATE TABLE IF NOT EXISTS signature (
     signature VARCHAR PRIMARY KEY,
     slot INTEGER NOT NULL,
     block_time INTEGER NOT NULL,
@@ -14,8 +39,11 @@ CREATE TABLE signature (
     FOREIGN KEY (token_id) REFERENCES token(id)
 );
 
+-- Самая старая подпись токена читается по индексу
+CREATE INDEX IF NOT EXISTS ix_signature_token_slot ON signature (token_id, slot);
+
 -- Инициализация таблицы для держателей токенов
-CREATE TABLE holder (
+CREATE TABLE IF NOT EXISTS holder (
     address VARCHAR NOT NULL,
     token_id INTEGER NOT NULL,
     initial_balance BIGINT NOT NULL,
@@ -24,3 +52,114 @@ CREATE TABLE holder (
     PRIMARY KEY (address, token_id),
     FOREIGN KEY (token_id) REFERENCES token(id)
 );
+
+-- Сводка удержания по держателям токена, пересчитывается при изменении балансов
+CREATE TABLE IF NOT EXISTS holder_summary (
+    token_id INTEGER PRIMARY KEY,
+    holders INTEGER NOT NULL,
+    blue INTEGER NOT NULL,
+    green INTEGER NOT NULL,
+    yellow INTEGER NOT NULL,
+    orange INTEGER NOT NULL,
+    red INTEGER NOT NULL,
+    white INTEGER NOT NULL,
+    initial_total BIGINT NOT NULL,
+    current_total BIGINT NOT NULL,
+    percent_sold DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMP NOT NULL,
+    FOREIGN KEY (token_id) REFERENCES token(id)
+);
+
+-- Полный снимок держателей токена: баланс каждого владельца токен-аккаунтов минта
+CREATE TABLE IF NOT EXISTS holder_snapshot (
+    token_id INTEGER NOT NULL,
+    address VARCHAR NOT NULL,
+    balance BIGINT NOT NULL,
+    snapshot_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (token_id, address),
+    FOREIGN KEY (token_id) REFERENCES token(id)
+);
+CREATE INDEX IF NOT EXISTS ix_holder_snapshot_token_balance ON holder_snapshot (token_id, balance);
+
+-- Реестр держателей токена, собранный из изменений балансов в транзакциях в порядке слотов
+CREATE TABLE IF NOT EXISTS holder_ledger (
+    token_id INTEGER NOT NULL,
+    address VARCHAR NOT NULL,
+    balance BIGINT NOT NULL,
+    first_buy_at TIMESTAMP,
+    first_buy_slot INTEGER,
+    sells INTEGER NOT NULL,
+    last_slot INTEGER NOT NULL,
+    PRIMARY KEY (token_id, address),
+    FOREIGN KEY (token_id) REFERENCES token(id)
+);
+CREATE INDEX IF NOT EXISTS ix_holder_ledger_token_balance ON holder_ledger (token_id, balance);
+
+-- Продажи держателей: транзакции, уменьшившие баланс владельца
+CREATE TABLE IF NOT EXISTS holder_ledger_sell (
+    token_id INTEGER NOT NULL,
+    signature VARCHAR NOT NULL,
+    address VARCHAR NOT NULL,
+    slot INTEGER NOT NULL,
+    sold_at TIMESTAMP NOT NULL,
+    amount BIGINT NOT NULL,
+    balance BIGINT NOT NULL,
+    PRIMARY KEY (token_id, signature, address),
+    FOREIGN KEY (token_id) REFERENCES token(id)
+);
+CREATE INDEX IF NOT EXISTS ix_holder_ledger_sell_token_slot ON holder_ledger_sell (token_id, slot);
+
+-- Водяной знак реестра: последняя учтённая транзакция токена
+CREATE TABLE IF NOT EXISTS holder_ledger_watermark (
+    token_id INTEGER PRIMARY KEY,
+    slot INTEGER NOT NULL,
+    signature VARCHAR NOT NULL,
+    transactions INTEGER NOT NULL,
+    updated_at TIMESTAMP NOT NULL,
+    FOREIGN KEY (token_id) REFERENCES token(id)
+);
+
+-- Журнал изменений балансов держателей (только добавление)
+CREATE TABLE IF NOT EXISTS holder_balance_history (
+    id BIGSERIAL PRIMARY KEY,
+    token_id INTEGER NOT NULL,
+    address VARCHAR NOT NULL,
+    balance BIGINT NOT NULL,
+    recorded_at TIMESTAMP NOT NULL,
+    FOREIGN KEY (token_id) REFERENCES token(id)
+);
+CREATE INDEX IF NOT EXISTS ix_holder_balance_history_token_address ON holder_balance_history (token_id, address, recorded_at);
+
+-- Балансы держателей, агрегированные по интервалам 1m, 1h и 1d
+CREATE TABLE IF NOT EXISTS holder_balance_rollup (
+    token_id INTEGER NOT NULL,
+    address VARCHAR NOT NULL,
+    resolution VARCHAR NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    balance BIGINT NOT NULL,
+    min_balance BIGINT NOT NULL,
+    max_balance BIGINT NOT NULL,
+    PRIMARY KEY (token_id, address, resolution, bucket_start),
+    FOREIGN KEY (token_id) REFERENCES token(id)
+);
+
+-- Суммарный баланс держателей токена, агрегированный по интервалам 1m, 1h и 1d
+CREATE TABLE IF NOT EXISTS token_balance_rollup (
+    token_id INTEGER NOT NULL,
+    resolution VARCHAR NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    balance BIGINT NOT NULL,
+    min_balance BIGINT NOT NULL,
+    max_balance BIGINT NOT NULL,
+    PRIMARY KEY (token_id, resolution, bucket_start),
+    FOREIGN KEY (token_id) REFERENCES token(id)
+);
+
+-- Состояние первичного сбора данных по токену
+CREATE TABLE IF NOT EXISTS token_crawl (
+    token_id INTEGER PRIMARY KEY,
+    status VARCHAR NOT NULL,
+    updated_at TIMESTAMP NOT NULL,
+    error VARCHAR,
+    FOREIGN KEY (token_id) REFERENCES token(id)
+);
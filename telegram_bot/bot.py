@@ -19,6 +19,12 @@ logger = logging.getLogger(__name__)
 
 API_BASE_URL = f"http://api_service:{os.getenv('API_PORT', 8000)}"
 
+
+def api_headers(update: Update) -> dict:
+    # The API limits expensive requests per client, every bot user gets their own budget
+    return {"X-Client-Id": f"telegram:{update.effective_user.id}"}
+
+
 # Dictionary to temporarily store user data
 user_data = {}
 
@@ -101,7 +107,7 @@ def format_token_info(token_data):
 
 
 async def handle_token_info(update: Update, context: ContextTypes.DEFAULT_TYPE, address: str):
-    token_response = requests.get(f"{API_BASE_URL}/get_token_info/{address}")
+    token_response = requests.get(f"{API_BASE_URL}/get_token_info/{address}", headers=api_headers(update))
     if token_response.status_code == 200:
         token_data = token_response.json()
         token_message = format_token_info(token_data)
@@ -115,7 +121,7 @@ async def handle_token_info(update: Update, context: ContextTypes.DEFAULT_TYPE,
             await update.callback_query.edit_message_text(error_text)
         else:
             await update.message.reply_text(error_text)
-    holders_response = requests.post(f"{API_BASE_URL}/get_holders_info/{address}")
+    holders_response = requests.post(f"{API_BASE_URL}/get_holders_info/{address}", headers=api_headers(update))
     if holders_response.status_code == 200:
         holders_data = holders_response.json()
         emojis, categories_count = categorize_balance(holders_data)
@@ -145,7 +151,7 @@ async def handle_token_info(update: Update, context: ContextTypes.DEFAULT_TYPE,
 
 # Handle token addition
 async def handle_add_token(update: Update, context: ContextTypes.DEFAULT_TYPE, address: str):
-    response = requests.post(f"{API_BASE_URL}/add_token/{address}")
+    response = requests.post(f"{API_BASE_URL}/add_token/{address}", headers=api_headers(update))
     if response.status_code == 200:
         token_data = response.json()
         message_text = f"Токен добавлен: {token_data.get('address')}"